@@ -8,11 +8,12 @@ from logging import getLogger
 import collections
 
 import sqlalchemy as sa
-from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
+from ggrc.automapper import adjacency
 from ggrc.automapper import rules
 from ggrc import login
+from ggrc import settings
 from ggrc.models.automapping import Automapping
 from ggrc.models.relationship import Relationship
 from ggrc.rbac.permissions import is_allowed_update
@@ -69,32 +70,12 @@ class AutomapperGenerator(object):
 
   def _populate_cache(self, stubs):
     """Fetch all mappings for objects in stubs, cache them in self.cache."""
-    # Union is here to convince mysql to use two separate indices and
-    # merge te results. Just using `or` results in a full-table scan
-    # Manual column list avoids loading the full object which would also try to
-    # load related objects
-    cols = db.session.query(
-        Relationship.source_type, Relationship.source_id,
-        Relationship.destination_type, Relationship.destination_id)
-    relationships = cols.filter(
-        tuple_(Relationship.source_type, Relationship.source_id).in_(
-            [(s.type, s.id) for s in stubs]
-        )
-    ).union_all(
-        cols.filter(
-            tuple_(Relationship.destination_type,
-                   Relationship.destination_id).in_(
-                       [(s.type, s.id) for s in stubs]))
-    ).all()
-    for (src_type, src_id, dst_type, dst_id) in relationships:
-      src = Stub(src_type, src_id)
-      dst = Stub(dst_type, dst_id)
-      # only store a neighbor if we queried for it since this way we know
-      # we'll be storing complete neighborhood by the end of the loop
-      if src in stubs:
-        self.cache[src].add(dst)
-      if dst in stubs:
-        self.cache[dst].add(src)
+    neighbors = adjacency.get_neighbors(stubs)
+    for (obj_type, obj_id, neighbor_type, neighbor_id) in neighbors:
+      self.cache[Stub(obj_type, obj_id)].add(Stub(neighbor_type, neighbor_id))
+    # objects without neighbors also have a complete (empty) neighborhood
+    for stub in stubs:
+      self.cache.setdefault(stub, set())
 
   @staticmethod
   def order(src, dst):
@@ -179,6 +160,7 @@ class AutomapperGenerator(object):
           "automapping_id": automapping_id}
           for src, dst in self.auto_mappings
           if (src, dst) != original]))  # (src, dst) is sorted
+      adjacency.add_neighbors(self.auto_mappings)
       cache = get_cache(create=True)
       if cache:
         # Add inserted relationships into new objects collection of the cache,
@@ -229,10 +211,29 @@ def register_automapping_listeners():
   """Register event listeners for auto mapper."""
   # pylint: disable=unused-variable,unused-argument
 
+  from ggrc.automapper.bulk import BulkAutomapperGenerator
+
   def automap(session, _):
+    relationships = [obj for obj in session.new
+                     if isinstance(obj, Relationship)]
+    if getattr(settings, "AUTOMAPPER_ENGINE", "bfs") == "bulk":
+      if relationships:
+        BulkAutomapperGenerator().generate_automappings(relationships)
+      return
     automapper = AutomapperGenerator()
-    for obj in session.new:
-      if isinstance(obj, Relationship):
-        automapper.generate_automappings(obj)
+    for obj in relationships:
+      automapper.generate_automappings(obj)
+
+  def add_neighbors(mapper, connection, target):
+    adjacency.add_neighbors(
+        [(Stub.from_source(target), Stub.from_destination(target))],
+        connection)
+
+  def remove_neighbors(mapper, connection, target):
+    adjacency.remove_neighbors(
+        [(Stub.from_source(target), Stub.from_destination(target))],
+        connection)
 
+  sa.event.listen(Relationship, "after_insert", add_neighbors)
+  sa.event.listen(Relationship, "after_delete", remove_neighbors)
   sa.event.listen(sa.orm.session.Session, "after_flush", automap)
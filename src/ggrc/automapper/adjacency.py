@@ -0,0 +1,134 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Adjacency index of the relationships graph.
+
+Every relationship between objects a and b is stored as two rows, (a, b) and
+(b, a), so all neighbors of a set of objects are fetched with a single lookup
+on the primary key instead of searching relationships by both source and
+destination.
+
+Relationships created or deleted through the ORM update the index in mapper
+event listeners registered with the automapping listeners. Code that inserts
+relationships with plain SQL must add them to the index with add_neighbors or
+add_neighbors_for.
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc.models.relationship import Relationship
+
+
+# pylint: disable=too-few-public-methods
+class RelationshipNeighbor(db.Model):
+  """Db model for one direction of a relationship between two objects."""
+  __tablename__ = 'relationship_neighbors'
+
+  object_type = db.Column(db.String(64), primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  neighbor_type = db.Column(db.String(64), primary_key=True)
+  neighbor_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+
+def _rows(pairs):
+  """Get index rows for both directions of (source, destination) pairs."""
+  rows = []
+  for (src_type, src_id), (dst_type, dst_id) in pairs:
+    rows.append({"object_type": src_type, "object_id": src_id,
+                 "neighbor_type": dst_type, "neighbor_id": dst_id})
+    rows.append({"object_type": dst_type, "object_id": dst_id,
+                 "neighbor_type": src_type, "neighbor_id": src_id})
+  return rows
+
+
+def add_neighbors(pairs, connection=None):
+  """Add (source, destination) pairs to the index.
+
+  Args:
+    pairs: iterable of (source, destination) pairs of (type, id) stubs.
+    connection: connection used for the insert, db.session by default.
+  """
+  rows = _rows(pairs)
+  if not rows:
+    return
+  inserter = RelationshipNeighbor.__table__.insert().prefix_with("IGNORE")
+  (connection or db.session).execute(inserter, rows)
+
+
+def add_neighbors_for(condition):
+  """Add relationships matching condition to the index.
+
+  Args:
+    condition: filter on the relationships table.
+  """
+  rels = Relationship.__table__.c
+  neighbors = RelationshipNeighbor.__table__
+  directions = [
+      (rels.source_type, rels.source_id,
+       rels.destination_type, rels.destination_id),
+      (rels.destination_type, rels.destination_id,
+       rels.source_type, rels.source_id),
+  ]
+  for columns in directions:
+    db.session.execute(neighbors.insert().prefix_with("IGNORE").from_select(
+        ["object_type", "object_id", "neighbor_type", "neighbor_id"],
+        sa.select(columns).where(condition),
+    ))
+
+
+def remove_neighbors(pairs, connection=None):
+  """Remove (source, destination) pairs that are no longer related.
+
+  A pair stays in the index while a relationship between the two objects
+  exists in either direction.
+  """
+  connection = connection or db.session
+  rels = Relationship.__table__.c
+  for src, dst in pairs:
+    src, dst = tuple(src), tuple(dst)
+    related = connection.execute(sa.select([rels.id]).where(
+        tuple_(rels.source_type, rels.source_id,
+               rels.destination_type, rels.destination_id).in_(
+                   [src + dst, dst + src])
+    ).limit(1)).first()
+    if related:
+      continue
+    connection.execute(RelationshipNeighbor.__table__.delete().where(
+        tuple_(
+            RelationshipNeighbor.object_type,
+            RelationshipNeighbor.object_id,
+            RelationshipNeighbor.neighbor_type,
+            RelationshipNeighbor.neighbor_id,
+        ).in_([src + dst, dst + src])
+    ))
+
+
+def get_neighbors(stubs):
+  """Get (object type, object id, neighbor type, neighbor id) rows.
+
+  Args:
+    stubs: (type, id) stubs of objects.
+
+  Returns:
+    list of rows for all neighbors of all objects in stubs.
+  """
+  if not stubs:
+    return []
+  return db.session.query(
+      RelationshipNeighbor.object_type,
+      RelationshipNeighbor.object_id,
+      RelationshipNeighbor.neighbor_type,
+      RelationshipNeighbor.neighbor_id,
+  ).filter(
+      tuple_(RelationshipNeighbor.object_type,
+             RelationshipNeighbor.object_id).in_(
+                 [tuple(stub) for stub in stubs])
+  ).all()
+
+
+def rebuild():
+  """Rebuild the whole index from the relationships table."""
+  db.session.execute(RelationshipNeighbor.__table__.delete())
+  add_neighbors_for(sa.true())
@@ -0,0 +1,229 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Set based automapping engine.
+
+Instead of walking the graph one edge at a time, every round of the closure
+is computed for a whole frontier of relationships with a single
+INSERT IGNORE ... SELECT statement. The statement joins the frontier with the
+relationship adjacency index, keeps only (top, mid, bottom) triples allowed by
+the automapping rules and objects the user may update, and skips pairs that
+are already related. Relationships inserted in a round are the frontier of
+the next round, so the number of statements depends on the depth of the
+rules and not on the number of created mappings.
+"""
+
+import collections
+
+import sqlalchemy as sa
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc import login
+from ggrc.automapper import AutomapperGenerator
+from ggrc.automapper import adjacency
+from ggrc.automapper import rules
+from ggrc.models.automapping import Automapping
+from ggrc.models.relationship import Relationship
+from ggrc.rbac import permissions
+from ggrc.services.common import get_cache
+from ggrc.utils import benchmark
+
+
+class BulkAutomapperGenerator(object):
+  """Generator for automappings of a batch of new relationships."""
+
+  SAVEPOINT = "bulk_automappings"
+
+  def __init__(self):
+    self.rule_triples = [
+        (src, dst, mapping)
+        for (src, dst), mappings in rules.rules.iteritems()
+        for mapping in mappings
+    ]
+    self.rule_types = {type_ for triple in self.rule_triples
+                       for type_ in triple}
+
+  def generate_automappings(self, relationships):
+    """Generate automappings for relationships grouped by their contexts.
+
+    Permissions are checked in the context of the parent relationship.
+    """
+    by_context = collections.defaultdict(list)
+    for relationship in relationships:
+      by_context[relationship.context_id].append(relationship)
+    with benchmark("Bulk automapping generate_automappings"):
+      for batch in by_context.itervalues():
+        self._generate(batch)
+
+  def _allowed(self, type_col, id_col, context):
+    """Get a filter for objects the user is allowed to update."""
+    allowed_types = []
+    conditions = []
+    for type_ in sorted(self.rule_types):
+      if permissions.is_allowed_update(type_, None, context):
+        allowed_types.append(type_)
+        continue
+      ids = [id_ for id_ in permissions.update_resources_for(type_) or ()
+             if permissions.is_allowed_update(type_, id_, context)]
+      if ids:
+        conditions.append(sa.and_(type_col == type_, id_col.in_(ids)))
+    if allowed_types:
+      conditions.append(type_col.in_(allowed_types))
+    return sa.or_(*conditions) if conditions else sa.false()
+
+  @staticmethod
+  def _frontier(condition, parent_col):
+    """Get both directions of relationships matching condition."""
+    rels = Relationship.__table__.c
+    directions = [
+        (rels.source_type, rels.source_id,
+         rels.destination_type, rels.destination_id),
+        (rels.destination_type, rels.destination_id,
+         rels.source_type, rels.source_id),
+    ]
+    return sa.union_all(*[
+        sa.select([
+            a_type.label("a_type"),
+            a_id.label("a_id"),
+            b_type.label("b_type"),
+            b_id.label("b_id"),
+            parent_col.label("parent_id"),
+        ]).where(condition)
+        for a_type, a_id, b_type, b_id in directions
+    ]).alias("frontier")
+
+  def _insert_round(self, frontier, automapping_ids, context):
+    """Insert automappings implied by the frontier.
+
+    For a frontier relationship a-b and a neighbor r of b, a-r is inserted if
+    the rules allow it for types of a, b and r.
+
+    Returns:
+      number of inserted relationships.
+    """
+    neighbor = adjacency.RelationshipNeighbor.__table__.alias("neighbor")
+    existing = adjacency.RelationshipNeighbor.__table__.alias("existing")
+    automappings = Automapping.__table__
+    a_key = tuple_(frontier.c.a_type, frontier.c.a_id)
+    r_key = tuple_(neighbor.c.neighbor_type, neighbor.c.neighbor_id)
+
+    def ordered(a_col, r_col):
+      return sa.case([(a_key < r_key, a_col)], else_=r_col)
+
+    query = sa.select([
+        sa.literal(login.get_current_user_id()),
+        sa.func.now(),
+        sa.func.now(),
+        ordered(frontier.c.a_type, neighbor.c.neighbor_type),
+        ordered(frontier.c.a_id, neighbor.c.neighbor_id),
+        ordered(neighbor.c.neighbor_type, frontier.c.a_type),
+        ordered(neighbor.c.neighbor_id, frontier.c.a_id),
+        frontier.c.parent_id,
+        automappings.c.id,
+    ]).select_from(
+        frontier.join(neighbor, sa.and_(
+            neighbor.c.object_type == frontier.c.b_type,
+            neighbor.c.object_id == frontier.c.b_id,
+        )).join(automappings, sa.and_(
+            automappings.c.relationship_id == frontier.c.parent_id,
+            automappings.c.id.in_(automapping_ids),
+        ))
+    ).where(sa.and_(
+        tuple_(frontier.c.a_type, frontier.c.b_type,
+               neighbor.c.neighbor_type).in_(self.rule_triples),
+        a_key != r_key,
+        self._allowed(frontier.c.a_type, frontier.c.a_id, context),
+        self._allowed(neighbor.c.neighbor_type, neighbor.c.neighbor_id,
+                      context),
+        ~sa.exists().where(sa.and_(
+            existing.c.object_type == frontier.c.a_type,
+            existing.c.object_id == frontier.c.a_id,
+            existing.c.neighbor_type == neighbor.c.neighbor_type,
+            existing.c.neighbor_id == neighbor.c.neighbor_id,
+        )),
+    ))
+    result = db.session.execute(
+        Relationship.__table__.insert().prefix_with("IGNORE").from_select(
+            ["modified_by_id", "created_at", "updated_at",
+             "source_type", "source_id", "destination_type", "destination_id",
+             "parent_id", "automapping_id"],
+            query,
+        )
+    )
+    return result.rowcount
+
+  @staticmethod
+  def _create_automappings(relationships):
+    """Insert an automapping for every relationship and return their ids."""
+    automappings = Automapping.__table__
+    db.session.execute(automappings.insert(), [
+        {"relationship_id": rel.id,
+         "source_type": rel.source_type,
+         "source_id": rel.source_id,
+         "destination_type": rel.destination_type,
+         "destination_id": rel.destination_id}
+        for rel in relationships
+    ])
+    return [row.id for row in db.session.execute(
+        sa.select([automappings.c.id]).where(
+            automappings.c.relationship_id.in_(
+                [rel.id for rel in relationships]))
+    )]
+
+  @staticmethod
+  def _delete_unused_automappings(automapping_ids):
+    """Delete automappings of relationships that produced no mappings."""
+    automappings = Automapping.__table__
+    rels = Relationship.__table__.c
+    db.session.execute(automappings.delete().where(sa.and_(
+        automappings.c.id.in_(automapping_ids),
+        ~sa.exists().where(rels.automapping_id == automappings.c.id),
+    )))
+
+  def _generate(self, relationships):
+    """Insert the closure of automappings for relationships."""
+    rels = Relationship.__table__.c
+    context = relationships[0].context
+    db.session.execute("SAVEPOINT {}".format(self.SAVEPOINT))
+    automapping_ids = self._create_automappings(relationships)
+    condition = rels.id.in_([rel.id for rel in relationships])
+    parent_col = rels.id
+    total = 0
+    while True:
+      last_id = db.session.execute(sa.select([sa.func.max(rels.id)])).scalar()
+      with benchmark("Bulk automapping round"):
+        inserted = self._insert_round(self._frontier(condition, parent_col),
+                                      automapping_ids, context)
+      if not inserted:
+        break
+      total += inserted
+      if total > AutomapperGenerator.COUNT_LIMIT:
+        break
+      condition = sa.and_(rels.automapping_id.in_(automapping_ids),
+                          rels.id > last_id)
+      parent_col = rels.parent_id
+      adjacency.add_neighbors_for(condition)
+
+    if not total or total > AutomapperGenerator.COUNT_LIMIT:
+      db.session.execute("ROLLBACK TO SAVEPOINT {}".format(self.SAVEPOINT))
+      if total:
+        for relationship in relationships:
+          relationship._json_extras = {  # pylint: disable=protected-access
+              'automapping_limit_exceeded': True
+          }
+      return
+    db.session.execute("RELEASE SAVEPOINT {}".format(self.SAVEPOINT))
+    self._delete_unused_automappings(automapping_ids)
+
+    cache = get_cache(create=True)
+    if cache:
+      # Add inserted relationships into new objects collection of the cache,
+      # so that they will be logged within event and appropriate revisions
+      # will be created.
+      cache.new.update(
+          (relationship, relationship.log_json())
+          for relationship in Relationship.query.filter(
+              Relationship.automapping_id.in_(automapping_ids),
+          )
+      )
@@ -10,6 +10,7 @@ from datetime import datetime
 from logging import getLogger
 
 from flask import g
+from flask import has_app_context
 import iso8601
 import sqlalchemy
 from sqlalchemy.ext.associationproxy import AssociationProxy
@@ -298,7 +299,7 @@ Builder strategy:
   * For each non-present attribute, return an "AttributeBuilder" instance
     which describes the objects needed to complete the representation.
   * Maintain a set of requested (type, condition, stub_only?) tuples
-  * stub_only? tuples can be requested en-masse via UNION queries
+  * stub_only? tuples can be requested en-masse with one query per type
   * non-stub_only? tuples can override stub_only? tuples with identical
     conditions
   * When all available object representations have been built:
@@ -382,47 +383,6 @@ def build_type_query(type_, result_spec):
   return columns_indexes, query
 
 
-def build_stub_union_query(queries):
-  results = {}
-  for (type_, conditions) in queries:
-    if isinstance(conditions, (int, long, str, unicode)):
-      # Assume `id` query
-      keys, vals = ('id',), (conditions,)
-      results.setdefault(type_, {}).setdefault(keys, {}).setdefault(vals, [])
-    elif isinstance(conditions, dict):
-      keys, vals = zip(*sorted(conditions.items()))
-      results.setdefault(type_, {}).setdefault(keys, {}).setdefault(vals, [])
-    else:
-      # FIXME: Handle aggregated conditions recursively
-      pass
-
-  column_count = 0
-  type_column_indexes = {}
-  type_queries = {}
-  for (type_, result_spec) in results.items():
-    columns_indexes, query = build_type_query(type_, result_spec)
-    type_column_indexes[type_] = columns_indexes
-    type_queries[type_] = query
-    if len(columns_indexes) > column_count:
-      column_count = len(columns_indexes)
-
-  for (type_, query) in type_queries.items():
-    for _ in range(column_count - len(type_column_indexes[type_])):
-      query = query.add_column(sqlalchemy.literal(None))
-    type_queries[type_] = query
-
-  queries_for_union = type_queries.values()
-  if len(queries_for_union) == 0:
-    query = None
-  elif len(queries_for_union) == 1:
-    query = queries_for_union[0]
-  else:
-    query = db.session.query(
-        sqlalchemy.sql.expression.union(
-            *[q for q in type_queries.values()]).alias('union_query'))
-  return results, type_column_indexes, query
-
-
 def _render_stub_from_match(match, type_columns):
   type_ = match[type_columns['type']]
   id_ = match[type_columns['id']]
@@ -442,82 +402,97 @@ class LazyStubRepresentation(object):
       conditions = {'id': conditions}
     self.conditions = conditions
     self.condition_key, self.condition_val = zip(*sorted(conditions.items()))
+    self.cache_key = (self.type, self.condition_key, self.condition_val)
 
-  def get_matches(self, results):
-    return results\
-        .get(self.type, {})\
-        .get(self.condition_key, {})\
-        .get(self.condition_val, [])
-
-  def render(self, results, type_columns):
-    matches = self.get_matches(results)
-    assert len(matches) <= 1, (results, self.type, self.condition_key,
-                               self.condition_val)
-    if len(matches) == 1:
-      return _render_stub_from_match(matches[0], type_columns[self.type])
-    else:
-      return None
 
+def _get_stub_cache():
+  """Get rendered stubs resolved in the request by LazyStub cache keys.
 
-def walk_representation(obj):  # noqa
-  if isinstance(obj, dict):
-    for key, value in obj.items():
-      if isinstance(value, dict):
-        for attr in walk_representation(value):
-          yield attr
-      elif isinstance(value, (list, tuple)):
-        for attr in walk_representation(value):
-          yield attr
-      else:
-        yield value, key, obj
-  elif isinstance(obj, (list, tuple)):
-    for index, value in enumerate(obj):
-      if isinstance(value, dict):
-        for attr in walk_representation(value):
-          yield attr
-      elif isinstance(value, (list, tuple)):
-        for attr in walk_representation(value):
-          yield attr
-      else:
-        yield value, index, obj
-
+  Without an app context the cache only lives for a single call.
+  """
+  if not has_app_context():
+    return {}
+  if getattr(g, "stub_cache", None) is None:
+    g.stub_cache = {}
+  return g.stub_cache
 
-def gather_queries(resource):
-  queries = []
-  for val, _, _ in walk_representation(resource):
-    if isinstance(val, LazyStubRepresentation):
-      queries.append((val.type, val.conditions))
-  return queries
 
+def _gather_stub_slots(resource):
+  """Get (container, key, stub) tuples of all stubs in resource.
 
-def reify_representation(resource, results, type_columns):
-  for val, key, obj in walk_representation(resource):
-    if isinstance(val, LazyStubRepresentation):
-      obj[key] = val.render(results, type_columns)
-  return resource
+  The resource is traversed once, without recursion.
+  """
+  slots = []
+  containers = [resource]
+  while containers:
+    container = containers.pop()
+    if isinstance(container, dict):
+      items = container.iteritems()
+    elif isinstance(container, list):
+      items = enumerate(container)
+    else:
+      continue
+    for key, value in items:
+      if isinstance(value, LazyStubRepresentation):
+        slots.append((container, key, value))
+      elif isinstance(value, (dict, list)):
+        containers.append(value)
+  return slots
+
+
+def invalidate_stub_cache(session, _):
+  """Clear the request level stub cache after a flush of any changes."""
+  if not has_app_context():
+    return
+  if session.new or session.dirty or session.deleted:
+    g.stub_cache = None
+
+
+def _resolve_stubs(stubs, cache):
+  """Render stubs that are not in cache with one query per type."""
+  missing = {}
+  for stub in stubs:
+    if stub.cache_key not in cache:
+      missing.setdefault(stub.type, {}).setdefault(
+          stub.condition_key, {}).setdefault(stub.condition_val, [])
+  for type_, result_spec in missing.items():
+    for keys, vals in result_spec.items():
+      for val in vals:
+        cache[(type_, keys, val)] = None
+    columns_indexes, query = build_type_query(type_, result_spec)
+    for row in query:
+      for keys, vals in result_spec.items():
+        val = tuple(row[columns_indexes[key]] for key in keys)
+        if val in vals:
+          cache[(type_, keys, val)] = _render_stub_from_match(
+              row, columns_indexes)
 
 
 def publish_representation(resource):
-  queries = gather_queries(resource)
+  """Replace stubs in the published resource with link objects.
 
-  if len(queries) == 0:
+  Stubs are gathered in a single pass over the resource and resolved from
+  the request level stub cache. Stubs that are not cached are resolved with
+  one query per type. Every stub is replaced in the slot it was found in.
+  """
+  slots = _gather_stub_slots(resource)
+  if not slots:
     return resource
-  else:
-    results, type_columns, query = build_stub_union_query(queries)
-    rows = query.all()
-    for row in rows:
-      type_ = row[0]
-      for columns, matches in results[type_].items():
-        vals = tuple(row[type_columns[type_][c]] for c in columns)
-        if vals in matches:
-          matches[vals].append(row)
-
-    return reify_representation(resource, results, type_columns)
+  cache = _get_stub_cache()
+  _resolve_stubs([stub for _, _, stub in slots], cache)
+  for container, key, stub in slots:
+    rendered = cache[stub.cache_key]
+    container[key] = dict(rendered) if rendered is not None else None
+  return resource
 
 
 class Builder(AttributeInfo):
   """JSON Dictionary builder for ggrc.models.* objects and their mixins."""
 
+  def __init__(self, tgt_class):
+    super(Builder, self).__init__(tgt_class)
+    self._publish_plans = {}
+
   def generate_link_object_for(
           self, obj, inclusions, include, inclusion_filter):
     """Generate a link object for this object. If there are property paths
@@ -635,62 +610,128 @@ class Builder(AttributeInfo):
       else:
         return None
 
-  def publish_attr(
-          self, obj, attr_name, inclusions, include, inclusion_filter):
-    class_attr = getattr(obj.__class__, attr_name)
-    result = None
+  def _compile_publish_attr(self, model, attr_name, inclusions, include):
+    """Get a function that publishes attr_name of objects of model.
 
-    if attr_name in getattr(obj.__class__, "_custom_publish", {}):
+    The kind of the attribute is resolved once, so that the returned function
+    only reads the value from the given object.
+
+    Returns:
+      function that gets an object and an inclusion filter and returns the
+      published attribute value.
+    """
+    # pylint: disable=protected-access
+    class_attr = getattr(model, attr_name)
+    custom_publish = getattr(model, "_custom_publish", {})
+
+    if attr_name in custom_publish:
       # The attribute has a custom publish logic
-      result = obj.__class__._custom_publish[attr_name](obj)
+      publish_custom = custom_publish[attr_name]
+      return lambda obj, _: publish_custom(obj)
     elif isinstance(class_attr, AssociationProxy):
       if getattr(class_attr, 'publish_raw', False):
-        published_attr = getattr(obj, attr_name)
-        if hasattr(published_attr, "copy"):
-          result = published_attr.copy()
-        else:
-          result = published_attr
-      else:
-        result = self.publish_association_proxy(
-            obj, attr_name, class_attr, inclusions, include, inclusion_filter)
+        def publish_raw(obj, _):
+          published_attr = getattr(obj, attr_name)
+          if hasattr(published_attr, "copy"):
+            return published_attr.copy()
+          return published_attr
+        return publish_raw
+      return lambda obj, inclusion_filter: self.publish_association_proxy(
+          obj, attr_name, class_attr, inclusions, include, inclusion_filter)
     elif isinstance(class_attr, InstrumentedAttribute) and \
             isinstance(class_attr.property, RelationshipProperty):
-      result = self.publish_relationship(
-          obj, attr_name, class_attr, inclusions, include, inclusion_filter)
+      return self._compile_publish_relationship(
+          attr_name, class_attr, inclusions, include)
     elif class_attr.__class__.__name__ == 'property':
-      if not inclusions or include:
-        if getattr(obj, '{0}_id'.format(attr_name)):
-          result = LazyStubRepresentation(
-              getattr(obj, '{0}_type'.format(attr_name)),
-              getattr(obj, '{0}_id'.format(attr_name)))
-      else:
-        result = self.publish_link(
-            obj, attr_name, inclusions, include, inclusion_filter)
-    else:
-      result = getattr(obj, attr_name)
+      return self._compile_publish_property(attr_name, inclusions, include)
+    return lambda obj, _: getattr(obj, attr_name)
 
-    return result
+  def _compile_publish_property(self, attr_name, inclusions, include):
+    """Get a function that publishes a polymorphic property.
+
+    The property is published as a stub of the object referenced by the
+    <attr_name>_type and <attr_name>_id attributes, unless it is inlined.
+    """
+    if inclusions and not include:
+      return lambda obj, inclusion_filter: self.publish_link(
+          obj, attr_name, inclusions, include, inclusion_filter)
+    id_attr = '{0}_id'.format(attr_name)
+    type_attr = '{0}_type'.format(attr_name)
+
+    def publish_stub(obj, _):
+      if getattr(obj, id_attr):
+        return LazyStubRepresentation(
+            getattr(obj, type_attr), getattr(obj, id_attr))
+      return None
+    return publish_stub
+
+  def _compile_publish_relationship(
+          self, attr_name, class_attr, inclusions, include):
+    """Get a function that publishes a relationship attribute.
+
+    Relationships that are published as stubs are resolved to the name of
+    the foreign key column and the target type up front.
+    """
+    prop = class_attr.property
+    if prop.uselist or include or prop.backref:
+      return lambda obj, inclusion_filter: self.publish_relationship(
+          obj, attr_name, class_attr, inclusions, include, inclusion_filter)
+    target_name = list(prop.local_columns)[0].key
+    polymorphic = prop.mapper.class_.__mapper__.polymorphic_on is not None
+    target_type = prop.mapper.class_.__name__
 
-  def _publish_attrs_for(
-          self, obj, attrs, json_obj, inclusions=None, inclusion_filter=None,
-          attribute_whitelist=None):
-    if inclusions is None:
-      inclusions = []
-    for attr in attrs:
+    def publish_stub(obj, _):
+      if polymorphic:
+        stub_type = getattr(obj, attr_name).__class__.__name__
+      else:
+        stub_type = target_type
+      attr_value = getattr(obj, target_name)
+      if attr_value is not None:
+        return LazyStubRepresentation(stub_type, attr_value)
+      return None
+    return publish_stub
+
+  def publish_attr(
+          self, obj, attr_name, inclusions, include, inclusion_filter):
+    publish_attr = self._compile_publish_attr(
+        obj.__class__, attr_name, inclusions, include)
+    return publish_attr(obj, inclusion_filter)
+
+  def _compile_publish_plan(self, model, inclusions, attribute_whitelist):
+    """Get a list of (attr_name, publish function) pairs for publish_attrs."""
+    plan = []
+    for attr in self._publish_attrs:
       if hasattr(attr, '__call__'):
         attr_name = attr.attr_name
       else:
         attr_name = attr
+      if attribute_whitelist and attr_name not in attribute_whitelist:
+        continue
       local_inclusion = ()
       for inclusion in inclusions:
         if inclusion[0] == attr_name:
           local_inclusion = inclusion
           break
-      if attribute_whitelist and attr_name not in attribute_whitelist:
-        continue
-      json_obj[attr_name] = self.publish_attr(
-          obj, attr_name, local_inclusion[1:], len(local_inclusion) > 0,
-          inclusion_filter)
+      plan.append((attr_name, self._compile_publish_attr(
+          model, attr_name, local_inclusion[1:], len(local_inclusion) > 0)))
+    return plan
+
+  def _get_publish_plan(self, model, extra_inclusions, attribute_whitelist):
+    """Get the publish plan for the inclusions and the whitelist.
+
+    Plans are compiled on first use and cached in the builder, so that the
+    attributes of every object in a collection are not reflected again.
+    """
+    key = (model, frozenset(extra_inclusions),
+           frozenset(attribute_whitelist or ()))
+    plan = self._publish_plans.get(key)
+    if plan is None:
+      inclusions = tuple((attr,) for attr in self._include_links)
+      inclusions = tuple(set(inclusions).union(set(extra_inclusions)))
+      plan = self._compile_publish_plan(model, inclusions,
+                                        attribute_whitelist)
+      self._publish_plans[key] = plan
+    return plan
 
   def publish_attrs(self, obj, json_obj, extra_inclusions, inclusion_filter,
                     attribute_whitelist):
@@ -709,11 +750,10 @@ class Builder(AttributeInfo):
       [('directives'),('cycles')]
       [('directives', ('audit_frequency','organization')),('cycles')]
     """
-    inclusions = tuple((attr,) for attr in self._include_links)
-    inclusions = tuple(set(inclusions).union(set(extra_inclusions)))
-    return self._publish_attrs_for(
-        obj, self._publish_attrs, json_obj, inclusions, inclusion_filter,
-        attribute_whitelist)
+    plan = self._get_publish_plan(obj.__class__, extra_inclusions,
+                                  attribute_whitelist)
+    for attr_name, publish_attr in plan:
+      json_obj[attr_name] = publish_attr(obj, inclusion_filter)
 
   @classmethod
   def do_update_attrs(cls, obj, json_obj, attrs):
@@ -2,6 +2,16 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
+from ggrc import settings
+from ggrc.extensions import get_extension_module
+
 from .localcache import LocalCache
 from .memcache import MemCache
 from .cachemanager import CacheManager
+
+
+def get_cache_backend_class():
+  """Get Cache implementation selected with CACHE_BACKEND setting."""
+  backend = getattr(settings, 'CACHE_BACKEND', 'ggrc.cache.memcache.MemCache')
+  module_name, class_name = backend.rsplit('.', 1)
+  return getattr(get_extension_module(module_name), class_name)
@@ -2,11 +2,32 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
+import time
 from collections import namedtuple
 
 CacheEntry = namedtuple('CacheEntry', 'model_plural class_name cache_type')
 MappingEntry = namedtuple('MappingEntry', 'class_name attr polymorph')
 
+# Memcache treats larger expiration times as absolute unix timestamps
+MAX_RELATIVE_EXPIRATION = 60 * 60 * 24 * 30
+
+
+def expiration_seconds(expiration_time):
+  """Convert memcache style expiration time to seconds from now.
+
+  Args:
+    expiration_time: 0 for no expiration, number of seconds from now or
+                     absolute unix timestamp as in memcache.Client API
+
+  Returns:
+    Number of seconds the entry should live, None if it should not expire
+  """
+  if not expiration_time:
+    return None
+  if expiration_time > MAX_RELATIVE_EXPIRATION:
+    return max(expiration_time - time.time(), 0)
+  return expiration_time
+
 
 def resource(model_plural, class_name, cache_type='memcache'):
   return CacheEntry(model_plural, class_name, cache_type)
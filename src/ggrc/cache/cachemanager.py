@@ -8,6 +8,8 @@
 
 """
 from cache import all_cache_entries, all_mapping_entries
+from ggrc import settings
+from ggrc.utils import list_chunks
 
 
 class CacheManager:
@@ -20,6 +22,7 @@ class CacheManager:
     supported_classes: Model plural table name for a supported resource type
     supported_mappings: Mapping entry tuples for a supported resource type
     factory: Factory class to create cache object
+    batch_size: Maximum number of keys sent to cache in a single bulk call
     new, dirty, deleted: temporary dictionaries used in session event listeners
                          before and after flush
     marked_for_<op>: dictionaries used in session event listeners after flush,
@@ -33,8 +36,10 @@ class CacheManager:
   def __init__(self):
     pass
 
-  def initialize(self, cache):
+  def initialize(self, cache, batch_size=None):
     """Initialize Cache Manager, configure cache mechanism."""
+    self.batch_size = batch_size or getattr(settings, 'MEMCACHE_BATCH_SIZE',
+                                            500)
     self.supported_classes = {}
     for cache_entry in all_cache_entries():
       self.supported_classes[cache_entry.class_name] = cache_entry.model_plural
@@ -144,22 +149,42 @@ class CacheManager:
   def bulk_get(self, data):
     """Perform Bulk Get operations in cache for specified data.
 
+    Keys are sent to cache in batches of at most `batch_size` keys, so the
+    number of round trips is len(data) / batch_size instead of len(data).
+
     Args:
       data: keys for bulk get
     Returns:
-     Result of cache get_multi
+     Merged result of cache get_multi for all batches, None if cache returned
+     None for any of the batches
     """
-    return self.cache_object.get_multi(data)
+    ret = {}
+    for keys in list_chunks(data, self.batch_size):
+      result = self.cache_object.get_multi(keys)
+      if result is None:
+        return None
+      ret.update(result)
+    return ret
 
   def bulk_add(self, data, expiration_time=0):
     """Perform Bulk Add operations in cache for specified data.
 
+    Entries are sent to cache in batches of at most `batch_size` entries.
+
     Args:
-      data: keys for bulk add
+      data: dictionary of entries for bulk add
     Returns:
-     Result of cache add_multi
+     List of keys that were not added, as returned by cache add_multi for all
+     batches, None if cache returned None for any of the batches
     """
-    return self.cache_object.add_multi(data, expiration_time)
+    ret = []
+    for keys in list_chunks(data, self.batch_size):
+      result = self.cache_object.add_multi(
+          {key: data[key] for key in keys}, expiration_time)
+      if result is None:
+        return None
+      ret.extend(result)
+    return ret
 
   def bulk_update(self, data, expiration_time=0):
     """Perform Bulk update operations in cache for specified data.
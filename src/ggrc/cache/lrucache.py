@@ -0,0 +1,268 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+    LRUCache implements a bounded in-process cache with the AppEngine
+    memcache.Client interface, to be used outside of AppEngine.
+
+    The store is shared by all requests served by the process. Since other
+    processes do not see invalidations done by this one, every entry lives at
+    most CACHE_LRU_TTL seconds.
+"""
+
+import cPickle
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from ggrc import settings
+from ggrc.cache.cache import expiration_seconds
+from ggrc.cache.memcache import MemCache
+
+
+class LRUStore(object):
+  """Thread safe key-value store with LRU eviction and per entry TTL.
+
+  Values are kept pickled, so callers get a copy of the stored value the same
+  way as with memcache. Deleting a key with lock_seconds blocks add for that
+  key for the given time, the same as memcache delete with seconds argument.
+
+  Attributes:
+    max_entries: number of entries after which the least recently used entry
+                 is evicted
+    max_ttl: upper bound for entry lifetime in seconds, 0 for no bound
+    entries: ordered dictionary of key -> (pickled value, expires at, version)
+             with the most recently used entries at the end
+    locks: dictionary of key -> time until which add is blocked for the key
+  """
+
+  def __init__(self, max_entries, max_ttl=0):
+    self.max_entries = max_entries
+    self.max_ttl = max_ttl
+    self.entries = OrderedDict()
+    self.locks = {}
+    self.mutex = threading.RLock()
+    self.versions = itertools.count(1)
+    self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+  def _expires_at(self, expiration_time):
+    """Get the time when an entry with expiration_time expires."""
+    ttl = expiration_seconds(expiration_time)
+    if self.max_ttl:
+      ttl = min(ttl or self.max_ttl, self.max_ttl)
+    if ttl is None:
+      return None
+    return time.time() + ttl
+
+  def lookup(self, key):
+    """Get (pickled value, version) for key and mark it as recently used."""
+    with self.mutex:
+      entry = self.entries.pop(key, None)
+      if entry is not None and entry[1] is not None and \
+         entry[1] <= time.time():
+        entry = None
+      if entry is None:
+        self.stats["misses"] += 1
+        return None
+      self.entries[key] = entry
+      self.stats["hits"] += 1
+      return entry[0], entry[2]
+
+  def store(self, key, value, expiration_time=0):
+    """Store value under key and evict least recently used entries."""
+    with self.mutex:
+      self.entries.pop(key, None)
+      self.entries[key] = (
+          cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL),
+          self._expires_at(expiration_time),
+          next(self.versions),
+      )
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+        self.stats["evictions"] += 1
+
+  def add(self, key, value, expiration_time=0):
+    """Store value only if the key is neither present nor locked."""
+    with self.mutex:
+      locked_until = self.locks.get(key)
+      if locked_until is not None:
+        if locked_until > time.time():
+          return False
+        del self.locks[key]
+      if self.lookup(key) is not None:
+        return False
+      self.store(key, value, expiration_time)
+      return True
+
+  def compare_and_store(self, key, value, version, expiration_time=0):
+    """Store value only if the key was not changed since version was read."""
+    with self.mutex:
+      entry = self.lookup(key)
+      if entry is None or entry[1] != version:
+        return False
+      self.store(key, value, expiration_time)
+      return True
+
+  def increment(self, key, delta=1, initial_value=None):
+    """Add delta to the value of key keeping its expiration time.
+
+    A missing key is stored as initial_value + delta if initial_value is
+    given. Same as with memcache, the value does not go below zero.
+
+    Returns:
+      the new value or None if the key is missing.
+    """
+    with self.mutex:
+      entry = self.lookup(key)
+      if entry is None:
+        if initial_value is None:
+          return None
+        value = initial_value + delta
+        self.store(key, value)
+        return value
+      value = max(cPickle.loads(entry[0]) + delta, 0)
+      self.entries[key] = (
+          cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL),
+          self.entries[key][1],
+          next(self.versions),
+      )
+      return value
+
+  def delete(self, key, lock_seconds=0):
+    """Delete key and return True if it was present."""
+    with self.mutex:
+      if lock_seconds:
+        self.locks[key] = time.time() + lock_seconds
+      entry = self.entries.pop(key, None)
+      return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+  def flush(self):
+    with self.mutex:
+      self.entries.clear()
+      self.locks.clear()
+
+  def get_stats(self):
+    """Get statistics in the format of memcache.Client.get_stats."""
+    with self.mutex:
+      stats = dict(self.stats)
+      stats["items"] = len(self.entries)
+      stats["bytes"] = sum(len(entry[0]) for entry in self.entries.values())
+      return stats
+
+
+class LRUClient(object):
+  """Client for LRUStore with the AppEngine memcache.Client interface.
+
+  A client remembers the versions of keys read with gets and get_multi
+  with for_cas, so it should not be shared between requests.
+  """
+
+  def __init__(self, store):
+    self.store = store
+    self.cas_versions = {}
+
+  def get(self, key):
+    entry = self.store.lookup(key)
+    if entry is None:
+      return None
+    return cPickle.loads(entry[0])
+
+  def gets(self, key):
+    entry = self.store.lookup(key)
+    if entry is None:
+      self.cas_versions.pop(key, None)
+      return None
+    self.cas_versions[key] = entry[1]
+    return cPickle.loads(entry[0])
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    # pylint: disable=unused-argument
+    get = self.gets if for_cas else self.get
+    result = {}
+    for key in keys:
+      value = get(key_prefix + key)
+      if value is not None:
+        result[key] = value
+    return result
+
+  def set(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    self.store.store(key, value, time)
+    return True
+
+  def set_multi(self, mapping, time=0, key_prefix=''):
+    # pylint: disable=redefined-outer-name
+    for key, value in mapping.iteritems():
+      self.set(key_prefix + key, value, time)
+    return []
+
+  def add(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return self.store.add(key, value, time)
+
+  def add_multi(self, mapping, time=0, key_prefix=''):
+    # pylint: disable=redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.add(key_prefix + key, value, time)]
+
+  def cas(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    if key not in self.cas_versions:
+      return False
+    return self.store.compare_and_store(
+        key, value, self.cas_versions.pop(key), time)
+
+  def cas_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.cas(key, value, time)]
+
+  def incr(self, key, delta=1, namespace=None, initial_value=None):
+    # pylint: disable=unused-argument
+    return self.store.increment(key, delta, initial_value)
+
+  def delete(self, key, seconds=0):
+    """Delete key, return 2 on success and 1 if key was not in cache."""
+    return 2 if self.store.delete(key, seconds) else 1
+
+  def delete_multi(self, keys, seconds=0, key_prefix=''):
+    for key in keys:
+      self.delete(key_prefix + key, seconds)
+    return True
+
+  def flush_all(self):
+    self.store.flush()
+    return True
+
+  def get_stats(self):
+    return self.store.get_stats()
+
+
+class LRUCache(MemCache):
+  """MemCache using the process wide LRUStore instead of AppEngine memcache.
+
+  Settings:
+    CACHE_LRU_MAX_ENTRIES: maximum number of entries kept in the process
+    CACHE_LRU_TTL: maximum lifetime of an entry in seconds
+  """
+  _store = None
+  _store_lock = threading.Lock()
+
+  def __init__(self):
+    MemCache.__init__(self)
+    self.name = 'lru'
+
+  @classmethod
+  def get_store(cls):
+    """Get the LRUStore shared by all LRUCache instances in the process."""
+    with cls._store_lock:
+      if cls._store is None:
+        cls._store = LRUStore(
+            getattr(settings, 'CACHE_LRU_MAX_ENTRIES', 10000),
+            getattr(settings, 'CACHE_LRU_TTL', 60),
+        )
+      return cls._store
+
+  def create_client(self):
+    return LRUClient(self.get_store())
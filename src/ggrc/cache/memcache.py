@@ -2,7 +2,6 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
-from google.appengine.api import memcache
 from cache import Cache
 from cache import all_cache_entries
 from collections import OrderedDict
@@ -13,14 +12,28 @@ from copy import deepcopy
 
 """
 class MemCache(Cache):
+  """Cache backed by a client with AppEngine memcache.Client interface.
+
+  Subclasses can provide a different client by overriding create_client, the
+  client only has to implement the memcache.Client methods used here.
+  """
+  # Resources registered with this cache type in all_cache_entries()
+  cache_type = 'memcache'
+
   def __init__(self):
     self.name = 'memcache'
     self.client = None
+    self.memcache_client = None
 
     for cache_entry in all_cache_entries():
-      if cache_entry.cache_type is self.name:
+      if cache_entry.cache_type == self.cache_type:
         self.supported_resources[cache_entry.model_plural]=cache_entry.class_name
-        self.memcache_client = memcache.Client()
+    self.memcache_client = self.create_client()
+
+  def create_client(self):
+    """Create AppEngine memcache client."""
+    from google.appengine.api import memcache
+    return memcache.Client()
 
   def get_name(self):
     return self.name
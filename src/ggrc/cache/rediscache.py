@@ -0,0 +1,220 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+    RedisCache implements a network cache with the AppEngine memcache.Client
+    interface on top of a Redis server, to be used outside of AppEngine.
+
+    Requires the redis package, which is not installed on AppEngine.
+"""
+
+import cPickle
+
+from ggrc import settings
+from ggrc.cache.cache import expiration_seconds
+from ggrc.cache.memcache import MemCache
+
+
+# Add a value unless the key exists or the key is locked by a delete
+ADD_SCRIPT = """
+if redis.call('exists', KEYS[2]) == 1 then
+  return 0
+end
+if ARGV[2] == '0' then
+  return redis.call('set', KEYS[1], ARGV[1], 'NX') and 1 or 0
+end
+return redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2], 'NX') and 1 or 0
+"""
+
+# Set a value only if it has not changed since it was read
+CAS_SCRIPT = """
+if redis.call('get', KEYS[1]) ~= ARGV[3] then
+  return 0
+end
+if ARGV[2] == '0' then
+  redis.call('set', KEYS[1], ARGV[1])
+else
+  redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2])
+end
+return 1
+"""
+
+
+def _milliseconds(expiration_time):
+  ttl = expiration_seconds(expiration_time)
+  return int(ttl * 1000) if ttl else 0
+
+
+class RedisClient(object):
+  """Redis client with the AppEngine memcache.Client interface.
+
+  All keys are stored under `prefix` and values are pickled. Compare and set
+  is done with the raw value read by gets, so a client remembers the values
+  it read for cas and should not be shared between requests. Deleting a key
+  with seconds stores a lock key for that time, which blocks add.
+  """
+
+  LOCK_PREFIX = 'lock:'
+
+  def __init__(self, redis_client, prefix='ggrc:'):
+    self.redis = redis_client
+    self.prefix = prefix
+    self.cas_values = {}
+    self.add_script = redis_client.register_script(ADD_SCRIPT)
+    self.cas_script = redis_client.register_script(CAS_SCRIPT)
+
+  def _key(self, key):
+    return self.prefix + key
+
+  def _lock_key(self, key):
+    return self.prefix + self.LOCK_PREFIX + key
+
+  @staticmethod
+  def _dumps(value):
+    return cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+
+  def get(self, key):
+    return self.get_multi([key]).get(key)
+
+  def gets(self, key):
+    return self.get_multi([key], for_cas=True).get(key)
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    """Get all keys with a single MGET."""
+    # pylint: disable=unused-argument
+    keys = list(keys)
+    if not keys:
+      return {}
+    raw_values = self.redis.mget([self._key(key_prefix + key) for key in keys])
+    result = {}
+    for key, raw in zip(keys, raw_values):
+      if raw is None:
+        continue
+      if for_cas:
+        self.cas_values[key_prefix + key] = raw
+      result[key] = cPickle.loads(raw)
+    return result
+
+  def set(self, key, value, time=0):
+    return not self.set_multi({key: value}, time)
+
+  def set_multi(self, mapping, time=0, key_prefix=''):
+    pipe = self.redis.pipeline(transaction=False)
+    ttl = _milliseconds(time)
+    for key, value in mapping.iteritems():
+      pipe.set(self._key(key_prefix + key), self._dumps(value), px=ttl or None)
+    pipe.execute()
+    return []
+
+  def add(self, key, value, time=0):
+    return not self.add_multi({key: value}, time)
+
+  def add_multi(self, mapping, time=0, key_prefix=''):
+    """Add all entries in one pipeline and return keys that were not added."""
+    pipe = self.redis.pipeline(transaction=False)
+    ttl = _milliseconds(time)
+    keys = mapping.keys()
+    for key in keys:
+      self.add_script(
+          keys=[self._key(key_prefix + key), self._lock_key(key_prefix + key)],
+          args=[self._dumps(mapping[key]), ttl],
+          client=pipe,
+      )
+    return [key for key, added in zip(keys, pipe.execute()) if not added]
+
+  def cas(self, key, value, time=0):
+    return not self.cas_multi({key: value}, time)
+
+  def cas_multi(self, mapping, time=0):
+    """Compare and set all entries and return keys that were not set."""
+    pipe = self.redis.pipeline(transaction=False)
+    ttl = _milliseconds(time)
+    keys = [key for key in mapping if key in self.cas_values]
+    for key in keys:
+      self.cas_script(
+          keys=[self._key(key)],
+          args=[self._dumps(mapping[key]), ttl, self.cas_values.pop(key)],
+          client=pipe,
+      )
+    results = dict(zip(keys, pipe.execute() if keys else []))
+    return [key for key in mapping if not results.get(key)]
+
+  def incr(self, key, delta=1, namespace=None, initial_value=None):
+    """Add delta to the value of key in a transaction keeping its TTL.
+
+    Values are pickled, so INCRBY can not be used for them.
+    """
+    # pylint: disable=unused-argument
+    redis_key = self._key(key)
+
+    def increment(pipe):
+      """Compute the new value and set it if the key was not changed."""
+      raw = pipe.get(redis_key)
+      if raw is None:
+        if initial_value is None:
+          return None
+        value = initial_value + delta
+      else:
+        value = max(cPickle.loads(raw) + delta, 0)
+      ttl = pipe.pttl(redis_key)
+      pipe.multi()
+      pipe.set(redis_key, self._dumps(value), px=ttl if ttl > 0 else None)
+      return value
+
+    return self.redis.transaction(increment, redis_key,
+                                  value_from_callable=True)
+
+  def delete(self, key, seconds=0):
+    """Delete key, return 2 on success and 1 if key was not in cache."""
+    return 2 if self._delete([key], seconds)[0] else 1
+
+  def delete_multi(self, keys, seconds=0, key_prefix=''):
+    self._delete([key_prefix + key for key in keys], seconds)
+    return True
+
+  def _delete(self, keys, seconds):
+    pipe = self.redis.pipeline(transaction=False)
+    for key in keys:
+      pipe.delete(self._key(key))
+      if seconds:
+        pipe.set(self._lock_key(key), 1, px=_milliseconds(seconds))
+    results = pipe.execute()
+    return results[::2] if seconds else results
+
+  def flush_all(self):
+    """Delete all keys stored under prefix."""
+    keys = list(self.redis.scan_iter(match=self.prefix + '*'))
+    if keys:
+      self.redis.delete(*keys)
+    return True
+
+  def get_stats(self):
+    info = self.redis.info()
+    return {
+        "hits": info.get("keyspace_hits"),
+        "misses": info.get("keyspace_misses"),
+        "evictions": info.get("evicted_keys"),
+        "items": self.redis.dbsize(),
+        "bytes": info.get("used_memory"),
+    }
+
+
+class RedisCache(MemCache):
+  """MemCache using a Redis server instead of AppEngine memcache.
+
+  Settings:
+    CACHE_REDIS_URL: url of the Redis database, e.g. redis://localhost:6379/0
+  """
+  _connection_pool = None
+
+  def __init__(self):
+    MemCache.__init__(self)
+    self.name = 'redis'
+
+  def create_client(self):
+    import redis
+    if RedisCache._connection_pool is None:
+      RedisCache._connection_pool = redis.ConnectionPool.from_url(
+          settings.CACHE_REDIS_URL)
+    return RedisClient(redis.StrictRedis(
+        connection_pool=RedisCache._connection_pool))
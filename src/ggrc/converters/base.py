@@ -3,12 +3,15 @@
 
 """Base objects for csv file converters."""
 
+import itertools
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 
 from ggrc import settings
 from ggrc.utils import benchmark
+from ggrc.utils import in_request_context_copy
 from ggrc.utils import structures
-from ggrc.cache.memcache import MemCache
+from ggrc.cache import get_cache_backend_class
 from ggrc.converters import get_exportables
 from ggrc.converters.base_block import BlockConverter
 from ggrc.converters.snapshot_block import SnapshotBlockConverter
@@ -81,16 +84,58 @@ class Converter(object):
     csv_data = []
     for block_converter in self.block_converters:
       csv_header, csv_body = block_converter.to_array()
-      # multi block csv must have first column empty
-      two_empty_lines = [[], []]
-      block_data = csv_header + csv_body + two_empty_lines
-      for line in block_data:
-        line.insert(0, "")
-      block_data[0][0] = "Object type"
-      block_data[1][0] = block_converter.name
-      csv_data.extend(block_data)
+      block_chunks = self._block_chunks(
+          block_converter.name, [csv_header, csv_body])
+      for block_data in block_chunks:
+        csv_data.extend(block_data)
     return csv_data
 
+  def to_array_chunks(self, chunk_size):
+    """Generate the export 2D array in chunks of at most chunk_size objects.
+
+    Block headers are generated before the first chunk is returned, so that
+    the width of the csv file and the object names are known upfront. Joining
+    all chunks gives the same array as to_array.
+
+    Args:
+      chunk_size (int): maximum number of objects exported in one chunk.
+
+    Returns:
+      tuple of csv width and a generator of 2D arrays.
+    """
+    with benchmark("Create block converters"):
+      self.block_converters_from_ids(load_rows=False)
+    with benchmark("Generate csv headers"):
+      width = 1
+      blocks = []
+      for block_converter in self.block_converters:
+        csv_header, csv_body_chunks = block_converter.to_array_chunks(
+            chunk_size)
+        width = max([width] + [len(line) + 1 for line in csv_header])
+        blocks.append((block_converter.name,
+                       itertools.chain([csv_header], csv_body_chunks)))
+
+    def generate_chunks():
+      for name, chunks in blocks:
+        for block_data in self._block_chunks(name, chunks):
+          yield block_data
+
+    return width, generate_chunks()
+
+  @staticmethod
+  def _block_chunks(name, chunks):
+    """Add the first column and trailing empty lines to block data chunks.
+
+    Multi block csv must have the first column empty except for the
+    "Object type" label and the block name in the first two lines.
+    """
+    labels = ["Object type", name]
+    two_empty_lines = [[], []]
+    for block_data in itertools.chain(chunks, [two_empty_lines]):
+      for line in block_data:
+        line.insert(0, labels.pop(0) if labels else "")
+      yield block_data
+
   def _start_compute_attributes_job(self):
     from ggrc import views
     revision_ids = []
@@ -102,12 +147,60 @@ class Converter(object):
   def import_csv(self):
     self.block_converters_from_csv()
     self.row_converters_from_csv()
+    self.prefetch_lookups()
     self.handle_priority_columns()
     self.import_objects()
     self.import_secondary_objects()
     self._start_compute_attributes_job()
     self.drop_cache()
 
+  def _get_block_dependencies(self):
+    """Get indexes of earlier blocks that each block depends on.
+
+    A block depends on an earlier block if its cells can reference objects of
+    the class of the earlier block, which are created or changed when the
+    earlier block is imported.
+    """
+    dependencies = []
+    for index, block in enumerate(self.block_converters):
+      referenced = set()
+      if block.object_class and not block.ignore:
+        referenced = block.get_referenced_classes()
+      dependencies.append({
+          earlier
+          for earlier, other in enumerate(self.block_converters[:index])
+          if other.object_class in referenced and not other.ignore
+      })
+    return dependencies
+
+  def prefetch_lookups(self):
+    """Fetch objects looked up by independent blocks on worker threads.
+
+    A dry run does not change any objects, so lookups of all blocks are
+    fetched. Otherwise only blocks that do not depend on other blocks are
+    handled here and the rest fetch their lookups while their rows are
+    handled, after the blocks they depend on are saved.
+    """
+    workers = getattr(settings, "IMPORT_WORKERS", 1)
+    blocks = [
+        block for block, dependencies in zip(self.block_converters,
+                                             self._get_block_dependencies())
+        if block.object_class and not block.ignore and
+        (self.dry_run or not dependencies)
+    ]
+    if workers < 2 or len(blocks) < 2:
+      return
+    prefetch = in_request_context_copy(BlockConverter.prefetch_lookups)
+    pool = ThreadPool(min(workers, len(blocks)))
+    try:
+      with benchmark("Prefetch lookups of {} blocks on {} workers".format(
+              len(blocks), workers)):
+        for block, lookups in zip(blocks, pool.map(prefetch, blocks)):
+          block.set_prefetched_lookups(*lookups)
+    finally:
+      pool.close()
+      pool.join()
+
   def handle_priority_columns(self):
     for attr_name in self.priority_columns:
       for block_converter in self.block_converters:
@@ -121,10 +214,14 @@ class Converter(object):
     for converter in self.block_converters:
       converter.row_converters_from_csv()
 
-  def block_converters_from_ids(self):
+  def block_converters_from_ids(self, load_rows=True):
     """ fill the block_converters class variable
 
     Generate block converters from a list of tuples with an object name and ids
+
+    Args:
+      load_rows (bool): create row converters for all exported objects. This
+        is not needed when the block is exported with to_array_chunks.
     """
     object_map = {o.__name__: o for o in self.exportable.values()}
     for object_data in self.ids_by_type:
@@ -140,7 +237,8 @@ class Converter(object):
                                          fields=fields, object_ids=object_ids,
                                          class_name=class_name)
         block_converter.check_block_restrictions()
-        block_converter.row_converters_from_ids()
+        if load_rows:
+          block_converter.row_converters_from_ids()
         self.block_converters.append(block_converter)
 
   def block_converters_from_csv(self):
@@ -186,5 +284,4 @@ class Converter(object):
   def drop_cache(cls):
     if not getattr(settings, 'MEMCACHE_MECHANISM', False):
       return
-    memcache = MemCache()
-    memcache.clean()
+    get_cache_backend_class()().clean()
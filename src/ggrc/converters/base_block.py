@@ -20,15 +20,19 @@ from sqlalchemy.orm.exc import UnmappedInstanceError
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.rbac import permissions
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 from ggrc.utils import structures
 from ggrc.converters import errors
 from ggrc.converters import get_shared_unique_rules
 from ggrc.converters import pre_commit_checks
 from ggrc.converters.base_row import RowConverter
+from ggrc.converters.handlers import handlers
 from ggrc.converters.import_helper import get_column_order
 from ggrc.converters.import_helper import get_object_column_definitions
+from ggrc.services.common import get_cache
 from ggrc.services.common import get_modified_objects
 from ggrc.services.common import update_snapshot_index
 from ggrc.services.common import update_memcache_after_commit
@@ -102,6 +106,11 @@ class BlockConverter(object):
     self._roles_cache = None
     self._user_roles_cache = None
     self._ca_definitions_cache = None
+    self._options_cache = None
+    self._object_lookups = {}
+    self._unique_lookups = {}
+    self._categories_cache = {}
+    self._roles_by_type_cache = {}
     self.converter = converter
     self.offset = options.get("offset", 0)
     self.object_class = options.get("object_class")
@@ -313,6 +322,190 @@ class BlockConverter(object):
       self._owners_cache = self._create_owners_cache()
     return self._owners_cache
 
+  def _get_column_values(self, columns):
+    """Get stripped non empty lines of raw cell values in given columns.
+
+    Args:
+      columns: function that gets an attribute name and a header dict and
+        returns True for columns whose values should be returned.
+    """
+    values = set()
+    for index, (attr_name, header) in enumerate(self.headers.items()):
+      if not columns(attr_name, header):
+        continue
+      for row in self.rows:
+        if index < len(row):
+          values.update(line.strip() for line in row[index].splitlines())
+    values.discard("")
+    return values
+
+  def _get_lookup_candidates(self, key):
+    """Get raw values that can be looked up by the given key column."""
+    if key == "email":
+      return {value for value in self._get_column_values(lambda *_: True)
+              if "@" in value}
+    slug_handlers = (handlers.MappingColumnHandler,
+                     handlers.ParentColumnHandler)
+    return self._get_column_values(
+        lambda attr_name, header: attr_name == key or
+        issubclass(header["handler"], slug_handlers))
+
+  def _prefetch_objects(self, model, key):
+    """Get objects of model with key values found in any cell of the block.
+
+    Returns:
+      dict of lower case key value -> object, or None for values that do not
+      belong to any object.
+    """
+    values = self._get_lookup_candidates(key)
+    cache = {value.lower(): None for value in values}
+    column = getattr(model, key)
+    with benchmark("prefetch {} by {}".format(model.__name__, key)):
+      for chunk in list_chunks(values):
+        for obj in model.query.filter(column.in_(chunk)):
+          cache[getattr(obj, key).strip().lower()] = obj
+    return cache
+
+  def find_object(self, model, key, value):
+    """Find the object of model with value in the unique key column.
+
+    All objects that are referenced by key values anywhere in the block are
+    fetched on the first lookup. Values that are not in any cell are looked
+    up with a query of their own.
+    """
+    if not isinstance(value, basestring) or not value.strip():
+      return model.query.filter_by(**{key: value}).first()
+    cache = self._object_lookups.get((model, key))
+    if cache is None:
+      cache = self._object_lookups[(model, key)] = self._prefetch_objects(
+          model, key)
+    lookup_key = value.strip().lower()
+    if lookup_key not in cache:
+      cache[lookup_key] = model.query.filter_by(**{key: value}).first()
+    return cache[lookup_key]
+
+  def get_person(self, email):
+    """Get the person with the given email or None."""
+    return self.find_object(models.Person, "email", email)
+
+  def _prefetch_unique_values(self, key):
+    """Get ids of objects with values of a unique column found in the block.
+
+    Returns:
+      dict of lower case value -> set of ids of objects with that value.
+    """
+    values = self._get_column_values(
+        lambda attr_name, _: attr_name == key)
+    cache = {value.lower(): set() for value in values}
+    column = getattr(self.object_class, key)
+    for chunk in list_chunks(values):
+      query = db.session.query(self.object_class.id, column).filter(
+          column.in_(chunk))
+      for id_, value in query:
+        cache.setdefault(value.strip().lower(), set()).add(id_)
+    return cache
+
+  def has_duplicate(self, key, value, obj_id):
+    """Check if an object other than obj_id has value in a unique column."""
+    if isinstance(value, basestring) and value.strip():
+      cache = self._unique_lookups.get(key)
+      if cache is None:
+        cache = self._unique_lookups[key] = self._prefetch_unique_values(key)
+      ids = cache.get(value.strip().lower())
+      if ids is not None:
+        return bool(ids - {obj_id})
+    return self.object_class.query.filter(and_(
+        getattr(self.object_class, key) == value,
+        self.object_class.id != obj_id
+    )).count() > 0
+
+  def get_referenced_classes(self):
+    """Get models whose objects can be looked up by cells of the block."""
+    classes = {self.object_class, models.Person}
+    for header in self.headers.values():
+      handler = header["handler"]
+      if issubclass(handler, handlers.MappingColumnHandler):
+        classes.add(self.converter.exportable.get(header.get("attr_name")))
+      elif issubclass(handler, handlers.ParentColumnHandler):
+        classes.add(handler.parent)
+    classes.discard(None)
+    return classes
+
+  def prefetch_lookups(self):
+    """Fetch objects and unique values looked up by the block.
+
+    This is meant to be called in a worker thread with its own session, see
+    set_prefetched_lookups.
+
+    Returns:
+      tuple of object lookups by (model, key) and unique lookups by key.
+    """
+    object_lookups = {}
+    for model in self.get_referenced_classes():
+      key = "email" if model is models.Person else "slug"
+      if hasattr(model, key):
+        object_lookups[(model, key)] = self._prefetch_objects(model, key)
+    unique_lookups = {
+        key: self._prefetch_unique_values(key)
+        for key, header in self.headers.items()
+        if header.get("unique") and hasattr(self.object_class, key)
+    }
+    return object_lookups, unique_lookups
+
+  def set_prefetched_lookups(self, object_lookups, unique_lookups):
+    """Use lookups fetched by prefetch_lookups in another session.
+
+    Fetched objects are merged into the current session without loading them
+    again.
+    """
+    for lookup_key, cache in object_lookups.iteritems():
+      self._object_lookups[lookup_key] = {
+          value: obj and db.session.merge(obj, load=False)
+          for value, obj in cache.iteritems()
+      }
+    self._unique_lookups.update(unique_lookups)
+
+  def get_option(self, roles, title):
+    """Get the option with title for the first of roles that has it."""
+    if self._options_cache is None:
+      self._options_cache = {}
+      for option in models.Option.query:
+        key = (option.role, option.title.strip().lower())
+        self._options_cache.setdefault(key, option)
+    title = title.strip().lower()
+    for role in roles:
+      option = self._options_cache.get((role, title))
+      if option is not None:
+        return option
+    return None
+
+  def get_categories(self, category_type, names):
+    """Get categories of category_type with any of the names."""
+    if category_type not in self._categories_cache:
+      query = models.CategoryBase.query.filter(
+          models.CategoryBase.type == category_type)
+      self._categories_cache[category_type] = {
+          category.name.strip().lower(): category for category in query}
+    cache = self._categories_cache[category_type]
+    categories = []
+    for name in names:
+      category = cache.get(name.strip().lower())
+      if category is not None and category not in categories:
+        categories.append(category)
+    return categories
+
+  def get_access_control_role(self, name, object_type):
+    """Get access control role with name for object_type."""
+    if object_type not in self._roles_by_type_cache:
+      roles = models.AccessControlRole.query.filter_by(object_type=object_type)
+      self._roles_by_type_cache[object_type] = {
+          role.name.lower(): role for role in roles}
+    role = self._roles_by_type_cache[object_type].get(name.lower())
+    if role is None:
+      role = models.AccessControlRole.query.filter_by(
+          name=name, object_type=object_type).one()
+    return role
+
   @cached_property
   def mapped_snapshots(self):
     """Cached property of mapped to audit snapshots"""
@@ -372,6 +565,34 @@ class BlockConverter(object):
     csv_body = self.generate_csv_body()
     return csv_header, csv_body
 
+  def generate_csv_body_chunks(self, chunk_size):
+    """Generate csv body in chunks of at most chunk_size objects.
+
+    Unlike row_converters_from_ids, this only loads and keeps the objects of
+    the current chunk in memory, so it can be used for exporting blocks with
+    a large number of objects.
+    """
+    if self.ignore or not self.object_ids:
+      return
+    index = 0
+    for ids in list_chunks(sorted(self.object_ids), chunk_size):
+      objects = self.object_class.eager_query().filter(
+          self.object_class.id.in_(ids)).all()
+      csv_body = []
+      for obj in objects:
+        row = RowConverter(self, self.object_class, obj=obj,
+                           headers=self.headers, index=index)
+        row.handle_row_data()
+        csv_body.append(row.to_array(self.fields))
+        index += 1
+      yield csv_body
+
+  def to_array_chunks(self, chunk_size):
+    """Return tuple of csv_header and generator of csv_body chunks."""
+    csv_header = self.generate_csv_header()
+    csv_body_chunks = self.generate_csv_body_chunks(chunk_size)
+    return csv_header, csv_body_chunks
+
   def get_header_names(self):
     """ Get all posible user column names for current object """
     header_names = {
@@ -541,25 +762,96 @@ class BlockConverter(object):
     self._import_objects_prepare()
 
     if not self.converter.dry_run:
-      new_objects = []
       for row_converter in self.row_converters:
         row_converter.send_pre_commit_signals()
-      for row_converter in self.row_converters:
-        try:
-          row_converter.insert_object()
-          db.session.flush()
-        except exc.SQLAlchemyError as err:
-          db.session.rollback()
-          logger.exception("Import failed with: %s", err.message)
-          row_converter.add_error(errors.UNKNOWN_ERROR)
-        else:
-          if row_converter.is_new and not row_converter.ignore:
-            new_objects.append(row_converter.obj)
+      batch_size = getattr(settings, "IMPORT_FLUSH_BATCH_SIZE", 1)
+      if batch_size > 1:
+        self._insert_objects_in_batches(batch_size)
+      else:
+        self._insert_objects()
+      if self.ignore:
+        return
+      new_objects = [row_converter.obj
+                     for row_converter in self.row_converters
+                     if row_converter.is_new and not row_converter.ignore]
       self.send_collection_post_signals(new_objects)
       import_event = self.save_import()
       for row_converter in self.row_converters:
         row_converter.send_post_commit_signals(event=import_event)
 
+  def _insert_objects(self):
+    """Add objects to the session and flush them row by row."""
+    for row_converter in self.row_converters:
+      try:
+        row_converter.insert_object()
+        db.session.flush()
+      except exc.SQLAlchemyError as err:
+        db.session.rollback()
+        logger.exception("Import failed with: %s", err.message)
+        row_converter.add_error(errors.UNKNOWN_ERROR)
+
+  def _insert_objects_in_batches(self, batch_size):
+    """Add objects to the session and flush them in batches.
+
+    Changes made while setting up the rows are flushed first, so that every
+    batch savepoint contains only the objects of its rows.
+    """
+    try:
+      db.session.flush()
+    except exc.SQLAlchemyError as err:
+      db.session.rollback()
+      logger.exception("Import failed with: %s", err.message)
+      self.add_errors(errors.UNKNOWN_ERROR, line=self.offset + 2)
+      return
+    for batch in list_chunks(self.row_converters, batch_size):
+      self._flush_batch([row_converter for row_converter in batch
+                         if not row_converter.ignore])
+
+  def _flush_batch(self, row_converters):
+    """Insert and flush rows in a savepoint.
+
+    If the flush fails the savepoint is rolled back and both halves of the
+    rows are flushed separately, until the failing rows are found and get an
+    error.
+
+    Args:
+      row_converters: list of row converters to insert.
+    """
+    if not row_converters:
+      return
+    # Savepoint commits and rollbacks clear objects tracked for the revision
+    # log, so they are restored after the savepoint ends.
+    modified_objects = get_cache(create=True)
+    tracked = modified_objects and modified_objects.copy()
+    db.session.begin_nested()
+    try:
+      for row_converter in row_converters:
+        row_converter.insert_object()
+      db.session.flush()
+    except exc.SQLAlchemyError as err:
+      db.session.rollback()
+      self._restore_modified_objects(modified_objects, tracked)
+      if len(row_converters) == 1:
+        logger.exception("Import failed with: %s", err.message)
+        row_converters[0].add_error(errors.UNKNOWN_ERROR)
+        return
+      middle = len(row_converters) // 2
+      self._flush_batch(row_converters[:middle])
+      self._flush_batch(row_converters[middle:])
+    else:
+      tracked = modified_objects and modified_objects.copy()
+      db.session.commit()
+      self._restore_modified_objects(modified_objects, tracked)
+
+  @staticmethod
+  def _restore_modified_objects(modified_objects, tracked):
+    """Restore the modified objects cache to the tracked copy."""
+    if modified_objects is None:
+      return
+    modified_objects.new = tracked.new
+    modified_objects.dirty = tracked.dirty
+    modified_objects.deleted = tracked.deleted
+
   def clean_session_from_ignored_objs(self):
     """Clean DB session from ignored objects.
 
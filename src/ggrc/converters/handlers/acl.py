@@ -13,10 +13,8 @@ class AccessControlRoleColumnHandler(handlers.UsersColumnHandler):
   def __init__(self, row_converter, key, **options):
     super(AccessControlRoleColumnHandler, self).__init__(
         row_converter, key, **options)
-    self.role = models.AccessControlRole.query.filter_by(
-        name=self.display_name,
-        object_type=self.row_converter.obj.type
-    ).one()
+    self.role = self.row_converter.block_converter.get_access_control_role(
+        self.display_name, self.row_converter.obj.type)
 
   def _add_people(self, people_list):
     """Add people to AC list with the current role."""
@@ -7,19 +7,14 @@ from logging import getLogger
 from datetime import date
 from dateutil.parser import parse
 
-from sqlalchemy import and_
-from sqlalchemy import or_
-
 from ggrc import db
 from ggrc.converters import errors
 from ggrc.converters import get_exportables
 from ggrc.login import get_current_user
 from ggrc.models import Audit
-from ggrc.models import CategoryBase
 from ggrc.models import Contract
 from ggrc.models import Assessment
 from ggrc.models import ObjectPerson
-from ggrc.models import Option
 from ggrc.models import Person
 from ggrc.models import Policy
 from ggrc.models import Program
@@ -71,11 +66,9 @@ class ColumnHandler(object):
       return
     if not self.row_converter.obj:
       return
-    nr_duplicates = self.row_converter.object_class.query.filter(and_(
-        getattr(self.row_converter.object_class, self.key) == self.value,
-        self.row_converter.object_class.id != self.row_converter.obj.id
-    )).count()
-    if nr_duplicates > 0:
+    block_converter = self.row_converter.block_converter
+    if block_converter.has_duplicate(self.key, self.value,
+                                     self.row_converter.obj.id):
       self.add_error(errors.DUPLICATE_VALUE,
                      column_name=self.key,
                      value=self.value)
@@ -224,7 +217,8 @@ class UserColumnHandler(ColumnHandler):
   def get_person(self, email):
     new_objects = self.row_converter.block_converter.converter.new_objects
     if email not in new_objects[Person]:
-      new_objects[Person][email] = Person.query.filter_by(email=email).first()
+      new_objects[Person][email] = \
+          self.row_converter.block_converter.get_person(email)
     return new_objects[Person].get(email)
 
   def parse_item(self):
@@ -414,8 +408,9 @@ class MappingColumnHandler(ColumnHandler):
     lines = set(self.raw_value.splitlines())
     slugs = set([slug.lower() for slug in lines if slug.strip()])
     objects = []
+    block_converter = self.row_converter.block_converter
     for slug in slugs:
-      obj = class_.query.filter_by(slug=slug).first()
+      obj = block_converter.find_object(class_, "slug", slug)
       if obj:
         if permissions.is_allowed_update_for(obj):
           objects.append(obj)
@@ -499,11 +494,8 @@ class OptionColumnHandler(ColumnHandler):
       return None
     prefixed_key = "{}_{}".format(
         self.row_converter.object_class._inflector.table_singular, self.key)
-    item = Option.query.filter(
-        and_(Option.title == self.raw_value.strip(),
-             or_(Option.role == self.key,
-                 Option.role == prefixed_key))).first()
-    return item
+    return self.row_converter.block_converter.get_option(
+        [self.key, prefixed_key], self.raw_value)
 
   def get_value(self):
     option = getattr(self.row_converter.obj, self.key, None)
@@ -532,7 +524,8 @@ class ParentColumnHandler(ColumnHandler):
     slug = self.raw_value
     obj = self.new_objects.get(self.parent, {}).get(slug)
     if obj is None:
-      obj = self.parent.query.filter(self.parent.slug == slug).first()
+      obj = self.row_converter.block_converter.find_object(
+          self.parent, "slug", slug)
     if obj is None:
       self.add_error(errors.UNKNOWN_OBJECT,
                      object_type=self.parent._inflector.human_singular.title(),
@@ -572,9 +565,7 @@ class ParentColumnHandler(ColumnHandler):
 class ProgramColumnHandler(ParentColumnHandler):
   """Handler for program column on audit imports."""
 
-  def __init__(self, row_converter, key, **options):
-    self.parent = Program
-    super(ProgramColumnHandler, self).__init__(row_converter, key, **options)
+  parent = Program
 
   def set_obj_attr(self):
     if self.row_converter.is_new:
@@ -586,7 +577,8 @@ class SectionDirectiveColumnHandler(MappingColumnHandler):
   def get_directive_from_slug(self, directive_class, slug):
     if slug in self.new_objects[directive_class]:
       return self.new_objects[directive_class][slug]
-    return directive_class.query.filter_by(slug=slug).first()
+    return self.row_converter.block_converter.find_object(
+        directive_class, "slug", slug)
 
   def parse_item(self):
     """ get a directive from slug """
@@ -733,10 +725,8 @@ class CategoryColumnHandler(ColumnHandler):
     names = [name for name in names if name != ""]
     if not names:
       return None
-    categories = CategoryBase.query.filter(and_(
-        CategoryBase.name.in_(names),
-        CategoryBase.type == self.category_base_type
-    )).all()
+    categories = self.row_converter.block_converter.get_categories(
+        self.category_base_type, names)
     category_names = set([c.name.strip() for c in categories])
     for name in names:
       if name not in category_names:
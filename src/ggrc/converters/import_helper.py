@@ -67,6 +67,28 @@ def generate_csv_string(csv_data):
   return body
 
 
+def generate_csv_chunks(csv_chunks, width):
+  """Turn chunks of 2d string array into strings of a single csv file.
+
+  Joining the generated strings gives the same result as generate_csv_string
+  for the joined chunks, as long as no row is wider than width.
+
+  Args:
+    csv_chunks: iterable of 2d string arrays.
+    width (int): number of columns all rows are expanded to.
+  """
+  for csv_data in csv_chunks:
+    output_buffer = StringIO()
+    writer = csv.writer(output_buffer)
+    for row in utf_8_encode_array(csv_data):
+      row.extend([""] * (width - len(row)))
+      writer.writerow(row)
+    body = output_buffer.getvalue()
+    output_buffer.close()
+    if body:
+      yield body
+
+
 def extract_relevant_data(csv_data):
   """ Split csv data into data and metadata """
   striped_data = [[unicode.strip(c) for c in line]
@@ -106,8 +106,11 @@ class SnapshotBlockConverter(object):
     object content to show the version and what audit the snapshot of the
     object belongs to.
     """
-    content = {}
-    content.update(snapshot.revision.content)
+    revision = snapshot.revision
+    content = {
+        key: revision.get_content_value(key)
+        for key in self._content_keys
+    }
     content["audit"] = {"type": "Audit", "id": snapshot.parent_id}
     content["slug"] = u"*{}".format(content["slug"])
     content["revision_date"] = unicode(snapshot.revision.created_at)
@@ -115,19 +118,37 @@ class SnapshotBlockConverter(object):
       content.update(self._generate_mapping_content(snapshot))
     return content
 
+  @cached_property
+  def _content_keys(self):
+    """Revision content fields that are read for the export."""
+    keys = set(self._attribute_name_map)
+    keys.update((
+        "id",
+        "slug",
+        "access_control_list",
+        "custom_attribute_definitions",
+        "custom_attribute_values",
+    ))
+    return keys
+
+  @cached_property
+  def _loaded_snapshots(self):
+    """List of all snapshots in the current block without export content."""
+    if not self.ids:
+      return []
+    return models.Snapshot.eager_query().filter(
+        models.Snapshot.id.in_(self.ids)
+    ).all()
+
   @cached_property
   def snapshots(self):
     """List of all snapshots in the current block.
 
     The content of the given snapshots also contains the mapped audit field.
+    Only revision content fields that are exported are decoded.
     """
     with benchmark("Gather selected snapshots"):
-      if not self.ids:
-        return []
-      snapshots = models.Snapshot.eager_query().filter(
-          models.Snapshot.id.in_(self.ids)
-      ).all()
-
+      snapshots = self._loaded_snapshots
       for snapshot in snapshots:  # add special snapshot attribute
         snapshot.content = self._extend_revision_content(snapshot)
       return snapshots
@@ -135,7 +156,7 @@ class SnapshotBlockConverter(object):
   @cached_property
   def child_type(self):
     """Name of snapshot object types."""
-    child_types = {snapshot.child_type for snapshot in self.snapshots}
+    child_types = {snapshot.child_type for snapshot in self._loaded_snapshots}
     assert len(child_types) <= 1
     return child_types.pop() if child_types else ""
 
@@ -341,3 +362,12 @@ class SnapshotBlockConverter(object):
   def to_array(self):
     """Get 2D list representing the CSV file."""
     return self._header_list, self._body_list
+
+  def to_array_chunks(self, chunk_size):
+    """Get CSV header and an iterator with the whole CSV body as one chunk.
+
+    Snapshot headers and stubs depend on all exported snapshots, so snapshot
+    blocks are not split into chunks.
+    """
+    # pylint: disable=unused-argument
+    return self._header_list, iter([self._body_list])
@@ -14,19 +14,37 @@ Relationships are tuples with:
 Glossary:
 aggregate object = object from which the computed value is read
 computed object = object which will get the new computed value
+
+In incremental mode the stored attribute values are used as materialized
+state of "max" aggregates. A changed aggregate object only updates computed
+objects whose stored maximum it exceeds, and computed objects are recomputed
+from all their aggregates only when the change could lower the maximum or
+when no value was stored for them yet.
 """
 
 import datetime
 import collections
+import logging
 
 import sqlalchemy as sa
 
 from ggrc import db
 from ggrc import login
+from ggrc import settings
 from ggrc.utils import revisions as revision_utils
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 from ggrc.models import all_models as models
 
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Aggregate functions whose values can be updated from the changed
+# aggregates and the stored value only.
+INCREMENTAL_FUNCTIONS = {"max"}
+
+STORE_CHUNK_SIZE = 1000
+
 # Statement for inserting attribute values without explicit call of delete.
 ATTRIBUTE_REPLACE_STATEMENT = """
   REPLACE INTO attributes (
@@ -108,10 +126,14 @@ def get_aggregate_field(attribute):
   return afn.split()[1]
 
 
+def get_aggregate_function_name(attribute):
+  afn = attribute.attribute_definition.attribute_type.aggregate_function
+  return afn.split()[2]
+
+
 def get_aggregate_function(attribute):
   """Get actual computed function from aggregate function field."""
-  afn = attribute.attribute_definition.attribute_type.aggregate_function
-  function_name = afn.split()[2]
+  function_name = get_aggregate_function_name(attribute)
   if function_name == "max":
     def max_(aggregate_values, rel_map):
       """Get maximum value and id from which the value was taken."""
@@ -155,7 +177,7 @@ def _get_group_key(revision, aggregate_type, computed_object):
   elif revision.resource_type == computed_object:
     key = "computed_objects"
   elif (revision.resource_type == "Snapshot" and
-        revision.content["child_type"] == computed_object):
+        revision.get_content_value("child_type") == computed_object):
     key = "destination_snapshots"
   elif (revision.resource_type == "Relationship" and
         revision.source_type in related_types and
@@ -196,19 +218,24 @@ def _objects_from_snapshots(snapshots):
   ).distinct())
 
 
-def _get_objects_from_aggregates(aggregate_objects, computed_object_type):
-  """Get tuples of all original objects linked to aggregate_objects.
+def _get_aggregate_relationships(aggregate_objects, computed_object_type):
+  """Get mappings between aggregate_objects and computed objects.
 
   args:
     aggregate_objects: tuples of object type and object id
     computed_object_type: object type of the destination for computed
         attribute. Object to which the computed attribute belongs.
+
+  Returns:
+    set of (aggregate_type, aggregate_id, computed_type, computed_id) tuples.
   """
   if not aggregate_objects:
     return set()
 
   # Related original objects
   src = db.session.query(
+      models.Relationship.destination_type,
+      models.Relationship.destination_id,
       models.Relationship.source_type,
       models.Relationship.source_id,
   ).filter(
@@ -219,6 +246,8 @@ def _get_objects_from_aggregates(aggregate_objects, computed_object_type):
       models.Relationship.source_type == computed_object_type,
   )
   dst = db.session.query(
+      models.Relationship.source_type,
+      models.Relationship.source_id,
       models.Relationship.destination_type,
       models.Relationship.destination_id,
   ).filter(
@@ -231,8 +260,12 @@ def _get_objects_from_aggregates(aggregate_objects, computed_object_type):
 
   # Related snapshots
   snap_dst = db.session.query(
+      models.Relationship.source_type,
+      models.Relationship.source_id,
       models.Snapshot.child_type,
       models.Snapshot.child_id,
+  ).select_from(
+      models.Snapshot,
   ).join(
       models.Relationship,
       sa.and_(
@@ -247,8 +280,12 @@ def _get_objects_from_aggregates(aggregate_objects, computed_object_type):
       ).in_(aggregate_objects),
   )
   snap_src = db.session.query(
+      models.Relationship.destination_type,
+      models.Relationship.destination_id,
       models.Snapshot.child_type,
       models.Snapshot.child_id,
+  ).select_from(
+      models.Snapshot,
   ).join(
       models.Relationship,
       sa.and_(
@@ -269,6 +306,21 @@ def _get_objects_from_aggregates(aggregate_objects, computed_object_type):
   return set(src) | set(dst) | set(snap_src) | set(snap_dst)
 
 
+def _get_objects_from_aggregates(aggregate_objects, computed_object_type):
+  """Get tuples of all original objects linked to aggregate_objects.
+
+  args:
+    aggregate_objects: tuples of object type and object id
+    computed_object_type: object type of the destination for computed
+        attribute. Object to which the computed attribute belongs.
+  """
+  return {
+      (computed_type, computed_id)
+      for _, _, computed_type, computed_id in _get_aggregate_relationships(
+          aggregate_objects, computed_object_type)
+  }
+
+
 def _get_objects_from_deleted(aggregate_deleted, aggregate_field):
   """Get objects with deleted source.
 
@@ -308,6 +360,35 @@ def get_affected_objects(attribute_groups):
   return affected_objects
 
 
+def get_incremental_objects(attribute_groups):
+  """Split affected objects into recomputed objects and delta values.
+
+  Only attributes with an aggregate function from INCREMENTAL_FUNCTIONS are
+  updated from the changed aggregates, all affected objects of other
+  attributes are recomputed.
+
+  Returns:
+    tuple of affected objects that must be recomputed from all their
+    aggregates and of delta values, both grouped by attributes.
+  """
+  affected_objects = {}
+  delta_values = {}
+  for attr, groups in attribute_groups.iteritems():
+    if get_aggregate_function_name(attr) not in INCREMENTAL_FUNCTIONS:
+      affected_objects.update(get_affected_objects({attr: groups}))
+      continue
+    objects = set()
+    objects.update(groups["computed_objects"])
+    objects.update(_objects_from_snapshots(groups["destination_snapshots"]))
+    objects.update(_get_objects_from_deleted(
+        groups["aggregate_deleted"],
+        get_aggregate_field(attr)
+    ))
+    delta_values[attr] = get_delta_values(attr, groups, objects)
+    affected_objects[attr] = objects
+  return affected_objects, delta_values
+
+
 def _get_aggregate_values(attr, aggregate_objects):
   """Get values from aggregate objects.
 
@@ -349,8 +430,31 @@ def _get_relationships_map(relationships):
   return rel_map
 
 
-def compute_values(affected_objects, all_relationships, snapshot_map):
-  """Compute new values for affected objects."""
+def _set_computed_value(computed_values, obj, snapshot_map,
+                        aggregate_type, source_id, value):
+  """Set computed value of an object and its snapshots."""
+  for key in [obj] + [(u"Snapshot", snapshot_id)
+                      for snapshot_id in snapshot_map.get(obj, set())]:
+    computed_values[key] = {
+        "source_type": aggregate_type,
+        "source_id": source_id,
+        "value_datetime": value,
+        "value_integer": None,
+        "value_string": None,
+    }
+
+
+def compute_values(affected_objects, all_relationships, snapshot_map,
+                   delta_values=None):
+  """Compute new values for affected objects.
+
+  Args:
+    affected_objects: objects that are recomputed from all their aggregates.
+    all_relationships: relationships of affected objects and aggregates.
+    snapshot_map: snapshot ids of computed objects.
+    delta_values: dict of (source_id, value) pairs for objects that are
+      updated from changed aggregates only, grouped by attributes.
+  """
 
   computed_values = collections.defaultdict(dict)
 
@@ -363,26 +467,90 @@ def compute_values(affected_objects, all_relationships, snapshot_map):
     aggregate_function = get_aggregate_function(attr)
     for obj in objects:
       source_id, value = aggregate_function(aggregate_values, rel_map[obj])
+      _set_computed_value(computed_values[attr], obj, snapshot_map,
+                          aggregate_type, source_id, value)
 
-      computed_values[attr][obj] = {
-          "source_type": aggregate_type,
-          "source_id": source_id,
-          "value_datetime": value,
-          "value_integer": None,
-          "value_string": None,
-      }
-      for snapshot_id in snapshot_map.get(obj, set()):
-        computed_values[attr][(u"Snapshot", snapshot_id)] = {
-            "source_type": aggregate_type,
-            "source_id": source_id,
-            "value_datetime": value,
-            "value_integer": None,
-            "value_string": None,
-        }
+  for attr, values in (delta_values or {}).iteritems():
+    aggregate_type = get_aggregate_type(attr)
+    for obj, (source_id, value) in values.iteritems():
+      _set_computed_value(computed_values[attr], obj, snapshot_map,
+                          aggregate_type, source_id, value)
 
   return computed_values
 
 
+def _get_stored_values(attr, objects):
+  """Get stored (source_id, value) pairs of attr for objects."""
+  if not objects:
+    return {}
+  query = db.session.query(
+      models.Attributes.object_type,
+      models.Attributes.object_id,
+      models.Attributes.source_id,
+      models.Attributes.value_datetime,
+  ).filter(
+      models.Attributes.attribute_template_id == attr.attribute_template_id,
+      sa.tuple_(
+          models.Attributes.object_type,
+          models.Attributes.object_id,
+      ).in_(objects),
+  )
+  return {(object_type, object_id): (source_id, value)
+          for object_type, object_id, source_id, value in query}
+
+
+def _is_greater(value, source_id, stored_value, stored_source_id):
+  """Compare (value, source id) pairs the way max_ compares them."""
+  if value is None:
+    return False
+  if stored_value is None:
+    return True
+  return (value, source_id) > (stored_value, stored_source_id)
+
+
+def get_delta_values(attr, groups, recomputed):
+  """Get values of objects affected by changed aggregates of attr.
+
+  Args:
+    attr: computed attribute template.
+    groups: revision groups of the attribute.
+    recomputed: objects that are recomputed anyway, the function adds objects
+      whose value can not be updated from the changed aggregates.
+
+  Returns:
+    dict of new (source_id, value) pairs of objects whose maximum grew.
+    Objects whose maximum is not affected by the changes are left out.
+  """
+  relationships = _get_aggregate_relationships(
+      groups["aggregate_objects"], attr.object_template.name)
+  changed_aggregates = collections.defaultdict(set)
+  for _, aggregate_id, computed_type, computed_id in relationships:
+    obj = (computed_type, computed_id)
+    if obj not in recomputed:
+      changed_aggregates[obj].add(aggregate_id)
+  if not changed_aggregates:
+    return {}
+
+  aggregate_values = _get_aggregate_values(attr, groups["aggregate_objects"])
+  stored_values = _get_stored_values(attr, changed_aggregates.keys())
+  aggregate_function = get_aggregate_function(attr)
+  delta_values = {}
+  for obj, aggregate_ids in changed_aggregates.iteritems():
+    if obj not in stored_values:
+      recomputed.add(obj)
+      continue
+    stored_source_id, stored_value = stored_values[obj]
+    source_id, value = aggregate_function(aggregate_values, aggregate_ids)
+    if _is_greater(value, source_id, stored_value, stored_source_id):
+      delta_values[obj] = (source_id, value)
+    elif (stored_source_id in aggregate_ids and
+          (source_id, value) != (stored_source_id, stored_value)):
+      # The aggregate holding the maximum got a lower value, any of the
+      # unchanged aggregates could hold the maximum now.
+      recomputed.add(obj)
+  return delta_values
+
+
 def _get_relationships(aggregate_type, objects):
   """Get all mappings between aggregate_type and objects."""
   # Related original objects
@@ -555,11 +723,15 @@ def get_index_data(computed_values, snapshot_tag_map):
 
 
 def store_data(attributes_data, index_data):
-  """Store new computed values to the database."""
-  if attributes_data:
-    db.session.execute(ATTRIBUTE_REPLACE_STATEMENT, attributes_data)
-  if index_data:
-    db.session.execute(INDEX_REPLACE_STATEMENT, index_data)
+  """Store new computed values to the database.
+
+  Rows are written in chunks of STORE_CHUNK_SIZE to keep the size of each
+  statement bounded, all chunks are committed together.
+  """
+  for chunk in list_chunks(attributes_data, STORE_CHUNK_SIZE):
+    db.session.execute(ATTRIBUTE_REPLACE_STATEMENT, chunk)
+  for chunk in list_chunks(index_data, STORE_CHUNK_SIZE):
+    db.session.execute(INDEX_REPLACE_STATEMENT, chunk)
   db.session.commit()
 
 
@@ -587,14 +759,27 @@ def delete_all_computed_values():
 def compute_attributes(revision_ids):
   """Compute new values based an changed objects.
 
+  Values are computed incrementally if COMPUTED_ATTRIBUTES_MODE setting is
+  "incremental", full recomputation of all latest revisions is never
+  incremental.
+
   Args:
-    objects: array of object stubs of modified objects.
+    revision_ids: ids of revisions of modified objects or "all_latest".
+
+  Returns:
+    dict with counts of stored and fully recomputed values.
   """
 
   with benchmark("Compute attributes"):
 
     if not revision_ids:
-      return
+      return {"touched": 0, "recomputed": 0}
+
+    incremental = (
+        getattr(settings, "COMPUTED_ATTRIBUTES_MODE", "full") ==
+        "incremental" and
+        revision_ids != "all_latest"
+    )
 
     with benchmark("Get revisions."):
       if revision_ids == "all_latest":
@@ -609,15 +794,25 @@ def compute_attributes(revision_ids):
     with benchmark("Group revisions by computed attributes"):
       attribute_groups = group_revisions(attributes, revisions)
     with benchmark("get all objects affected by computed attributes"):
-      affected_objects = get_affected_objects(attribute_groups)
+      if incremental:
+        affected_objects, delta_values = get_incremental_objects(
+            attribute_groups)
+      else:
+        affected_objects = get_affected_objects(attribute_groups)
+        delta_values = {}
     with benchmark("Get all relationships for these computed objects"):
       relationships = get_relationships(affected_objects)
     with benchmark("Get snapshot data"):
-      snapshot_map, snapshot_tag_map = get_snapshot_data(affected_objects)
+      touched_objects = collections.defaultdict(set)
+      for attr, objects in affected_objects.iteritems():
+        touched_objects[attr].update(objects)
+      for attr, values in delta_values.iteritems():
+        touched_objects[attr].update(values)
+      snapshot_map, snapshot_tag_map = get_snapshot_data(touched_objects)
 
     with benchmark("Compute values"):
       computed_values = compute_values(affected_objects, relationships,
-                                       snapshot_map)
+                                       snapshot_map, delta_values)
 
     with benchmark("Get computed attributes data"):
       attributes_data = get_attributes_data(computed_values)
@@ -625,3 +820,13 @@ def compute_attributes(revision_ids):
       index_data = get_index_data(computed_values, snapshot_tag_map)
     with benchmark("Store attribute data and full-text index data"):
       store_data(attributes_data, index_data)
+
+    stats = {
+        "touched": sum(len(objects) for objects in touched_objects.values()),
+        "recomputed": sum(len(objects)
+                          for objects in affected_objects.values()),
+    }
+    logger.info("Computed attributes of %(touched)s objects, "
+                "%(recomputed)s of them recomputed from all aggregates.",
+                stats)
+    return stats
@@ -1,6 +1,7 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 """Full text index engine for Mysql DB backend"""
+import datetime
 from collections import defaultdict
 
 from sqlalchemy import and_
@@ -17,6 +18,7 @@ from sqlalchemy.sql.expression import select
 from sqlalchemy import event
 
 from ggrc import db
+from ggrc import settings
 from ggrc.login import is_creator
 from ggrc.models import all_models
 from ggrc.models.inflector import get_model
@@ -49,6 +51,22 @@ class MysqlRecordProperty(db.Model):
     )
 
 
+class FulltextIndexQueue(db.Model):
+  """Db model for objects waiting to be reindexed in deferred index mode."""
+  __tablename__ = 'fulltext_index_queue'
+
+  id = db.Column(db.Integer, primary_key=True)
+  type = db.Column(db.String(64), nullable=False)
+  key = db.Column(db.Integer, nullable=False)
+  created_at = db.Column(db.DateTime, nullable=False)
+
+  @declared_attr
+  def __table_args__(cls):  # pylint: disable=no-self-argument
+    return (
+        db.Index('ix_{}_created_at'.format(cls.__tablename__), 'created_at'),
+    )
+
+
 class MysqlIndexer(SqlIndexer):
   record_type = MysqlRecordProperty
 
@@ -230,11 +248,70 @@ class MysqlIndexer(SqlIndexer):
 Indexer = MysqlIndexer
 
 
+def is_index_deferred():
+  return getattr(settings, 'FULLTEXT_INDEX_MODE', 'inline') == 'deferred'
+
+
+def enqueue_reindex(models_ids):
+  """Add objects to the index queue.
+
+  Args:
+    models_ids: dict of model name -> iterable of ids to reindex.
+  """
+  now = datetime.datetime.utcnow()
+  rows = [{"type": model_name, "key": id_, "created_at": now}
+          for model_name, ids in models_ids.iteritems()
+          for id_ in ids]
+  if rows:
+    db.session.execute(FulltextIndexQueue.__table__.insert(), rows)
+
+
+def _reindex_entries(entries):
+  """Reindex objects of index queue entries, each object once."""
+  models_ids_to_reindex = defaultdict(set)
+  for entry in entries:
+    models_ids_to_reindex[entry.type].add(entry.key)
+  for model_name, ids in models_ids_to_reindex.iteritems():
+    model = get_model(model_name)
+    if model:
+      model.bulk_record_update_for(ids)
+
+
+def process_index_queue(batch_size=None):
+  """Reindex all queued objects in batches.
+
+  Duplicate entries of an object within a batch are reindexed once. Only the
+  processed entries are removed, so objects queued by concurrent requests are
+  reindexed by a later batch.
+
+  Returns:
+    number of processed queue entries.
+  """
+  batch_size = batch_size or getattr(settings, 'FULLTEXT_INDEX_BATCH_SIZE',
+                                     1000)
+  processed = 0
+  while True:
+    entries = db.session.query(
+        FulltextIndexQueue.id,
+        FulltextIndexQueue.type,
+        FulltextIndexQueue.key,
+    ).order_by(FulltextIndexQueue.id).limit(batch_size).all()
+    if not entries:
+      return processed
+    _reindex_entries(entries)
+    db.session.query(FulltextIndexQueue).filter(
+        FulltextIndexQueue.id.in_([entry.id for entry in entries])
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    processed += len(entries)
+
+
 @event.listens_for(db.session.__class__, 'before_commit')
 def update_indexer(session):  # pylint:disable=unused-argument
   """General function to update index
 
-  for all updated related instance before commit"""
+  for all updated related instance before commit. In deferred index mode
+  the instances are only added to the index queue."""
   models_ids_to_reindex = defaultdict(set)
   db.session.flush()
   for for_index in getattr(db.session, 'reindex_set', set()):
@@ -245,6 +322,9 @@ def update_indexer(session):  # pylint:disable=unused-argument
       models_ids_to_reindex[type_name].add(id_value)
   db.session.expire_all()  # expire required to fix declared_attr cached value
   db.session.reindex_set = set()
+  if is_index_deferred():
+    enqueue_reindex(models_ids_to_reindex)
+    return
   for model_name, ids in models_ids_to_reindex.iteritems():
     get_model(model_name).bulk_record_update_for(ids)
 
@@ -0,0 +1,202 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Full text reindex of all indexed objects.
+
+Objects of every reindexed model are split into chunks of consecutive ids.
+The chunks are reindexed one by one, or by a pool of worker processes when
+REINDEX_WORKERS is greater than 1. Every finished chunk is recorded in the
+result of the reindex background task. Failed tasks are not retried by the
+task queue, but they can be resumed with /admin/reindex/<task id>/resume,
+which continues with the chunks that were not finished yet.
+"""
+
+import copy
+import logging
+import multiprocessing
+import time
+
+from ggrc import db
+from ggrc import settings
+from ggrc.fulltext import mixin
+from ggrc.models import all_models
+from ggrc.snapshotter.indexer import reindex_snapshots
+
+
+logger = logging.getLogger(__name__)
+
+TASK_NAME = "reindex"
+
+
+def get_reindexed_models():
+  """Get a dict of all models that are reindexed by a full reindex."""
+  reindexed_models = {
+      m.__name__: m for m in all_models.all_models
+      if issubclass(m, mixin.Indexed) and m.REQUIRED_GLOBAL_REINDEX
+  }
+  reindexed_models["Snapshot"] = all_models.Snapshot
+  return reindexed_models
+
+
+def get_model_order(model_names):
+  """Get model names in the order in which they are reindexed."""
+  return sorted(name for name in model_names if name != "Snapshot") + \
+      ["Snapshot"]
+
+
+def reindex_chunk(model_name, start, end):
+  """Reindex objects with ids from start up to but not including end.
+
+  Args:
+    model_name (str): name of the reindexed model.
+    start (int): id of the first object in the chunk.
+    end (int): id of the first object in the next chunk or None for the last
+      chunk.
+
+  Returns:
+    tuple of the number of reindexed objects and seconds spent.
+  """
+  started = time.time()
+  model = get_reindexed_models()[model_name]
+  query = db.session.query(model.id).filter(model.id >= start)
+  if end is not None:
+    query = query.filter(model.id < end)
+  ids = [row.id for row in query]
+  if model_name == "Snapshot":
+    reindex_snapshots(ids)
+  else:
+    model.bulk_record_update_for(ids)
+  db.session.commit()
+  return len(ids), time.time() - started
+
+
+def _init_worker():
+  """Set up application context for a reindex worker process."""
+  from ggrc.app import app
+  app.app_context().push()
+
+
+def _reindex_chunk_in_worker(chunk):
+  """Reindex a (model name, index, start, end) chunk in a worker process."""
+  model_name, index, start, end = chunk
+  return (model_name, index) + reindex_chunk(model_name, start, end)
+
+
+def get_unfinished_progress(task):
+  """Get progress of an unfinished reindex that task should continue.
+
+  Only a resumed task continues from its own progress. A new task reindexes
+  all objects, since they may have changed after an older task finished
+  some of its chunks.
+  """
+  if task.result and task.result.get("progress"):
+    return copy.deepcopy(task.result["progress"])
+  return {}
+
+
+class Reindexer(object):
+  """Reindex all objects in chunks and keep progress of finished chunks.
+
+  The progress dict contains an entry for every reindexed model:
+    chunks: ids of the first object in every chunk.
+    done: indexes of finished chunks.
+    records: number of reindexed objects.
+    seconds: time spent on reindexing finished chunks.
+    records_per_second: reindex throughput for the model.
+  """
+
+  def __init__(self, task=None, chunk_size=None, workers=None):
+    self.task = task
+    self.chunk_size = chunk_size or settings.REINDEX_CHUNK_SIZE
+    self.workers = workers or settings.REINDEX_WORKERS
+    self.models = get_reindexed_models()
+    self.progress = get_unfinished_progress(task) if task else {}
+
+  def plan(self):
+    """Split objects of models without progress into chunks."""
+    for model_name in get_model_order(self.models):
+      if model_name in self.progress:
+        continue
+      model = self.models[model_name]
+      ids = [row.id for row in db.session.query(model.id).order_by(model.id)]
+      self.progress[model_name] = {
+          "chunks": ids[::self.chunk_size],
+          "done": [],
+          "records": 0,
+          "seconds": 0.0,
+          "records_per_second": 0.0,
+      }
+    self.save_progress()
+
+  def get_pending_chunks(self):
+    """Get a list of (model name, index, start, end) of unfinished chunks."""
+    pending = []
+    for model_name in get_model_order(self.models):
+      model_progress = self.progress[model_name]
+      chunks = model_progress["chunks"]
+      done = set(model_progress["done"])
+      for index, start in enumerate(chunks):
+        if index in done:
+          continue
+        end = chunks[index + 1] if index + 1 < len(chunks) else None
+        pending.append((model_name, index, start, end))
+    return pending
+
+  def save_progress(self):
+    """Store current progress in the task result."""
+    if self.task is None:
+      return
+    result = dict(self.task.result or {})
+    result["progress"] = copy.deepcopy(self.progress)
+    self.task.result = result
+    db.session.add(self.task)
+    db.session.commit()
+
+  def chunk_done(self, model_name, index, records, seconds):
+    """Record a finished chunk and update throughput of its model."""
+    model_progress = self.progress[model_name]
+    model_progress["done"].append(index)
+    model_progress["records"] += records
+    model_progress["seconds"] += seconds
+    if model_progress["seconds"]:
+      model_progress["records_per_second"] = round(
+          model_progress["records"] / model_progress["seconds"], 1)
+    self.save_progress()
+    if len(model_progress["done"]) == len(model_progress["chunks"]):
+      logger.info("Reindexed %s: %s records in %.1f s (%s records/sec)",
+                  model_name, model_progress["records"],
+                  model_progress["seconds"],
+                  model_progress["records_per_second"])
+
+  def _run_serial(self, chunks):
+    for model_name, index, start, end in chunks:
+      records, seconds = reindex_chunk(model_name, start, end)
+      self.chunk_done(model_name, index, records, seconds)
+
+  def _run_parallel(self, chunks):
+    """Reindex chunks in worker processes.
+
+    Open database connections are closed before the workers are forked, so
+    that no connection is shared between processes.
+    """
+    db.session.commit()
+    db.engine.dispose()
+    pool = multiprocessing.Pool(self.workers, initializer=_init_worker)
+    try:
+      for result in pool.imap_unordered(_reindex_chunk_in_worker, chunks):
+        self.chunk_done(*result)
+    finally:
+      pool.terminate()
+      pool.join()
+
+  def run(self):
+    """Reindex all chunks that are not done yet and return the progress."""
+    self.plan()
+    chunks = self.get_pending_chunks()
+    logger.info("Reindexing %s chunks with %s workers",
+                len(chunks), self.workers)
+    if self.workers > 1 and len(chunks) > 1:
+      self._run_parallel(chunks)
+    else:
+      self._run_serial(chunks)
+    return self.progress
@@ -0,0 +1,39 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add fulltext index queue table
+
+Create Date: 2017-09-20 11:02:15.104822
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3e7a8bb1c21f'
+down_revision = '434683ceff87'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'fulltext_index_queue',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('type', sa.String(length=64), nullable=False),
+      sa.Column('key', sa.Integer(), nullable=False),
+      sa.Column('created_at', sa.DateTime(), nullable=False),
+      sa.PrimaryKeyConstraint('id')
+  )
+  op.create_index('ix_fulltext_index_queue_created_at',
+                  'fulltext_index_queue', ['created_at'], unique=False)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_index('ix_fulltext_index_queue_created_at',
+                table_name='fulltext_index_queue')
+  op.drop_table('fulltext_index_queue')
@@ -0,0 +1,27 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add index on revisions resource type and id
+
+Create Date: 2017-09-21 09:34:12.517943
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '2a5b9d4e1c07'
+down_revision = '3e7a8bb1c21f'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_index('ix_revisions_resource_type_id', 'revisions',
+                  ['resource_type', 'id'], unique=False)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_index('ix_revisions_resource_type_id', table_name='revisions')
@@ -0,0 +1,67 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add compressed content column to revisions
+
+Create Date: 2017-09-25 12:03:11.402817
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from alembic import op
+
+from ggrc.models.types import LazyJsonDict
+from ggrc.utils import as_json
+
+# revision identifiers, used by Alembic.
+revision = '5c1b7e0f9a2d'
+down_revision = '2a5b9d4e1c07'
+
+CHUNK_SIZE = 1000
+
+revisions_table = sa.sql.table(
+    "revisions",
+    sa.sql.column("id", sa.Integer),
+    sa.sql.column("content", sa.Text),
+    sa.sql.column("compressed_content", sa.LargeBinary),
+)
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.add_column('revisions', sa.Column('compressed_content', mysql.LONGBLOB(),
+                                       nullable=True))
+  op.alter_column('revisions', 'content', existing_type=mysql.LONGTEXT(),
+                  nullable=True)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  connection = op.get_bind()
+  while True:
+    rows = connection.execute(
+        sa.select([
+            revisions_table.c.id,
+            revisions_table.c.compressed_content,
+        ]).where(
+            revisions_table.c.compressed_content.isnot(None)
+        ).limit(CHUNK_SIZE)
+    ).fetchall()
+    if not rows:
+      break
+    for row in rows:
+      connection.execute(
+          revisions_table.update().where(
+              revisions_table.c.id == row.id
+          ).values(
+              content=as_json(LazyJsonDict(row.compressed_content).copy()),
+              compressed_content=None,
+          )
+      )
+  op.alter_column('revisions', 'content', existing_type=mysql.LONGTEXT(),
+                  nullable=False)
+  op.drop_column('revisions', 'compressed_content')
@@ -0,0 +1,52 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add relationship neighbors table
+
+Create Date: 2017-09-27 10:15:44.208163
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '1f4e6a2b8d3c'
+down_revision = '5c1b7e0f9a2d'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'relationship_neighbors',
+      sa.Column('object_type', sa.String(length=64), nullable=False),
+      sa.Column('object_id', sa.Integer(), nullable=False,
+                autoincrement=False),
+      sa.Column('neighbor_type', sa.String(length=64), nullable=False),
+      sa.Column('neighbor_id', sa.Integer(), nullable=False,
+                autoincrement=False),
+      sa.PrimaryKeyConstraint('object_type', 'object_id',
+                              'neighbor_type', 'neighbor_id'),
+  )
+  op.execute("""
+      INSERT IGNORE INTO relationship_neighbors (
+          object_type, object_id, neighbor_type, neighbor_id
+      )
+      SELECT source_type, source_id, destination_type, destination_id
+      FROM relationships
+  """)
+  op.execute("""
+      INSERT IGNORE INTO relationship_neighbors (
+          object_type, object_id, neighbor_type, neighbor_id
+      )
+      SELECT destination_type, destination_id, source_type, source_id
+      FROM relationships
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('relationship_neighbors')
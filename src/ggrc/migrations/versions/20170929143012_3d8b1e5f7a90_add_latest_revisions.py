@@ -0,0 +1,49 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add latest revisions table
+
+Create Date: 2017-09-29 14:30:12.531847
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3d8b1e5f7a90'
+down_revision = '1f4e6a2b8d3c'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'latest_revisions',
+      sa.Column('resource_type', sa.String(length=250), nullable=False),
+      sa.Column('resource_id', sa.Integer(), nullable=False,
+                autoincrement=False),
+      sa.Column('revision_id', sa.Integer(), nullable=False),
+      sa.Column('action', sa.Enum(u'created', u'modified', u'deleted'),
+                nullable=False),
+      sa.PrimaryKeyConstraint('resource_type', 'resource_id'),
+  )
+  op.execute("""
+      INSERT INTO latest_revisions (
+          resource_type, resource_id, revision_id, action
+      )
+      SELECT r.resource_type, r.resource_id, r.id, r.action
+      FROM revisions AS r
+      JOIN (
+          SELECT MAX(id) AS id
+          FROM revisions
+          GROUP BY resource_type, resource_id
+      ) AS latest ON latest.id = r.id
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('latest_revisions')
@@ -0,0 +1,75 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add similarity features table
+
+Create Date: 2017-10-02 11:05:17.304519
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6a0c2e4b9d1f'
+down_revision = '3d8b1e5f7a90'
+
+
+MAPPED_OBJECTS = """
+    SELECT source_type AS object_type, source_id AS object_id,
+           destination_type AS mapped_type, destination_id AS mapped_id
+    FROM relationships
+    WHERE source_type = 'Assessment'
+    UNION ALL
+    SELECT destination_type, destination_id, source_type, source_id
+    FROM relationships
+    WHERE destination_type = 'Assessment'
+"""
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'similarity_features',
+      sa.Column('object_type', sa.String(length=64), nullable=False),
+      sa.Column('object_id', sa.Integer(), nullable=False,
+                autoincrement=False),
+      sa.Column('kind', sa.Enum(u'relationship', u'snapshot'),
+                nullable=False),
+      sa.Column('feature_type', sa.String(length=64), nullable=False),
+      sa.Column('feature_id', sa.Integer(), nullable=False,
+                autoincrement=False),
+      sa.Column('weight', sa.Integer(), nullable=False),
+      sa.PrimaryKeyConstraint('object_type', 'object_id', 'kind',
+                              'feature_type', 'feature_id'),
+  )
+  op.create_index('ix_similarity_features_feature', 'similarity_features',
+                  ['kind', 'feature_type', 'feature_id'])
+  op.execute("""
+      INSERT INTO similarity_features (
+          object_type, object_id, kind, feature_type, feature_id, weight
+      )
+      SELECT object_type, object_id, 'relationship', mapped_type, mapped_id,
+             COUNT(*)
+      FROM ({}) AS mapped
+      WHERE mapped_type != 'Snapshot'
+      GROUP BY object_type, object_id, mapped_type, mapped_id
+  """.format(MAPPED_OBJECTS))
+  op.execute("""
+      INSERT INTO similarity_features (
+          object_type, object_id, kind, feature_type, feature_id, weight
+      )
+      SELECT object_type, object_id, 'snapshot', child_type, child_id,
+             COUNT(*)
+      FROM ({}) AS mapped
+      JOIN snapshots ON mapped_type = 'Snapshot' AND mapped_id = snapshots.id
+      GROUP BY object_type, object_id, child_type, child_id
+  """.format(MAPPED_OBJECTS))
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('similarity_features')
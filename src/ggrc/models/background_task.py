@@ -60,6 +60,8 @@ class BackgroundTask(Base, Stateful, db.Model):
     # Ensure to not commit any not-yet-committed changes
     db.session.rollback()
 
+    # Keep progress stored by the task so that it can be continued
+    progress = (self.result or {}).get('progress')
     if isinstance(result, Response):
       self.result = {'content': result.response[0],
                      'status_code': result.status_code,
@@ -68,6 +70,8 @@ class BackgroundTask(Base, Stateful, db.Model):
       self.result = {'content': result,
                      'status_code': 200,
                      'headers': [('Content-Type', 'text/html')]}
+    if progress is not None:
+      self.result['progress'] = progress
     self.status = status
     db.session.add(self)
     db.session.commit()
@@ -95,6 +99,30 @@ def create_task(name, url, queued_callback=None, parameters=None, method=None):
   task.modified_by = get_current_user()
   db.session.add(task)
   db.session.commit()
+  _enqueue_task(task, url, "{}_{}".format(task.name, task.id),
+                queued_callback, method)
+  return task
+
+
+def resume_task(task, url, queued_callback=None, method=None):
+  """Enqueue a failed background task again.
+
+  The task keeps its result, so a task that stores its progress continues
+  with the work that was not finished before the failure.
+  """
+  if not method:
+    method = request.method
+  task.status = "Pending"
+  db.session.add(task)
+  db.session.commit()
+  # task queue names can not be reused
+  _enqueue_task(task, url, "{}_{}_{}".format(task.name, task.id, int(time())),
+                queued_callback, method)
+  return task
+
+
+def _enqueue_task(task, url, queue_name, queued_callback, method):
+  """Schedule a task queue for a stored task or run it directly."""
   banned = {
       "X-Appengine-Country",
       "X-Appengine-Queuename",
@@ -114,14 +142,13 @@ def create_task(name, url, queued_callback=None, parameters=None, method=None):
     taskqueue.add(
         queue_name="ggrc",
         url=url,
-        name="{}_{}".format(task.name, task.id),
+        name=queue_name,
         params={'task_id': task.id},
         method=method,
         headers=headers
     )
   elif queued_callback:
     queued_callback(task)
-  return task
 
 
 def make_task_response(id_):
@@ -7,7 +7,12 @@ from ggrc.models.hooks import assessment
 from ggrc.models.hooks import audit
 from ggrc.models.hooks import comment
 from ggrc.models.hooks import issue
+from ggrc.models.hooks import query_cache
 from ggrc.models.hooks import relationship
+from ggrc.models.hooks import relevance
+from ggrc.models.hooks import revision
+from ggrc.models.hooks import similarity
+from ggrc.models.hooks import stubs
 
 
 ALL_HOOKS = [
@@ -15,7 +20,12 @@ ALL_HOOKS = [
     audit,
     comment,
     issue,
+    query_cache,
     relationship,
+    relevance,
+    revision,
+    similarity,
+    stubs,
 ]
 
 
@@ -0,0 +1,18 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that invalidate cached /query results after deletions."""
+
+import sqlalchemy as sa
+
+from ggrc.query import cache
+
+
+def init_hook():
+  """Initialize query cache hooks."""
+  sa.event.listen(sa.orm.session.Session, "after_flush",
+                  cache.track_deletions)
+  sa.event.listen(sa.orm.session.Session, "after_commit",
+                  cache.end_transaction)
+  sa.event.listen(sa.orm.session.Session, "after_rollback",
+                  cache.discard_deletions)
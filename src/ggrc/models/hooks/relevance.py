@@ -0,0 +1,18 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that invalidate cached relevance closures."""
+
+import sqlalchemy as sa
+
+from ggrc.models import relevance_cache
+
+
+def init_hook():
+  """Initialize relevance cache hooks."""
+  sa.event.listen(sa.orm.session.Session, "after_flush",
+                  relevance_cache.invalidate)
+  sa.event.listen(sa.orm.session.Session, "after_commit",
+                  relevance_cache.end_transaction)
+  sa.event.listen(sa.orm.session.Session, "after_rollback",
+                  relevance_cache.end_transaction)
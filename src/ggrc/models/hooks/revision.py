@@ -0,0 +1,24 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that keep the latest revisions lookup table up to date."""
+
+import sqlalchemy as sa
+
+from ggrc.models.revision import LatestRevision
+from ggrc.models.revision import Revision
+
+
+def store_latest_revisions(session, _):
+  """Store revisions inserted in the flush as the latest ones."""
+  LatestRevision.store(
+      (obj.resource_type, obj.resource_id, obj.id, obj.action)
+      for obj in session.new
+      if isinstance(obj, Revision)
+  )
+
+
+def init_hook():
+  """Initialize Revision-related hooks."""
+  sa.event.listen(sa.orm.session.Session, "after_flush",
+                  store_latest_revisions)
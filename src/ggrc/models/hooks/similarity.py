@@ -0,0 +1,27 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that keep the similarity index up to date."""
+
+import sqlalchemy as sa
+
+from ggrc.models import similarity_index
+from ggrc.models.relationship import Relationship
+
+
+def refresh_similarity_features(session, _):
+  """Refresh features of objects with relationships changed in the flush."""
+  stubs = set()
+  for obj in session.new | session.deleted:
+    if isinstance(obj, Relationship):
+      stubs.add((obj.source_type, obj.source_id))
+      stubs.add((obj.destination_type, obj.destination_id))
+    elif obj in session.deleted:
+      stubs.add((obj.__class__.__name__, obj.id))
+  similarity_index.refresh(stubs)
+
+
+def init_hook():
+  """Initialize similarity index hooks."""
+  sa.event.listen(sa.orm.session.Session, "after_flush",
+                  refresh_similarity_features)
@@ -0,0 +1,14 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that invalidate stubs of published objects cached in a request."""
+
+import sqlalchemy as sa
+
+from ggrc.builder import json
+
+
+def init_hook():
+  """Initialize stub cache hooks."""
+  sa.event.listen(sa.orm.session.Session, "after_flush",
+                  json.invalidate_stub_cache)
@@ -4,7 +4,8 @@
 """Contains WithSimilarityScore mixin.
 
 This defines a procedure of getting "similar" objects which have similar
-relationships.
+relationships. Similar objects of the same type are read from the similarity
+index, see ggrc.models.similarity_index.
 """
 
 from sqlalchemy import and_
@@ -15,6 +16,7 @@ from sqlalchemy.orm import aliased
 from sqlalchemy.sql import func
 
 from ggrc import db
+from ggrc.models import similarity_index
 from ggrc.models.relationship import Relationship
 from ggrc.models.snapshot import Snapshot
 
@@ -58,6 +60,17 @@ class WithSimilarityScore(object):
       relevant_types = db.session.query(cls.assessment_type)\
                                  .filter(cls.id == id_)
 
+    if types != "all" and set(types) == {cls.__name__}:
+      return cls._get_similar_from_index(id_, relevant_types, threshold)
+    return cls._get_similar_from_joins(id_, types, relevant_types, threshold)
+
+  @classmethod
+  def _get_similar_from_joins(cls, id_, types, relevant_types, threshold):
+    """Get similar objects by joining relationships and snapshots.
+
+    Returns:
+      SQLAlchemy query with the same columns as get_similar_objects_query.
+    """
     # naming: self is "object", the object mapped to it is "related",
     # the object mapped to "related" is "similar"
     queries_for_union = []
@@ -120,6 +133,52 @@ class WithSimilarityScore(object):
     )
     return result
 
+  @classmethod
+  def _get_similar_from_index(cls, id_, relevant_types, threshold):
+    """Get objects of cls similar to cls instance from the similarity index.
+
+    Features of the object that have the relevant type are joined with the
+    same features of other objects and their weights are multiplied to get
+    the number of common mappings.
+
+    Returns:
+      SQLAlchemy query with the same columns as get_similar_objects_query.
+    """
+    own = aliased(similarity_index.SimilarityFeature, name="own_feature")
+    other = aliased(similarity_index.SimilarityFeature, name="other_feature")
+    weight_sum = func.sum(own.weight * other.weight).label("weight")
+    return db.session.query(
+        other.object_id.label("id"),
+        other.object_type.label("type"),
+        weight_sum,
+    ).select_from(
+        own,
+    ).join(
+        other,
+        and_(
+            other.kind == own.kind,
+            other.feature_type == own.feature_type,
+            other.feature_id == own.feature_id,
+            other.object_type == cls.__name__,
+            other.object_id != id_,
+        ),
+    ).join(
+        cls,
+        and_(
+            cls.id == other.object_id,
+            cls.assessment_type == relevant_types,
+        ),
+    ).filter(
+        own.object_type == cls.__name__,
+        own.object_id == id_,
+        own.feature_type == relevant_types,
+    ).group_by(
+        other.object_type,
+        other.object_id,
+    ).having(
+        weight_sum >= threshold,
+    )
+
   @classmethod
   def _join_snapshots(cls, id_, types):
     """Retrieves related objects with snapshots
@@ -0,0 +1,171 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Cache of relevance closures.
+
+A relevance closure is the list of ids of objects of one type that are
+related to a set of objects of another type, as used by the "relevant" query
+operator. Closures are cached on two levels:
+  - per request in flask.g, so widgets of one page that filter by the same
+    objects evaluate the closure once,
+  - per process in an LRU store, under a key that contains the watermarks
+    of the models the closure depends on and the deletion counter of the
+    /query result cache, see ggrc.query.cache. Entries are not used after an
+    object of any of those models was created or changed by any process,
+    including relationships created by the automapper without revisions, or
+    deleted by the current process. Deletions made by other processes rely on
+    RELEVANCE_CACHE_TTL.
+
+Flushes that change objects of watched models clear the request level cache
+and bypass the process level cache until the transaction ends, since their
+changes are not seen by other processes before commit.
+"""
+
+import hashlib
+import json
+import threading
+
+import flask
+
+from ggrc import settings
+from ggrc.cache.lrucache import LRUClient
+from ggrc.cache.lrucache import LRUStore
+from ggrc.query import cache as query_cache
+
+
+# Models whose objects map objects to each other in any of the mappings used
+# by relationship_helper.get_ids_related_to.
+WATCHED_MODELS = frozenset([
+    "AccessControlList",
+    "Audit",
+    "CustomAttributeValue",
+    "ObjectPerson",
+    "Relationship",
+    "RiskAssessment",
+    "Snapshot",
+    "TaskGroupObject",
+    "UserRole",
+])
+
+_store = None
+_store_lock = threading.Lock()
+_request_hits = 0
+_request_hits_lock = threading.Lock()
+
+
+def is_enabled():
+  return getattr(settings, "RELEVANCE_CACHE_ENABLED", False)
+
+
+def get_store():
+  """Get the LRUStore shared by all requests in the process.
+
+  The request hit counter is reset together with the store.
+  """
+  global _store, _request_hits  # pylint: disable=global-statement
+  with _store_lock:
+    if _store is None:
+      with _request_hits_lock:
+        _request_hits = 0
+      _store = LRUStore(
+          getattr(settings, "RELEVANCE_CACHE_MAX_ENTRIES", 1000),
+          getattr(settings, "RELEVANCE_CACHE_TTL", 60),
+      )
+    return _store
+
+
+def _count_request_hit():
+  global _request_hits  # pylint: disable=global-statement
+  with _request_hits_lock:
+    _request_hits += 1
+
+
+def _get_request_cache():
+  """Get the dict of closures cached in the current request."""
+  if getattr(flask.g, "relevance_closures", None) is None:
+    flask.g.relevance_closures = {}
+  return flask.g.relevance_closures
+
+
+def _get_store_key(key):
+  """Get the process level cache key for a closure key."""
+  object_type, related_type, _ = key
+  model_names = WATCHED_MODELS | {object_type, related_type}
+  return hashlib.sha1(json.dumps(
+      [
+          key,
+          query_cache.get_watermarks(model_names),
+          query_cache.get_table_watermarks(model_names),
+          query_cache.get_deletions(),
+      ],
+      separators=(",", ":"), default=str,
+  )).hexdigest()
+
+
+def get_ids(object_type, related_type, related_ids, get_query):
+  """Get ids of objects of object_type relevant to the given objects.
+
+  Args:
+    object_type: type of objects in the closure;
+    related_type: type of objects the closure is built for;
+    related_ids: ids of objects the closure is built for;
+    get_query: function that returns a query for the closure ids when the
+      closure is not cached.
+
+  Returns:
+    list of ids of objects of object_type.
+  """
+  if not is_enabled():
+    return [row[0] for row in get_query()]
+  key = (object_type, related_type, sorted(set(related_ids)))
+  request_key = json.dumps(key, default=str)
+  request_cache = _get_request_cache()
+  if request_key in request_cache:
+    _count_request_hit()
+    return request_cache[request_key]
+
+  use_store = not getattr(flask.g, "relevance_uncommitted", False)
+  store_key = _get_store_key(key) if use_store else None
+  ids = None
+  if store_key is not None:
+    ids = LRUClient(get_store()).get(store_key)
+  if ids is None:
+    ids = sorted({row[0] for row in get_query()})
+    if store_key is not None:
+      LRUClient(get_store()).set(store_key, ids)
+  request_cache[request_key] = ids
+  return ids
+
+
+def invalidate(session, _):
+  """Clear the request level cache after a flush of watched objects."""
+  if not flask.has_app_context():
+    return
+  changed = session.new | session.dirty | session.deleted
+  if any(obj.__class__.__name__ in WATCHED_MODELS for obj in changed):
+    flask.g.relevance_closures = None
+    flask.g.relevance_uncommitted = True
+
+
+def end_transaction(_):
+  """Use the process level cache again after the transaction ended."""
+  if flask.has_app_context():
+    flask.g.relevance_uncommitted = False
+
+
+def get_stats():
+  """Get hit and miss counters and the size of the process level cache.
+
+  Returns:
+    dict with hits, misses (lookups in the process level cache), evictions,
+    request_hits (hits served from the request level cache, also counted in
+    hits), hit_rate, items (number of closures in the process level cache)
+    and bytes (size of serialized closures in the process level cache).
+  """
+  stats = get_store().get_stats()
+  with _request_hits_lock:
+    stats["request_hits"] = _request_hits
+  stats["hits"] += stats["request_hits"]
+  lookups = stats["hits"] + stats["misses"]
+  stats["hit_rate"] = float(stats["hits"]) / lookups if lookups else 0.0
+  return stats
@@ -3,11 +3,20 @@
 
 """Defines a Revision model for storing snapshots."""
 
+import collections
+
+from sqlalchemy import func
+from sqlalchemy.sql.expression import select
+from sqlalchemy.sql.expression import text
+from sqlalchemy.sql.expression import tuple_
+
 from ggrc import builder
 from ggrc import db
+from ggrc import settings
 from ggrc.models.mixins import Base
 from ggrc.models import reflection
 from ggrc.access_control import role
+from ggrc.models.types import CompressedJsonType
 from ggrc.models.types import LongJsonType
 
 
@@ -21,7 +30,9 @@ class Revision(Base, db.Model):
   event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
   action = db.Column(db.Enum(u'created', u'modified', u'deleted'),
                      nullable=False)
-  _content = db.Column('content', LongJsonType, nullable=False)
+  _json_content = db.Column('content', LongJsonType, nullable=True)
+  _compressed_content = db.Column('compressed_content', CompressedJsonType,
+                                  nullable=True)
 
   resource_slug = db.Column(db.String, nullable=True)
   source_type = db.Column(db.String, nullable=True)
@@ -38,6 +49,7 @@ class Revision(Base, db.Model):
         db.Index("fk_revisions_destination",
                  "destination_type", "destination_id"),
         db.Index('ix_revisions_resource_slug', 'resource_slug'),
+        db.Index('ix_revisions_resource_type_id', 'resource_type', 'id'),
     )
 
   _api_attrs = reflection.ApiAttributes(
@@ -84,6 +96,31 @@ class Revision(Base, db.Model):
                  "destination_id"]:
       setattr(self, attr, getattr(obj, attr, None))
 
+  @staticmethod
+  def content_values(content):
+    """Get values of content columns for storing content.
+
+    Content is stored in the compressed_content column if
+    REVISION_CONTENT_FORMAT is "compressed" and in the content column
+    otherwise. The other column is set to None.
+    """
+    if getattr(settings, "REVISION_CONTENT_FORMAT", "json") == "compressed":
+      return {"content": None, "compressed_content": content}
+    return {"content": content, "compressed_content": None}
+
+  @property
+  def _content(self):
+    """Stored content, compressed content is decoded lazily."""
+    if self._compressed_content is not None:
+      return self._compressed_content
+    return self._json_content
+
+  @_content.setter
+  def _content(self, value):
+    values = self.content_values(value)
+    self._json_content = values["content"]
+    self._compressed_content = values["compressed_content"]
+
   @builder.simple_property
   def description(self):
     """Compute a human readable description from action and content."""
@@ -126,12 +163,8 @@ class Revision(Base, db.Model):
       result += ", via bulk action"
     return result
 
-  @builder.simple_property
-  def content(self):
-    """Property. Contains the revision content dict.
-
-    Updated by required values, generated from saved content dict."""
-    # pylint: disable=too-many-locals
+  def _get_access_control_list(self):
+    """Get access control list with roles of old person fields."""
     roles_dict = role.get_custom_roles_for(self.resource_type)
     reverted_roles_dict = {n: i for i, n in roles_dict.iteritems()}
     access_control_list = self._content.get("access_control_list") or []
@@ -174,44 +207,198 @@ class Revision(Base, db.Model):
             "modified_by": None,
             "id": None,
         })
-    populated_content = self._content.copy()
 
     # Add person with id and type for old snapshots compatibility
     for acl in access_control_list:
       if "person" not in acl:
         acl["person"] = {"id": acl.get("person_id"), "type": "Person"}
-    populated_content["access_control_list"] = access_control_list
+    return access_control_list
 
-    if 'url' in self._content:
-      reference_url_list = []
-      for key in ('url', 'reference_url'):
-        link = self._content[key]
-        # link might exist, but can be an empty string - we treat those values
-        # as non-existing (empty) reference URLs
-        if not link:
-          continue
-
-        # if creation/modification date is not available, we estimate it by
-        # using the corresponding information from the Revision itself
-        created_at = (self._content.get("created_at") or
-                      self.created_at.isoformat())
-        updated_at = (self._content.get("updated_at") or
-                      self.updated_at.isoformat())
-
-        reference_url_list.append({
-            "display_name": link,
-            "document_type": "REFERENCE_URL",
-            "link": link,
-            "title": link,
-            "id": None,
-            "created_at": created_at,
-            "updated_at": updated_at,
-        })
-      populated_content['reference_url'] = reference_url_list
+  def _get_reference_url_list(self):
+    """Get reference url documents from old url fields."""
+    reference_url_list = []
+    for key in ('url', 'reference_url'):
+      link = self._content[key]
+      # link might exist, but can be an empty string - we treat those values
+      # as non-existing (empty) reference URLs
+      if not link:
+        continue
+
+      # if creation/modification date is not available, we estimate it by
+      # using the corresponding information from the Revision itself
+      created_at = (self._content.get("created_at") or
+                    self.created_at.isoformat())
+      updated_at = (self._content.get("updated_at") or
+                    self.updated_at.isoformat())
+
+      reference_url_list.append({
+          "display_name": link,
+          "document_type": "REFERENCE_URL",
+          "link": link,
+          "title": link,
+          "id": None,
+          "created_at": created_at,
+          "updated_at": updated_at,
+      })
+    return reference_url_list
+
+  def get_content_value(self, key, default=None):
+    """Get a single value of the revision content.
+
+    Unlike content, only the requested value is decoded and populated.
+
+    Args:
+      key: name of the content field.
+      default: value returned if the content has no such field.
+    Returns:
+      The same value as content.get(key, default).
+    """
+    if key == "access_control_list":
+      return self._get_access_control_list()
+    if key == "reference_url" and "url" in self._content:
+      return self._get_reference_url_list()
+    return self._content.get(key, default)
 
+  @property
+  def lazy_content(self):
+    """Read only mapping of content values populated on access."""
+    return RevisionContent(self)
+
+  @builder.simple_property
+  def content(self):
+    """Property. Contains the revision content dict.
+
+    Updated by required values, generated from saved content dict."""
+    populated_content = self._content.copy()
+    populated_content["access_control_list"] = (
+        self._get_access_control_list()
+    )
+    if 'url' in self._content:
+      populated_content['reference_url'] = self._get_reference_url_list()
     return populated_content
 
   @content.setter
   def content(self, value):
     """ Setter for content property."""
     self._content = value
+
+
+class RevisionContent(collections.Mapping):
+  """Read only view of Revision.content that populates values on access."""
+
+  def __init__(self, revision):
+    self._revision = revision
+
+  def _keys(self):
+    # pylint: disable=protected-access
+    keys = set(self._revision._content)
+    keys.add("access_control_list")
+    return keys
+
+  def __getitem__(self, key):
+    if key not in self:
+      raise KeyError(key)
+    return self._revision.get_content_value(key)
+
+  def __contains__(self, key):
+    # pylint: disable=protected-access
+    return key == "access_control_list" or key in self._revision._content
+
+  def __iter__(self):
+    return iter(self._keys())
+
+  def __len__(self):
+    return len(self._keys())
+
+
+class LatestRevision(db.Model):
+  """Id and action of the latest revision of every object.
+
+  Rows are updated in the same transaction that writes revisions, so the
+  latest revision of an object can be found without scanning all of its
+  revisions.
+  """
+  # pylint: disable=too-few-public-methods
+
+  __tablename__ = 'latest_revisions'
+
+  resource_type = db.Column(db.String(250), primary_key=True)
+  resource_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  revision_id = db.Column(db.Integer, nullable=False)
+  action = db.Column(db.Enum(u'created', u'modified', u'deleted'),
+                     nullable=False)
+
+  # The action is updated first because MySQL assigns columns from left to
+  # right and the condition must see the old revision_id.
+  _UPSERT = """
+      INSERT INTO latest_revisions (
+          resource_type, resource_id, revision_id, action
+      )
+      VALUES (:resource_type, :resource_id, :revision_id, :action)
+      ON DUPLICATE KEY UPDATE
+          action = IF(VALUES(revision_id) > revision_id,
+                      VALUES(action), action),
+          revision_id = GREATEST(revision_id, VALUES(revision_id))
+  """
+
+  @classmethod
+  def store(cls, rows, connection=None):
+    """Store (resource_type, resource_id, revision_id, action) rows.
+
+    Rows only replace older revisions of the same object.
+
+    Args:
+      rows: iterable of (resource_type, resource_id, revision_id, action).
+      connection: connection used for the upsert, db.session by default.
+    """
+    rows = [
+        {"resource_type": resource_type, "resource_id": resource_id,
+         "revision_id": revision_id, "action": action}
+        for resource_type, resource_id, revision_id, action in rows
+    ]
+    if rows:
+      (connection or db.session).execute(text(cls._UPSERT), rows)
+
+  @classmethod
+  def refresh(cls, stubs, connection=None):
+    """Update latest revisions of (type, id) stubs from the revisions table.
+
+    Must be called by code that inserts revisions without the ORM.
+
+    Args:
+      stubs: iterable of (type, id) pairs.
+      connection: connection that inserted the revisions, db.session by
+        default.
+    """
+    stubs = list({tuple(stub) for stub in stubs})
+    if not stubs:
+      return
+    connection = connection or db.session
+    revisions = Revision.__table__.c
+    latest_ids = [row[0] for row in connection.execute(
+        select([func.max(revisions.id)]).where(
+            tuple_(revisions.resource_type, revisions.resource_id).in_(stubs)
+        ).group_by(revisions.resource_type, revisions.resource_id)
+    )]
+    if not latest_ids:
+      return
+    cls.store(connection.execute(
+        select([revisions.resource_type, revisions.resource_id,
+                revisions.id, revisions.action]).where(
+            revisions.id.in_(latest_ids))
+    ), connection)
+
+  @classmethod
+  def get_latest(cls, stubs):
+    """Get a dict of (type, id) stubs to (revision id, action) pairs."""
+    stubs = list(stubs)
+    if not stubs:
+      return {}
+    query = db.session.query(
+        cls.resource_type,
+        cls.resource_id,
+        cls.revision_id,
+        cls.action,
+    ).filter(tuple_(cls.resource_type, cls.resource_id).in_(stubs))
+    return {(resource_type, resource_id): (revision_id, action)
+            for resource_type, resource_id, revision_id, action in query}
@@ -0,0 +1,156 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Similarity index of objects with the WithSimilarityScore mixin.
+
+Features of an indexed object are the objects mapped to it directly and the
+child objects of snapshots mapped to it. Every feature is stored with the
+number of relationships that map it, so the similarity of two objects is the
+sum of products of weights of their shared features, which is the number of
+paths between them that the join query of WithSimilarityScore counts.
+
+Features of objects whose relationships are created or deleted through the
+ORM are recomputed in an after_flush hook. rebuild() recomputes the whole
+index.
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc.models.relationship import Relationship
+from ggrc.models.snapshot import Snapshot
+
+
+RELATIONSHIP = u"relationship"
+SNAPSHOT = u"snapshot"
+
+
+# pylint: disable=too-few-public-methods
+class SimilarityFeature(db.Model):
+  """Db model for a feature of an object in the similarity index."""
+  __tablename__ = 'similarity_features'
+
+  object_type = db.Column(db.String(64), primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  kind = db.Column(db.Enum(RELATIONSHIP, SNAPSHOT), primary_key=True)
+  feature_type = db.Column(db.String(64), primary_key=True)
+  feature_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  weight = db.Column(db.Integer, nullable=False)
+
+  __table_args__ = (
+      db.Index("ix_similarity_features_feature",
+               "kind", "feature_type", "feature_id"),
+  )
+
+
+_indexed_types = None
+
+
+def get_indexed_types():
+  """Get names of models that use the similarity index."""
+  global _indexed_types  # pylint: disable=global-statement
+  if _indexed_types is None:
+    from ggrc.models import all_models
+    from ggrc.models.mixins.with_similarity_score import WithSimilarityScore
+    _indexed_types = frozenset(model.__name__
+                               for model in all_models.all_models
+                               if issubclass(model, WithSimilarityScore))
+  return _indexed_types
+
+
+def _mapped_objects(objects_condition):
+  """Get (object, mapped object) pairs of both relationship directions."""
+  rels = Relationship.__table__.c
+  directions = [
+      (rels.source_type, rels.source_id,
+       rels.destination_type, rels.destination_id),
+      (rels.destination_type, rels.destination_id,
+       rels.source_type, rels.source_id),
+  ]
+  return sa.union_all(*[
+      sa.select([
+          object_type.label("object_type"),
+          object_id.label("object_id"),
+          mapped_type.label("mapped_type"),
+          mapped_id.label("mapped_id"),
+      ]).where(objects_condition(object_type, object_id))
+      for object_type, object_id, mapped_type, mapped_id in directions
+  ]).alias("mapped")
+
+
+def _insert_features(objects_condition):
+  """Insert features of objects matching objects_condition.
+
+  Args:
+    objects_condition: function that gets object type and id columns and
+      returns a filter for the indexed objects.
+  """
+  features = SimilarityFeature.__table__
+  columns = ["object_type", "object_id", "kind",
+             "feature_type", "feature_id", "weight"]
+
+  mapped = _mapped_objects(objects_condition)
+  db.session.execute(features.insert().from_select(columns, sa.select([
+      mapped.c.object_type,
+      mapped.c.object_id,
+      sa.literal(RELATIONSHIP),
+      mapped.c.mapped_type,
+      mapped.c.mapped_id,
+      sa.func.count(),
+  ]).where(
+      mapped.c.mapped_type != Snapshot.__name__,
+  ).group_by(
+      mapped.c.object_type,
+      mapped.c.object_id,
+      mapped.c.mapped_type,
+      mapped.c.mapped_id,
+  )))
+
+  mapped = _mapped_objects(objects_condition)
+  snapshots = Snapshot.__table__.c
+  db.session.execute(features.insert().from_select(columns, sa.select([
+      mapped.c.object_type,
+      mapped.c.object_id,
+      sa.literal(SNAPSHOT),
+      snapshots.child_type,
+      snapshots.child_id,
+      sa.func.count(),
+  ]).select_from(
+      mapped.join(Snapshot.__table__, sa.and_(
+          mapped.c.mapped_type == Snapshot.__name__,
+          mapped.c.mapped_id == snapshots.id,
+      ))
+  ).group_by(
+      mapped.c.object_type,
+      mapped.c.object_id,
+      snapshots.child_type,
+      snapshots.child_id,
+  )))
+
+
+def refresh(stubs):
+  """Recompute features of indexed objects.
+
+  Args:
+    stubs: (type, id) stubs of objects, stubs of types that are not indexed
+      are ignored.
+  """
+  indexed_types = get_indexed_types()
+  stubs = list({tuple(stub) for stub in stubs if stub[0] in indexed_types})
+  if not stubs:
+    return
+  features = SimilarityFeature.__table__
+  db.session.execute(features.delete().where(
+      tuple_(features.c.object_type, features.c.object_id).in_(stubs)))
+  _insert_features(lambda object_type, object_id: tuple_(
+      object_type, object_id).in_(stubs))
+
+
+def rebuild():
+  """Rebuild the whole index from the relationships table."""
+  indexed_types = list(get_indexed_types())
+  db.session.execute(SimilarityFeature.__table__.delete())
+  if indexed_types:
+    _insert_features(
+        lambda object_type, object_id: object_type.in_(indexed_types))
@@ -12,7 +12,6 @@ from sqlalchemy import orm
 from sqlalchemy import event
 from sqlalchemy import inspect
 from sqlalchemy.orm.session import Session
-from sqlalchemy import func
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import builder
@@ -274,6 +273,7 @@ def _ensure_program_relationships(objects):
 
 def _insert_program_relationships(relationship_stubs):
   """Insert missing obj-program relationships."""
+  from ggrc.automapper import adjacency
   if not relationship_stubs:
     return
   current_user_id = get_current_user_id()
@@ -303,6 +303,11 @@ def _insert_program_relationships(relationship_stubs):
           for relationship_stub in relationship_stubs
       ])
   )
+  adjacency.add_neighbors(
+      ((stub.source_type, stub.source_id),
+       (stub.destination_type, stub.destination_id))
+      for stub in relationship_stubs
+  )
 
 
 def _set_latest_revisions(objects):
@@ -311,23 +316,10 @@ def _set_latest_revisions(objects):
   Args:
     objects: list of snapshot objects with child_id and child_type set.
   """
-  pairs = [(o.child_type, o.child_id) for o in objects]
-  query = db.session.query(
-      func.max(revision.Revision.id, name="id", identifier="id"),
-      revision.Revision.resource_type,
-      revision.Revision.resource_id,
-  ).filter(
-      tuple_(
-          revision.Revision.resource_type,
-          revision.Revision.resource_id,
-      ).in_(pairs)
-  ).group_by(
-      revision.Revision.resource_type,
-      revision.Revision.resource_id,
-  )
-  id_map = {(r_type, r_id): id_ for id_, r_type, r_id in query}
+  latest = revision.LatestRevision.get_latest(
+      (o.child_type, o.child_id) for o in objects)
   for o in objects:
-    o.revision_id = id_map.get((o.child_type, o.child_id))
+    o.revision_id = latest.get((o.child_type, o.child_id), (None, None))[0]
 
 
 event.listen(Session, 'before_flush', handle_post_flush)
@@ -6,8 +6,11 @@
 Add Json and Compressed type declaration for use in ORM models.
 """
 
+import collections
 import json
 import pickle
+import zlib
+
 import sqlalchemy.types as types
 from ggrc import utils
 from ggrc.models import exceptions
@@ -84,3 +87,86 @@ class CompressedType(types.TypeDecorator):
     if len(value) > self.MAX_BINARY_LENGTH:
       raise exceptions.ValidationError("Log record content too long")
     return value
+
+
+class LazyJsonDict(collections.Mapping):
+  """Read only dict of values encoded with CompressedJsonType.
+
+  Each value is stored as a separate JSON document, so only values that are
+  accessed get decoded.
+  """
+
+  def __init__(self, value):
+    payload = zlib.decompress(value)
+    header, self._payload = payload.split("\n", 1)
+    self._keys = []
+    self._offsets = {}
+    offset = 1
+    for key, length in json.loads(header):
+      self._keys.append(key)
+      self._offsets[key] = (offset, length)
+      offset += length + 1
+    self._decoded = {}
+
+  def __getitem__(self, key):
+    if key not in self._decoded:
+      offset, length = self._offsets[key]
+      self._decoded[key] = json.loads(self._payload[offset:offset + length])
+    return self._decoded[key]
+
+  def __contains__(self, key):
+    return key in self._offsets
+
+  def __iter__(self):
+    return iter(self._keys)
+
+  def __len__(self):
+    return len(self._keys)
+
+  def __repr__(self):
+    return "LazyJsonDict({!r})".format(self.copy())
+
+  def copy(self):
+    """Get a dict with all decoded values."""
+    if len(self._decoded) < len(self._keys):
+      decoded = dict(zip(self._keys, json.loads(self._payload)))
+      decoded.update(self._decoded)
+      self._decoded = decoded
+    return self._decoded.copy()
+
+
+class CompressedJsonType(types.TypeDecorator):
+  # pylint: disable=W0223
+  """Custom compressed Json dict data type.
+
+  Values of the dict are serialized to separate JSON documents that form a
+  JSON list. The list follows a header with keys and lengths of the documents
+  and both are compressed with zlib.
+  Loaded values are LazyJsonDict instances that decode only the accessed
+  items.
+  """
+  MAX_BINARY_LENGTH = 4294967295
+  COMPRESSION_LEVEL = 6
+  impl = types.LargeBinary(length=MAX_BINARY_LENGTH)
+
+  def process_result_value(self, value, dialect):
+    if value is not None:
+      value = LazyJsonDict(value)
+    return value
+
+  def process_bind_param(self, value, dialect):
+    if value is None:
+      return value
+    header = []
+    documents = []
+    for key, item in value.iteritems():
+      document = utils.as_json(item)
+      header.append((key, len(document)))
+      documents.append(document)
+    value = zlib.compress(
+        "\n".join([json.dumps(header), "[{}]".format(",".join(documents))]),
+        self.COMPRESSION_LEVEL,
+    )
+    if len(value) > self.MAX_BINARY_LENGTH:
+      raise exceptions.ValidationError("Log record content too long")
+    return value
@@ -9,18 +9,22 @@ This class is used to build SqlAlchemy queries and fetch the result ids.
 # flake8: noqa
 import collections
 import datetime
+from multiprocessing.pool import ThreadPool
 
 import flask
 import sqlalchemy as sa
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.models import inflector
 from ggrc.rbac import context_query_filter
 from ggrc.utils import benchmark
+from ggrc.utils import in_request_context_copy
 from ggrc.rbac import permissions
 from ggrc.query import custom_operators
+from ggrc.query import pagination
 from ggrc.query.exceptions import BadQueryException
 
 
@@ -45,6 +49,9 @@ class QueryHelper(object):
         }
       ]
       limit: [from, to] - limit the result list to a slice result[from, to]
+      cursor: null or next_cursor of the previous page - get a page of
+              to - from objects after the cursor instead of using offsets
+      count_total: optional; compute the total count with a cursor
       filters: {
         relevant_filters:
           these filters will return all ids of the "search class name" object
@@ -74,6 +81,8 @@ class QueryHelper(object):
       object_name: search class name,
       (all other object query fields)
       ids: [ list of filtered objects ids ]
+      next_cursor: cursor of the next page or null on the last page
+                   (present if cursor was given)
     }
   ]
 
@@ -82,9 +91,13 @@ class QueryHelper(object):
 
   """
 
+  # Page size of cursor pagination for queries without limit
+  DEFAULT_PAGE_SIZE = 50
+
   def __init__(self, query):
     self.query = self._clean_query(query)
     self._count = 0
+    self._prefetched_ids = {}
 
   def _get_snapshot_child_type(self, object_query):
     """Return child_type for snapshot from a query"""
@@ -206,11 +219,96 @@ class QueryHelper(object):
     Returns:
       list of dicts: same query as the input with all ids that match the filter
     """
+    self._prefetch_ids()
     for object_query in self.query:
       ids = self._get_ids(object_query)
       object_query["ids"] = ids
     return self.query
 
+  @classmethod
+  def _get_dependencies(cls, expression):
+    """Get indexes of queries the expression refers to as __previous__."""
+    if not isinstance(expression, dict):
+      return set()
+    dependencies = set()
+    if (expression.get("op", {}).get("name") == "relevant" and
+            expression.get("object_name") == "__previous__"):
+      dependencies.update(expression.get("ids", [])[:1])
+    for key in ("left", "right"):
+      dependencies.update(cls._get_dependencies(expression.get(key)))
+    return dependencies
+
+  def _get_query_waves(self):
+    """Split queries into waves that only depend on previous waves.
+
+    A query depends on the queries that it refers to as __previous__ and it
+    can use their ids only if they are stored in the query, see _stores_ids.
+    Queries that depend on missing or unstored results are left out, the
+    serial evaluation reports their errors.
+
+    Returns:
+      list of lists of query indexes.
+    """
+    pending = {
+        index: self._get_dependencies(
+            object_query.get("filters", {}).get("expression"))
+        for index, object_query in enumerate(self.query)
+    }
+    ready = set()
+    waves = []
+    while pending:
+      wave = sorted(index for index, dependencies in pending.iteritems()
+                    if dependencies <= ready)
+      if not wave:
+        break
+      waves.append(wave)
+      for index in wave:
+        del pending[index]
+        if self._stores_ids(self.query[index]):
+          ready.add(index)
+    return waves
+
+  @staticmethod
+  def _stores_ids(object_query):
+    """Check if the ids of object_query are stored in the query."""
+    # pylint: disable=unused-argument
+    return True
+
+  def _prefetch_ids(self):
+    """Evaluate ids of all queries concurrently.
+
+    Independent queries are evaluated on QUERY_WORKERS threads, each with its
+    own database session, and a query is only started after the queries it
+    refers to as __previous__ are finished. _get_ids returns the prefetched
+    ids in the original order of queries.
+    """
+    workers = getattr(settings, "QUERY_WORKERS", 1)
+    if workers < 2 or len(self.query) < 2:
+      return
+    waves = self._get_query_waves()
+    get_ids = in_request_context_copy(self._get_prefetched_ids,
+                                      skip_g=["similar_objects_query"])
+    pool = ThreadPool(min(workers, len(self.query)))
+    try:
+      with benchmark("Get ids of {} queries on {} workers".format(
+              len(self.query), workers)):
+        for wave in waves:
+          for index, ids in pool.map(get_ids, wave):
+            object_query = self.query[index]
+            self._prefetched_ids[id(object_query)] = ids
+            if self._stores_ids(object_query):
+              object_query["ids"] = ids
+    finally:
+      pool.close()
+      pool.join()
+
+  def _get_prefetched_ids(self, index):
+    """Evaluate ids of the query with the given index."""
+    object_query = self.query[index]
+    with benchmark("Get ids of query {}: {}".format(
+            index, object_query["object_name"])):
+      return index, self._evaluate_ids(object_query)
+
   @staticmethod
   def _get_type_query(model, permission_type):
     """Filter by contexts and resources
@@ -255,6 +353,12 @@ class QueryHelper(object):
 
   def _get_ids(self, object_query):
     """Get a set of ids of objects described in the filters."""
+    if id(object_query) in self._prefetched_ids:
+      return self._prefetched_ids.pop(id(object_query))
+    return self._evaluate_ids(object_query)
+
+  def _evaluate_ids(self, object_query):
+    """Evaluate the query for ids of objects described in the filters."""
 
     object_name = object_query["object_name"]
     expression = object_query.get("filters", {}).get("expression")
@@ -283,7 +387,7 @@ class QueryHelper(object):
       )
       if filter_expression is not None:
         query = query.filter(filter_expression)
-    if object_query.get("order_by"):
+    if object_query.get("order_by") and "cursor" not in object_query:
       with benchmark("Sorting: _get_ids > order_by"):
         query = self._apply_order_by(
             object_class,
@@ -293,7 +397,10 @@ class QueryHelper(object):
         )
     with benchmark("Apply limit"):
       limit = object_query.get("limit")
-      if limit:
+      if "cursor" in object_query:
+        ids, total = self._apply_cursor(object_class, query, object_query,
+                                        tgt_class)
+      elif limit:
         ids, total = self._apply_limit(query, limit)
       else:
         ids = [obj.id for obj in query]
@@ -351,9 +458,58 @@ class QueryHelper(object):
 
     return ids, total
 
+  def _apply_cursor(self, model, query, object_query, tgt_class):
+    """Get a page of ids after the cursor of the object query.
+
+    Objects are sorted by order_by and by id, and the page starts after the
+    object whose sort key is encoded in the cursor, so the cost of a page
+    does not depend on its depth. The page size is the size of limit, and
+    the total count is only computed if count_total is set.
+
+    Args:
+      model: the model instances of which are requested in query;
+      query: filter query;
+      object_query: the query block with "cursor" set to the next_cursor of
+                    the previous page or to None for the first page.
+      tgt_class: the snapshotted model if `model` is Snapshot else `model`.
+
+    Returns:
+      matched objects ids and total count or None. The cursor of the next
+      page or None for the last page is stored in object_query.
+    """
+    page_size, _ = self._get_limit(object_query.get("limit") or
+                                   [0, self.DEFAULT_PAGE_SIZE])
+    total = None
+    if object_query.get("count_total"):
+      with benchmark("Apply cursor: _apply_cursor > query_count"):
+        count_q = query.statement.with_only_columns([sa.func.count()])
+        total = db.session.execute(count_q).scalar()
+    order_columns = []
+    if object_query.get("order_by"):
+      query, order_columns = self._get_order_by(
+          model, query, object_query["order_by"], tgt_class)
+    order_columns.append((model.id, False))
+    with benchmark("Apply cursor: _apply_cursor > query_page"):
+      rows, object_query["next_cursor"] = pagination.get_keyset_page(
+          query, order_columns, page_size, object_query["cursor"])
+    return [row[0] for row in rows], total
+
   def _apply_order_by(self, model, query, order_by, tgt_class):
     """Add ordering parameters to a query for objects.
 
+    See _get_order_by for the supported ordering parameters.
+
+    Returns:
+      the query with sorting parameters.
+    """
+    query, order_columns = self._get_order_by(model, query, order_by,
+                                              tgt_class)
+    return query.order_by(*[pagination.order_clause(column, desc)
+                            for column, desc in order_columns])
+
+  def _get_order_by(self, model, query, order_by, tgt_class):
+    """Get ordering columns for a query for objects.
+
     This works only on direct model properties and related objects defined with
     foreign keys and fails if any CAs are specified in order_by.
 
@@ -376,7 +532,8 @@ class QueryHelper(object):
     3. Otherwise, raise a NotImplementedError.
 
     Returns:
-      the query with sorting parameters.
+      the query with joins required for sorting and a list of
+      (ordering column, True if descending) pairs.
     """
     def joins_and_order(clause):
       """Get join operations and ordering field from item of order_by list.
@@ -386,10 +543,11 @@ class QueryHelper(object):
                  "desc": reverse sort on this field if True}
 
       Returns:
-        ([joins], order) - a tuple of joins required for this ordering to work
-                           and ordering clause itself; join is None if no join
-                           required or [(aliased entity, relationship field)]
-                           if joins required.
+        ([joins], (order, desc)) - a tuple of joins required for this
+                           ordering to work and ordering column with its
+                           direction; join is None if no join required or
+                           [(aliased entity, relationship field)] if joins
+                           required.
       """
       def by_similarity():
         """Join similar_objects subquery, order by weight from it."""
@@ -449,10 +607,7 @@ class QueryHelper(object):
           self._count += 1
           joins, order = by_fulltext()
 
-      if clause.get("desc", False):
-        order = order.desc()
-
-      return joins, order
+      return joins, (order, bool(clause.get("desc", False)))
 
     join_lists, orders = zip(*[joins_and_order(clause) for clause in order_by])
     for join_list in join_lists:
@@ -460,7 +615,7 @@ class QueryHelper(object):
         for join in join_list:
           query = query.outerjoin(*join)
 
-    return query.order_by(*orders)
+    return query, list(orders)
 
   @staticmethod
   def _slugs_to_ids(object_name, slugs):
@@ -0,0 +1,177 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Result cache for the /query endpoint.
+
+Results are cached in an in-process LRU store under a key built from:
+  - the canonical JSON of the posted query,
+  - the current user and the fingerprint of the user's permissions,
+  - watermarks of all models the result depends on, which are the ids of the
+    latest revisions of those models and the highest id and update time in
+    their tables,
+  - the number of transactions committed by the process that deleted any
+    objects.
+
+Most changes of objects are logged as revisions. Objects that are written
+without revisions, such as relationships created by the automapper or
+access control list entries changed by hooks, move the table watermarks
+when they are created or updated. Deletions that are not logged as
+revisions are seen by the process that made them, other processes rely on
+QUERY_CACHE_TTL.
+"""
+
+import hashlib
+import json
+import threading
+
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc import login
+from ggrc import settings
+from ggrc.cache.lrucache import LRUClient
+from ggrc.cache.lrucache import LRUStore
+from ggrc.models.inflector import get_model
+from ggrc.models.revision import Revision
+from ggrc.rbac import permissions
+
+
+# Models that can change results of queries for objects of any type.
+WATCHED_MODELS = frozenset([
+    "AccessControlList",
+    "CustomAttributeDefinition",
+    "CustomAttributeValue",
+    "Person",
+    "Relationship",
+])
+
+_store = None
+_store_lock = threading.Lock()
+_deletions = 0
+_deletions_lock = threading.Lock()
+
+
+def is_enabled():
+  return getattr(settings, "QUERY_CACHE_ENABLED", False)
+
+
+def get_store():
+  """Get the LRUStore shared by all requests in the process."""
+  global _store  # pylint: disable=global-statement
+  with _store_lock:
+    if _store is None:
+      _store = LRUStore(
+          getattr(settings, "QUERY_CACHE_MAX_ENTRIES", 1000),
+          getattr(settings, "QUERY_CACHE_TTL", 60),
+      )
+    return _store
+
+
+def get_query_models(query):
+  """Get names of all models referenced anywhere in the query."""
+  model_names = set()
+  if isinstance(query, dict):
+    for key, value in query.iteritems():
+      if key in ("object_name", "child_type") and \
+         isinstance(value, basestring):
+        model_names.add(value)
+      else:
+        model_names.update(get_query_models(value))
+  elif isinstance(query, list):
+    for item in query:
+      model_names.update(get_query_models(item))
+  return model_names
+
+
+def get_watermarks(model_names):
+  """Get a sorted list of (model name, id of its latest revision) pairs."""
+  return sorted(db.session.query(
+      Revision.resource_type,
+      sa.func.max(Revision.id),
+  ).filter(
+      Revision.resource_type.in_(model_names)
+  ).group_by(
+      Revision.resource_type
+  ))
+
+
+def get_table_watermarks(model_names):
+  """Get a sorted list of (model name, highest id, last update) tuples."""
+  queries = []
+  for model_name in sorted(model_names):
+    model = get_model(model_name)
+    table = getattr(model, "__table__", None)
+    if table is None or "id" not in table.c or "updated_at" not in table.c:
+      continue
+    queries.append(sa.select([
+        sa.literal(model_name),
+        sa.func.max(table.c.id),
+        sa.func.max(table.c.updated_at),
+    ]))
+  if not queries:
+    return []
+  return sorted(tuple(row) for row in db.session.execute(
+      sa.union_all(*queries)))
+
+
+def track_deletions(session, _):
+  """Mark a transaction that deletes objects, called after flush."""
+  if session.deleted:
+    session.info["query_cache_deletions"] = True
+
+
+def end_transaction(session):
+  """Count committed transactions that deleted objects."""
+  global _deletions  # pylint: disable=global-statement
+  if session.info.pop("query_cache_deletions", False):
+    with _deletions_lock:
+      _deletions += 1
+
+
+def get_deletions():
+  """Get the number of committed transactions that deleted objects."""
+  return _deletions
+
+
+def discard_deletions(session):
+  """Forget deletions of a transaction that was rolled back."""
+  session.info.pop("query_cache_deletions", None)
+
+
+def get_key(query):
+  """Get the cache key for the query posted by the current user.
+
+  Returns:
+    key string or None if results for the user can not be cached.
+  """
+  try:
+    fingerprint = permissions.get_permissions_fingerprint()
+  except NotImplementedError:
+    return None
+  model_names = get_query_models(query) | WATCHED_MODELS
+  key_data = {
+      "query": query,
+      "user": login.get_current_user_id(),
+      "permissions": fingerprint,
+      "watermarks": get_watermarks(model_names),
+      "tables": get_table_watermarks(model_names),
+      "deletions": get_deletions(),
+  }
+  return hashlib.sha1(json.dumps(
+      key_data, sort_keys=True, separators=(",", ":"), default=str,
+  )).hexdigest()
+
+
+def get_results(key):
+  """Get a copy of cached results for key or None on a cache miss."""
+  return LRUClient(get_store()).get(key)
+
+
+def store_results(key, results):
+  """Cache results under key."""
+  LRUClient(get_store()).set(key, results)
+
+
+def get_stats():
+  """Get hits, misses, evictions and the number of cached results."""
+  return get_store().get_stats()
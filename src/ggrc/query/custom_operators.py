@@ -19,6 +19,7 @@ from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.login import is_creator
 from ggrc.models import inflector
 from ggrc.models import relationship_helper
+from ggrc.models import relevance_cache
 from ggrc.snapshotter import rules
 from ggrc.query import my_objects
 from ggrc_basic_permissions import UserRole
@@ -78,13 +79,19 @@ def build_op_shortcut(predicate):
   return decorated
 
 
-@validate("left", "right")
-@build_op_shortcut
-def like(left, right):
+def _ilike(left, right):
   """Handle ~ operator with SQL LIKE."""
   return left.ilike(u"%{}%".format(right))
 
 
+def _not_empty(left, right):
+  """Check that the value is not empty."""
+  return sqlalchemy.not_(sqlalchemy.or_(left == u"", left.is_(None)))
+
+
+like = validate("left", "right")(build_op_shortcut(_ilike))
+
+
 def reverse(operation):
   """ decorator that returns sa.not_ for sending operation"""
   def decorated(*args, **kwargs):
@@ -106,9 +113,7 @@ def is_filter(exp, object_class, target_class, query):
   subquery = db.session.query(Record.key).filter(
       Record.type == object_class.__name__,
       Record.property == left,
-      sqlalchemy.not_(
-          sqlalchemy.or_(Record.content == u"", Record.content.is_(None))
-      ),
+      _not_empty(Record.content, exp['right']),
   )
   return object_class.id.notin_(subquery)
 
@@ -266,23 +271,8 @@ def similar(exp, object_class, target_class, query):
   return sqlalchemy.sql.false()
 
 
-@validate("object_name", "ids")
-def relevant(exp, object_class, target_class, query):
-  "Filter by relevant object"
-  if exp['object_name'] == "__previous__":
-    exp = query[exp['ids'][0]]
-  object_name = exp['object_name']
-  ids = exp['ids']
-  snapshoted = (object_class.__name__ in rules.Types.scoped and
-                object_name in rules.Types.all)
-  if not snapshoted:
-    return object_class.id.in_(
-        relationship_helper.get_ids_related_to(
-            object_class.__name__,
-            object_name,
-            ids,
-        )
-    )
+def _relevant_snapshot_ids(object_class, object_name, ids):
+  """Get subquery of ids of objects mapped to snapshots of given objects."""
   snapshot_qs = models.Snapshot.query.filter(
       models.Snapshot.parent_type == models.Audit.__name__,
       models.Snapshot.child_type == object_name,
@@ -307,12 +297,160 @@ def relevant(exp, object_class, target_class, query):
   ).options(
       load_only("destination_id")
   ).distinct()
-  ids_qs = dest_qs.union(source_qs).distinct().subquery()
+  return dest_qs.union(source_qs).distinct().subquery()
+
+
+@validate("object_name", "ids")
+def relevant(exp, object_class, target_class, query):
+  "Filter by relevant object"
+  if exp['object_name'] == "__previous__":
+    exp = query[exp['ids'][0]]
+  object_name = exp['object_name']
+  ids = exp['ids']
+  snapshoted = (object_class.__name__ in rules.Types.scoped and
+                object_name in rules.Types.all)
+  if relevance_cache.is_enabled():
+    if snapshoted:
+      def get_query():
+        ids_qs = _relevant_snapshot_ids(object_class, object_name, ids)
+        return db.session.query(ids_qs.c.relationships_source_id)
+    else:
+      def get_query():
+        return relationship_helper.get_ids_related_to(
+            object_class.__name__,
+            object_name,
+            ids,
+        )
+    relevant_ids = relevance_cache.get_ids(
+        object_class.__name__, object_name, ids, get_query)
+    if not relevant_ids:
+      return sqlalchemy.sql.false()
+    return object_class.id.in_(relevant_ids)
+  if not snapshoted:
+    return object_class.id.in_(
+        relationship_helper.get_ids_related_to(
+            object_class.__name__,
+            object_name,
+            ids,
+        )
+    )
+  ids_qs = _relevant_snapshot_ids(object_class, object_name, ids)
   return object_class.id == ids_qs.c.relationships_source_id
 
 
+def _autocast_operand(exp, key, target_class):
+  """Autocast exp[key] in place so that it is autocasted only once."""
+  operand = exp[key]
+  if operand and autocast.is_autocast_required_for(operand):
+    exp[key] = validate("left", "right")(autocast.autocast)(operand,
+                                                            target_class)
+  return exp[key]
+
+
+def _compile_fulltext(exp, target_class):
+  """Compile exp into a tree of predicates on fulltext records.
+
+  Leaves of the tree are ("LEAF", property, condition) tuples meaning that
+  the object has a record of the property matching the condition, inner
+  nodes are ("AND", left, right), ("OR", left, right) and ("NOT", node).
+
+  Operands of AND and OR nodes are autocasted in place.
+
+  Returns:
+    the predicate tree or None if exp contains filters that are not checked
+    on fulltext records.
+  """
+  if not exp or "left" not in exp or "right" not in exp:
+    return None
+  name = exp.get("op", {}).get("name")
+  if name in ("AND", "OR"):
+    nodes = []
+    for key in ("left", "right"):
+      node = _compile_fulltext(_autocast_operand(exp, key, target_class),
+                               target_class)
+      if node is None:
+        return None
+      nodes.append(node)
+    return (name, nodes[0], nodes[1])
+  if name not in FULLTEXT_PREDICATES:
+    return None
+  if name == "is" and exp["right"] != u"empty":
+    return None
+  predicate, negated = FULLTEXT_PREDICATES[name]
+  key = exp["left"].lower()
+  key, filter_by = target_class.attributes_map().get(key, (key, None))
+  if callable(filter_by) or key in GETATTR_WHITELIST:
+    return None
+  node = ("LEAF", key, predicate(Record.content, exp["right"]))
+  return ("NOT", node) if negated else node
+
+
+def _fulltext_leaves(node):
+  """Get all leaves of a fulltext predicate tree."""
+  if node[0] == "LEAF":
+    return [node]
+  return [leaf for child in node[1:] for leaf in _fulltext_leaves(child)]
+
+
+def _evaluate_fulltext(node, having):
+  """Build a value of the predicate tree with having(leaf) for leaves."""
+  if node[0] == "LEAF":
+    return having(node)
+  if node[0] == "NOT":
+    return sqlalchemy.not_(_evaluate_fulltext(node[1], having))
+  function = sqlalchemy.and_ if node[0] == "AND" else sqlalchemy.or_
+  return function(*[_evaluate_fulltext(child, having) for child in node[1:]])
+
+
+def _matches_without_records(node):
+  """Check if an object without fulltext records satisfies the tree."""
+  if node[0] == "LEAF":
+    return False
+  if node[0] == "NOT":
+    return not _matches_without_records(node[1])
+  function = all if node[0] == "AND" else any
+  return function(_matches_without_records(child) for child in node[1:])
+
+
+def fulltext_expression(node, object_class):
+  """Make a filter for a predicate tree with a single fulltext scan.
+
+  The records of all properties used in the tree are grouped by object and
+  every leaf becomes a conditional aggregate in HAVING clause, so the table
+  is scanned once instead of once per leaf. If the objects without records
+  satisfy the tree, the negated tree is used to find objects to exclude.
+  """
+  def having(leaf):
+    _, key, condition = leaf
+    return sqlalchemy.func.max(sqlalchemy.case(
+        [(sqlalchemy.and_(Record.property == key, condition), 1)],
+        else_=0,
+    )) == 1
+
+  keys = {leaf[1] for leaf in _fulltext_leaves(node)}
+  having_clause = _evaluate_fulltext(node, having)
+  negated = _matches_without_records(node)
+  if negated:
+    having_clause = sqlalchemy.not_(having_clause)
+  subquery = db.session.query(Record.key).filter(
+      Record.type == object_class.__name__,
+      Record.property.in_(keys),
+  ).group_by(
+      Record.key,
+  ).having(
+      having_clause,
+  )
+  if negated:
+    return object_class.id.notin_(subquery)
+  return object_class.id.in_(subquery)
+
+
 def build_expression(exp, object_class, target_class, query):
-  """Make an SQLAlchemy filtering expression from exp expression tree."""
+  """Make an SQLAlchemy filtering expression from exp expression tree.
+
+  AND and OR subtrees built only of fulltext filters are checked with a
+  single subquery, see fulltext_expression.
+  """
   if not exp:
     # empty expression doesn't required filter
     return
@@ -325,20 +463,58 @@ def build_expression(exp, object_class, target_class, query):
   return operation(exp, object_class, target_class, query)
 
 
+def _flatten(exp, name, target_class):
+  """Get operands of a chain of name operations."""
+  is_chain = (exp and exp.get("op", {}).get("name") == name and
+              "left" in exp and "right" in exp)
+  if is_chain:
+    return [operand
+            for key in ("left", "right")
+            for operand in _flatten(
+                _autocast_operand(exp, key, target_class), name, target_class)]
+  return [exp]
+
+
+def _build_chain(exp, object_class, target_class, query):
+  """Build operands of an AND or OR chain.
+
+  Operands that are fulltext filters are joined into one subquery if there
+  are at least two fulltext leaves among them.
+  """
+  name = exp["op"]["name"]
+  operands = _flatten(exp, name, target_class)
+  fulltext = []
+  other = []
+  for operand in operands:
+    node = _compile_fulltext(operand, target_class)
+    if node is None:
+      other.append(operand)
+    else:
+      fulltext.append(node)
+  if sum(len(_fulltext_leaves(node)) for node in fulltext) < 2:
+    return [build_expression(operand, object_class, target_class, query)
+            for operand in operands]
+  node = fulltext[0]
+  for right in fulltext[1:]:
+    node = (name, node, right)
+  return [fulltext_expression(node, object_class)] + [
+      build_expression(operand, object_class, target_class, query)
+      for operand in other
+  ]
+
+
 @validate("left", "right")
 def and_operation(exp, object_class, target_class, query):
   """Operator generate sqlalchemy for and operation"""
   return sqlalchemy.and_(
-      build_expression(exp["left"], object_class, target_class, query),
-      build_expression(exp["right"], object_class, target_class, query))
+      *_build_chain(exp, object_class, target_class, query))
 
 
 @validate("left", "right")
 def or_operation(exp, object_class, target_class, query):
   """Operator generate sqlalchemy for or operation"""
   return sqlalchemy.or_(
-      build_expression(exp["left"], object_class, target_class, query),
-      build_expression(exp["right"], object_class, target_class, query))
+      *_build_chain(exp, object_class, target_class, query))
 
 
 EQ_OPERATOR = validate("left", "right")(build_op_shortcut(operator.eq))
@@ -347,6 +523,19 @@ GT_OPERATOR = validate("left", "right")(build_op_shortcut(operator.gt))
 LE_OPERATOR = validate("left", "right")(build_op_shortcut(operator.le))
 GE_OPERATOR = validate("left", "right")(build_op_shortcut(operator.ge))
 
+# Operators checked on fulltext records: (predicate, negated) pairs.
+FULLTEXT_PREDICATES = {
+    "=": (operator.eq, False),
+    "!=": (operator.eq, True),
+    "~": (_ilike, False),
+    "!~": (_ilike, True),
+    "<": (operator.lt, False),
+    ">": (operator.gt, False),
+    "<=": (operator.le, False),
+    ">=": (operator.ge, False),
+    "is": (_not_empty, True),
+}
+
 OPS = {
     "AND": and_operation,
     "OR": or_operation,
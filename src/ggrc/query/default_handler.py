@@ -44,6 +44,7 @@ class DefaultHandler(QueryHelper):
       list of dicts: same query as the input with requested results that match
                      the filter.
     """
+    self._prefetch_ids()
     for object_query in self.query:
       query_type = object_query.get("type", "values")
       if query_type not in {"values", "ids", "count"}:
@@ -71,6 +72,11 @@ class DefaultHandler(QueryHelper):
           object_query["ids"] = ids
     return self.query
 
+  @staticmethod
+  def _stores_ids(object_query):
+    """Only ids of "ids" queries are stored in results."""
+    return object_query.get("type", "values") == "ids"
+
   @staticmethod
   def _transform_to_json(objects, fields=None):
     """Make a JSON representation of objects from the list."""
@@ -0,0 +1,142 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Keyset pagination helpers.
+
+Instead of skipping OFFSET rows, a page is fetched with a condition that
+selects only rows sorted after the last row of the previous page. The sort
+key of that row is passed between pages as an opaque cursor. The ordering
+must end with a unique column, such as the object id, so that the sort key
+identifies a single row.
+
+MySQL sorts NULL values first in ascending and last in descending order, and
+the seek condition follows the same rules, so nullable and outer joined sort
+columns are supported.
+"""
+
+import base64
+import datetime
+import decimal
+import json
+
+import sqlalchemy as sa
+
+from ggrc.query.exceptions import BadQueryException
+
+
+_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+_DATE_FORMAT = "%Y-%m-%d"
+
+
+def _encode_value(value):
+  """Convert a sort key value into a JSON serializable value."""
+  if isinstance(value, datetime.datetime):
+    return {"datetime": value.strftime(_DATETIME_FORMAT)}
+  if isinstance(value, datetime.date):
+    return {"date": value.strftime(_DATE_FORMAT)}
+  if isinstance(value, decimal.Decimal):
+    return {"decimal": str(value)}
+  return value
+
+
+def _decode_value(value):
+  """Convert a value encoded by _encode_value back into a sort key value."""
+  if not isinstance(value, dict):
+    return value
+  if "datetime" in value:
+    return datetime.datetime.strptime(value["datetime"], _DATETIME_FORMAT)
+  if "date" in value:
+    return datetime.datetime.strptime(value["date"], _DATE_FORMAT).date()
+  return decimal.Decimal(value["decimal"])
+
+
+def encode_cursor(values):
+  """Encode sort key values of a row into a cursor string."""
+  return base64.urlsafe_b64encode(
+      json.dumps([_encode_value(value) for value in values]))
+
+
+def decode_cursor(cursor, length):
+  """Decode a cursor of a sort key with length values.
+
+  Raises:
+    BadQueryException if the cursor is not a valid cursor for the sort key.
+  """
+  try:
+    values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    if not isinstance(values, list) or len(values) != length:
+      raise ValueError("Wrong number of cursor values")
+    return [_decode_value(value) for value in values]
+  except (TypeError, ValueError, KeyError, decimal.InvalidOperation):
+    raise BadQueryException(u"Invalid cursor {}".format(cursor))
+
+
+def order_clause(column, desc):
+  """Get an ORDER BY clause for a column."""
+  return column.desc() if desc else column.asc()
+
+
+def _after(column, value, desc):
+  """Get a condition for column values sorted after value."""
+  if desc:
+    if value is None:
+      return sa.false()
+    return sa.or_(column < value, column.is_(None))
+  if value is None:
+    return column.isnot(None)
+  return column > value
+
+
+def _equal(column, value):
+  """Get a condition for column values equal to value in sort order."""
+  if value is None:
+    return column.is_(None)
+  return column == value
+
+
+def seek_filter(order_columns, values):
+  """Get a condition for rows sorted after the row with sort key values.
+
+  Args:
+    order_columns: list of (column, True if descending) pairs.
+    values: sort key values of the last row of the previous page.
+
+  Returns:
+    condition (a1 after v1) OR (a1 = v1 AND a2 after v2) OR ...
+  """
+  conditions = []
+  for index, (column, desc) in enumerate(order_columns):
+    equal = [_equal(prev_column, prev_value) for (prev_column, _), prev_value
+             in zip(order_columns[:index], values[:index])]
+    conditions.append(sa.and_(*(equal + [_after(column, values[index],
+                                                desc)])))
+  return sa.or_(*conditions)
+
+
+def get_keyset_page(query, order_columns, page_size, cursor=None):
+  """Get a page of rows after the cursor and the cursor of the next page.
+
+  Args:
+    query: filter query, its ordering is replaced with order_columns.
+    order_columns: list of (column, True if descending) pairs ending with a
+                   unique column.
+    page_size: number of rows on a page.
+    cursor: cursor returned for the previous page or None for the first page.
+
+  Returns:
+    list of rows of the query with values of order columns appended and the
+    cursor of the next page or None if this is the last page.
+  """
+  columns = [column for column, _ in order_columns]
+  query = query.add_columns(*columns)
+  if cursor:
+    values = decode_cursor(cursor, len(columns))
+    query = query.filter(seek_filter(order_columns, values))
+  query = query.order_by(None).order_by(
+      *[order_clause(column, desc) for column, desc in order_columns])
+  rows = query.limit(page_size + 1).all()
+  next_cursor = None
+  if len(rows) > page_size:
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1][-len(columns):])
+  return rows, next_cursor
@@ -11,6 +11,7 @@ from flask import request
 from flask import current_app
 from werkzeug.exceptions import BadRequest
 
+from ggrc.query import cache as query_cache
 from ggrc.query.exceptions import BadQueryException
 from ggrc.query.default_handler import DefaultHandler
 from ggrc.query.assessment_related_objects import AssessmentRelatedObjects
@@ -91,13 +92,23 @@ def get_objects_by_query():
   """Return objects corresponding to a POST'ed query list."""
   query = request.json
 
+  cache_key = None
+  if query_cache.is_enabled():
+    with benchmark("Query cache lookup"):
+      cache_key = query_cache.get_key(query)
+      cached = query_cache.get_results(cache_key) if cache_key else None
+    if cached is not None:
+      collections, last_modified = cached
+      return json_success_response(collections, last_modified)
+
   results = get_handler_results(query)
 
   last_modified_list = [result["last_modified"] for result in results
                         if result["last_modified"]]
   last_modified = max(last_modified_list) if last_modified_list else None
   collections = []
-  collection_fields = ["ids", "values", "count", "total", "object_name"]
+  collection_fields = ["ids", "values", "count", "total", "object_name",
+                       "next_cursor"]
 
   for result in results:
     model = get_model(result["object_name"])
@@ -111,6 +122,8 @@ def get_objects_by_query():
     )
     collections.append(collection)
 
+  if cache_key:
+    query_cache.store_results(cache_key, (collections, last_modified))
   return json_success_response(collections, last_modified)
 
 
@@ -173,6 +173,11 @@ def has_conditions(action, resource):
               .get('conditions', {}))
 
 
+def get_permissions_fingerprint():
+  """Get a hash of permissions of the current user."""
+  return permissions_for(get_user()).permissions_fingerprint()
+
+
 def get_context_resource(model_name, permission_type='read',
                          permission_model=None):
   """Get allowed contexts and resources."""
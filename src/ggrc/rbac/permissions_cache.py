@@ -0,0 +1,191 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Versioned cache of user permissions.
+
+User permissions are cached together with the versions they were loaded
+with: the global version, which is incremented by changes that can affect
+permissions of any user, and the version of the user, which is incremented
+by changes of that user's roles, access control list entries and
+assignments. A cached entry is only used while both versions are unchanged,
+so invalidating permissions of one user leaves other entries intact.
+"""
+
+import random
+
+from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy import tuple_
+
+from ggrc import db
+
+
+PERMISSIONS_KEY = 'permissions:{}'
+GLOBAL_VERSION_KEY = 'permissions:version'
+USER_VERSION_KEY = 'permissions:version:{}'
+PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
+
+# Changes of these models can change permissions of any user.
+GLOBAL_MODELS = {
+    "AccessControlRole",
+    "Context",
+    "ContextImplication",
+    "Role",
+    "Workflow",
+}
+
+# Changes of these models change permissions of the person they belong to.
+PERSON_MODELS = {
+    "AccessControlList",
+    "UserRole",
+}
+
+
+def _new_version():
+  """Get a random starting version unlikely to equal an evicted version."""
+  return random.getrandbits(62)
+
+
+def _get_versions(cache, values, keys):
+  """Get versions for keys, adding a new version for missing keys."""
+  versions = []
+  for key in keys:
+    version = values.get(key)
+    if version is None:
+      cache.add(key, _new_version())
+      version = cache.get(key)
+    versions.append(version)
+  return tuple(versions)
+
+
+def get_cached_permissions(cache, user_id):
+  """Get current permission versions and cached permissions of a user.
+
+  Args:
+    cache: memcache client.
+    user_id (int): id of the user.
+
+  Returns:
+    tuple of current versions and permissions dict or None if there are no
+    valid cached permissions.
+  """
+  version_keys = [GLOBAL_VERSION_KEY, USER_VERSION_KEY.format(user_id)]
+  permissions_key = PERMISSIONS_KEY.format(user_id)
+  values = cache.get_multi(version_keys + [permissions_key])
+  versions = _get_versions(cache, values, version_keys)
+  entry = values.get(permissions_key)
+  if None in versions or not entry or entry["versions"] != versions:
+    return versions, None
+  return versions, entry["permissions"]
+
+
+def store_permissions(cache, user_id, versions, permissions):
+  """Cache permissions loaded when the permission versions were versions.
+
+  If permissions got invalidated while they were loaded, the stored entry
+  has old versions and is not used.
+  """
+  if None in versions:
+    return
+  cache.set(PERMISSIONS_KEY.format(user_id),
+            {"versions": versions, "permissions": permissions},
+            PERMISSION_CACHE_TIMEOUT)
+
+
+def invalidate_permissions(cache, user_ids=None):
+  """Invalidate cached permissions of given users or of all users if None.
+
+  Missing version keys are not created, since entries can not be validated
+  against a missing version.
+  """
+  if user_ids is None:
+    keys = [GLOBAL_VERSION_KEY]
+  else:
+    keys = [USER_VERSION_KEY.format(user_id) for user_id in user_ids]
+  for key in keys:
+    cache.incr(key)
+
+
+def _get_relationship_endpoints(relationship_ids):
+  """Get (type, id) pairs of both sides of relationships."""
+  from ggrc.models import all_models
+  rel = all_models.Relationship
+  endpoints = set()
+  query = db.session.query(
+      rel.source_type, rel.source_id, rel.destination_type, rel.destination_id
+  ).filter(rel.id.in_(relationship_ids))
+  for source_type, source_id, destination_type, destination_id in query:
+    endpoints.add((source_type, source_id))
+    endpoints.add((destination_type, destination_id))
+  return endpoints
+
+
+def _owns_context(endpoints):
+  """Check if any of the (type, id) pairs is a related object of a context."""
+  from ggrc.models import all_models
+  context = all_models.Context
+  return db.session.query(context.id).filter(
+      tuple_(context.related_object_type,
+             context.related_object_id).in_(endpoints)
+  ).first() is not None
+
+
+def _get_assignee_ids(endpoints):
+  """Get ids of people assigned to any of the (type, id) pairs."""
+  from ggrc.models import all_models
+  rel = all_models.Relationship
+  attr = all_models.RelationshipAttr
+  query = db.session.query(
+      rel.source_type, rel.source_id, rel.destination_id
+  ).join(attr, and_(
+      attr.relationship_id == rel.id,
+      attr.attr_name == "AssigneeType",
+  )).filter(or_(
+      and_(rel.source_type == "Person",
+           tuple_(rel.destination_type, rel.destination_id).in_(endpoints)),
+      and_(rel.destination_type == "Person",
+           tuple_(rel.source_type, rel.source_id).in_(endpoints)),
+  ))
+  return {source_id if source_type == "Person" else destination_id
+          for source_type, source_id, destination_id in query}
+
+
+def get_affected_user_ids(objects):
+  """Get ids of users whose permissions can change with changed objects.
+
+  Relationships change permissions of people they map, of people assigned to
+  the mapped objects and of everyone with a role in a context of a mapped
+  object.
+
+  Args:
+    objects: created, updated and deleted objects.
+
+  Returns:
+    set of user ids or None if permissions of all users can change.
+  """
+  user_ids = set()
+  endpoints = set()
+  relationship_ids = set()
+  for obj in objects:
+    model_name = obj.__class__.__name__
+    if model_name in GLOBAL_MODELS:
+      return None
+    if model_name in PERSON_MODELS:
+      user_ids.add(obj.person_id)
+    elif model_name == "Person":
+      user_ids.add(obj.id)
+    elif model_name == "Relationship":
+      endpoints.add((obj.source_type, obj.source_id))
+      endpoints.add((obj.destination_type, obj.destination_id))
+    elif model_name == "RelationshipAttr":
+      relationship_ids.add(obj.relationship_id)
+  if relationship_ids:
+    endpoints.update(_get_relationship_endpoints(relationship_ids))
+  user_ids.update(id_ for type_, id_ in endpoints if type_ == "Person")
+  related_objects = {(type_, id_) for type_, id_ in endpoints
+                     if type_ != "Person"}
+  if related_objects:
+    if _owns_context(related_objects):
+      return None
+    user_ids.update(_get_assignee_ids(related_objects))
+  return user_ids
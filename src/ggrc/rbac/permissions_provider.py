@@ -1,6 +1,8 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+import hashlib
+import json
 from collections import namedtuple
 from flask import g
 from flask.ext.login import current_user
@@ -169,6 +171,68 @@ _CONDITIONS_MAP = {
 }
 
 
+class CompiledPermissions(object):
+  """Permissions dict compiled into sets for constant time lookups.
+
+  Context and resource id lists of every (action, resource type) pair are
+  converted into frozensets, and the check for the global admin permission
+  is done once on compilation instead of on every permission check.
+  """
+
+  _EMPTY = frozenset()
+
+  def __init__(self, permissions):
+    self.source = permissions
+    self._fingerprint = None
+    self.contexts = {}
+    self.resources = {}
+    for action, resource_permissions in (permissions or {}).iteritems():
+      if not isinstance(resource_permissions, dict):
+        continue
+      for resource_type, permission in resource_permissions.iteritems():
+        key = (action, resource_type)
+        self.contexts[key] = frozenset(permission.get('contexts', ()))
+        self.resources[key] = frozenset(permission.get('resources', ()))
+    admin = DefaultUserPermissions.ADMIN_PERMISSION
+    self.is_admin = self._match(admin.action, admin.resource_type,
+                                admin.resource_id, admin.context_id)
+
+  def _match(self, action, resource_type, resource_id, context_id):
+    """Check if the user has the given permission"""
+    contexts = self.contexts.get((action, resource_type), self._EMPTY)
+    if None in contexts:
+      return True
+    return (
+        resource_id in self.resources.get((action, resource_type),
+                                          self._EMPTY) or
+        context_id in contexts or
+        context_id in self.contexts.get(
+            (action, DefaultUserPermissions.ADMIN_PERMISSION.resource_type),
+            self._EMPTY)
+    )
+
+  @property
+  def fingerprint(self):
+    """Hash of the compiled permissions, equal for equal permissions"""
+    if self._fingerprint is None:
+      self._fingerprint = hashlib.sha1(json.dumps(
+          self.source, sort_keys=True, default=str)).hexdigest()
+    return self._fingerprint
+
+  def is_allowed(self, permission):
+    """Check if the permission is allowed directly, globally or by admin"""
+    action, resource_type, resource_id, context_id = permission
+    if resource_type != '/admin' and context_id and \
+       self.is_allowed(permission._replace(context_id=None)):
+      return True
+    if self._match(action, resource_type, resource_id, context_id):
+      return True
+    if self.is_admin:
+      return True
+    admin = DefaultUserPermissions.ADMIN_PERMISSION
+    return self._match(admin.action, admin.resource_type, None, context_id)
+
+
 class DefaultUserPermissions(UserPermissions):
   # super user, context_id 0 indicates all contexts
   ADMIN_PERMISSION = Permission(
@@ -186,49 +250,26 @@ class DefaultUserPermissions(UserPermissions):
         None,
         context_id)
 
-  def _permission_match(self, permission, permissions):
-    """Check if the user has the given permission"""
-
-    if None in \
-        permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', []):
-      return True
-    return \
-        permission.resource_id in permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('resources', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('contexts', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(self.ADMIN_PERMISSION.resource_type, {})\
-        .get('contexts', [])
-
   @staticmethod
   def _permissions():
     """Returns request permission from the global scope"""
     return getattr(g, '_request_permissions', {})
 
-  def _is_allowed(self, permission):
+  def _compiled_permissions(self):
+    """Returns compiled permissions, compiling them once per request"""
     permissions = self._permissions()
-    if permission.resource_type != '/admin' \
-       and permission.context_id \
-       and self._is_allowed(permission._replace(context_id=None)):
-      return True
-    if self._permission_match(permission, permissions):
-      return True
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      return True
-    return self._permission_match(
-        self._admin_permission_for_context(permission.context_id),
-        permissions)
+    compiled = getattr(g, '_compiled_permissions', None)
+    if compiled is None or compiled.source is not permissions:
+      compiled = CompiledPermissions(permissions)
+      setattr(g, '_compiled_permissions', compiled)
+    return compiled
+
+  def _is_allowed(self, permission):
+    return self._compiled_permissions().is_allowed(permission)
+
+  def permissions_fingerprint(self):
+    """Hash of the user permissions that changes when permissions change"""
+    return self._compiled_permissions().fingerprint
 
   @staticmethod
   def _check_conditions(instance, action, conditions):
@@ -243,7 +284,7 @@ class DefaultUserPermissions(UserPermissions):
   def _is_allowed_for(self, instance, action):
     permissions = self._permissions()
     # Check for admin permission
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._compiled_permissions().is_admin:
       conditions = permissions[self.ADMIN_PERMISSION.action]\
           .get(self.ADMIN_PERMISSION.resource_type)\
           .get("conditions", {})\
@@ -332,7 +373,7 @@ class DefaultUserPermissions(UserPermissions):
     resource_type"""
     permissions = self._permissions()
 
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._compiled_permissions().is_admin:
       return None
 
     # Get the list of resources for a given resource type and any
@@ -353,7 +394,7 @@ class DefaultUserPermissions(UserPermissions):
     #   permissions are expected (e.g. that every user has ADMIN_PERMISSION).
     permissions = self._permissions()
 
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._compiled_permissions().is_admin:
       return None
 
     # Get the list of contexts for a given resource type and any
@@ -67,6 +67,11 @@ class UserPermissions(object):
     """All contexts in which the user has delete permission."""
     raise NotImplementedError()
 
+  def permissions_fingerprint(self):
+    """A hash of the permissions that changes when the permissions change,
+    used to cache results that depend on permissions."""
+    raise NotImplementedError()
+
 class BasicUserPermissions(UserPermissions):
   """Basic implementation of a UserPermissions object."""
 
@@ -37,10 +37,13 @@ from ggrc.models.event import Event
 from ggrc.models.revision import Revision
 from ggrc.models.exceptions import ValidationError, translate_message
 from ggrc.rbac import permissions, context_query_filter
+from ggrc.rbac import permissions_cache
 from ggrc.services.attribute_query import AttributeQueryBuilder
 from ggrc.services import signals
 from ggrc.models.background_task import BackgroundTask, create_task
+from ggrc.query import pagination
 from ggrc.query import utils as query_utils
+from ggrc.query.exceptions import BadQueryException
 from ggrc import settings
 
 
@@ -52,9 +55,9 @@ CACHE_EXPIRY_COLLECTION = 60
 
 
 def _get_cache_manager():
-  from ggrc.cache import CacheManager, MemCache
+  from ggrc.cache import CacheManager, get_cache_backend_class
   cache_manager = CacheManager()
-  cache_manager.initialize(MemCache())
+  cache_manager.initialize(get_cache_backend_class()())
   return cache_manager
 
 
@@ -183,6 +186,10 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
     if len(modified_objects.deleted) > 0:
       memcache_mark_for_deletion(context, modified_objects.deleted.items())
 
+    context.permissions_user_ids = permissions_cache.get_affected_user_ids(
+        itertools.chain(modified_objects.new, modified_objects.dirty,
+                        modified_objects.deleted))
+
   status_entries = {}
   for key in context.cache_manager.marked_for_delete:
     build_cache_status(status_entries, 'DeleteOp:' + key,
@@ -244,7 +251,8 @@ def update_memcache_after_commit(context):
     if delete_result is not True:
       logger.error("CACHE: Failed to remove status entries from cache")
 
-  clear_permission_cache()
+  clear_permission_cache(getattr(context, 'permissions_user_ids', None))
+  context.permissions_user_ids = None
   cache_manager.clear_cache()
 
 
@@ -396,15 +404,12 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
   return event
 
 
-def clear_permission_cache():
+def clear_permission_cache(user_ids=None):
+  """Invalidate cached permissions of given users or of all users if None."""
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
     return
   cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  cached_keys_set.add('permissions:list')
-  # We delete all the cached user permissions as well as
-  # the permissions:list value itself
-  cache.delete_multi(cached_keys_set)
+  permissions_cache.invalidate_permissions(cache, user_ids)
 
 
 class ModelView(View):
@@ -574,10 +579,23 @@ class ModelView(View):
             search_query, models, get_current_user_id())
       search_subquery = search_query.subquery()
       query = query.filter(self.model.id.in_(search_subquery))
-    order_properties = []
+    query = query.order_by(*[pagination.order_clause(column, desc)
+                             for column, desc in self.get_order_columns()])
+    if '__limit' in request.args and '__cursor' not in request.args:
+      try:
+        limit = int(request.args['__limit'])
+        query = query.limit(limit)
+      except (TypeError, ValueError):
+        pass
+    query = query.distinct()
+    return query
+
+  def get_order_columns(self):
+    """Get (column, True if descending) pairs for ordering collections."""
+    order_columns = []
     if '__sort' in request.args:
       sort_attrs = request.args['__sort'].split(",")
-      sort_desc = request.args.get('__sort_desc', False)
+      sort_desc = bool(request.args.get('__sort_desc', False))
       for sort_attr in sort_attrs:
         attr_desc = sort_desc
         if sort_attr.startswith('-'):
@@ -585,24 +603,14 @@ class ModelView(View):
           sort_attr = sort_attr[1:]
         order_property = getattr(self.model, sort_attr, None)
         if order_property and hasattr(order_property, 'desc'):
-          if attr_desc:
-            order_property = order_property.desc()
-          order_properties.append(order_property)
+          order_columns.append((order_property, attr_desc))
         else:
           # Possibly throw an exception instead,
           # if sorting by invalid attribute?
           pass
-    order_properties.append(self.modified_attr.desc())
-    order_properties.append(self.model.id.desc())
-    query = query.order_by(*order_properties)
-    if '__limit' in request.args:
-      try:
-        limit = int(request.args['__limit'])
-        query = query.limit(limit)
-      except (TypeError, ValueError):
-        pass
-    query = query.distinct()
-    return query
+    order_columns.append((self.modified_attr, True))
+    order_columns.append((self.model.id, True))
+    return order_columns
 
   def get_object(self, id):
     # This could also use `self.pk`
@@ -957,6 +965,8 @@ class Resource(ModelView):
     page_size = min(
         int(request.args.get('__page_size', self.DEFAULT_PAGE_SIZE)),
         self.MAX_PAGE_SIZE)
+    if '__cursor' in request.args:
+      return self.apply_cursor_paging(matches_query, page_size)
     if '__page_only' in request.args:
       page_number = int(request.args.get('__page', 0))
       matches = []
@@ -978,6 +988,26 @@ class Resource(ModelView):
     }
     return matches, collection_extras
 
+  def apply_cursor_paging(self, matches_query, page_size):
+    """Get a page of matches after the `__cursor` with keyset pagination.
+
+    The total count is only computed if `__count_total` is requested, so the
+    cost of a page does not depend on its depth.
+    """
+    total = None
+    if '__count_total' in request.args:
+      total = matches_query.order_by(None).count()
+    try:
+      matches, next_cursor = pagination.get_keyset_page(
+          matches_query, self.get_order_columns(), page_size,
+          request.args['__cursor'])
+    except BadQueryException as error:
+      raise BadRequest(error.message)
+    collection_extras = {
+        'paging': self.build_cursor_page_object_for_json(next_cursor, total)
+    }
+    return matches, collection_extras
+
   def get_matched_resources(self, matches):
     cache_objs = {}
     if self.has_cache():
@@ -990,7 +1020,7 @@ class Resource(ModelView):
 
     database_objs = {}
     if len(database_matches) > 0:
-      database_objs = self.get_resources_from_database(matches)
+      database_objs = self.get_resources_from_database(database_matches)
       if self.has_cache():
         with benchmark("Add resources to cache"):
           self.add_resources_to_cache(database_objs)
@@ -1018,7 +1048,8 @@ class Resource(ModelView):
       matches_query = self.get_collection_matches(
           self.model, filter_by_contexts)
     with benchmark("dispatch_request > collection_get > Query Data"):
-      if '__page' in request.args or '__page_only' in request.args:
+      if '__page' in request.args or '__page_only' in request.args or \
+         '__cursor' in request.args:
         with benchmark("Query matches with paging"):
           matches, extras = self.apply_paging(matches_query)
       else:
@@ -1074,21 +1105,19 @@ class Resource(ModelView):
     # invalidation logic so we have to disabling memcache.
     if self.model.__name__ == 'BackgroundTask':
       return resources
-    # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
-    for match in matches:
-      key = get_cache_key(None, id=match[0], type=match[1])
-      val = memcache_client.get(key) or {}
-      if "selfLink" in val:
-        resources[match] = val
+    keys = {get_cache_key(None, id=match[0], type=match[1]): match
+            for match in matches}
+    cached = self.request.cache_manager.bulk_get(keys.keys()) or {}
+    for key, val in cached.iteritems():
+      if val and "selfLink" in val:
+        resources[keys[key]] = val
     return resources
 
   def add_resources_to_cache(self, match_obj_pairs):
     """Add resources to cache if they are not blocked by DeleteOp entries"""
-    # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
-    for match, obj in match_obj_pairs.items():
-      memcache_client.add(get_cache_key(None, id=match[0], type=match[1]), obj)
+    entries = {get_cache_key(None, id=match[0], type=match[1]): obj
+               for match, obj in match_obj_pairs.iteritems()}
+    self.request.cache_manager.bulk_add(entries)
 
   def invalidate_cache_to(self, obj):
     """Invalidate api cache for sent object."""
@@ -1458,6 +1487,20 @@ class Resource(ModelView):
     paging_obj['total'] = paging.total
     return paging_obj
 
+  def build_cursor_page_object_for_json(self, next_cursor, total=None):
+    def page_url(cursor):
+      params = dict((k, unicode(v)) for k, v in request.args.items())
+      params['__cursor'] = cursor
+      return base_url + '?' + urlencode(utils.encoded_dict(params))
+
+    base_url = self.url_for()
+    paging_obj = {'first': page_url('')}
+    if next_cursor:
+      paging_obj['next'] = page_url(next_cursor)
+    if total is not None:
+      paging_obj['total'] = total
+    return paging_obj
+
   def get_resources_from_database(self, matches):
     # FIXME: This is cheating -- `matches` should be allowed to be any model
     model = self.model
@@ -1596,25 +1639,76 @@ class ExtendedResource(Resource):
     )
 
 
-def filter_resource(resource, depth=0, user_permissions=None):  # noqa
-  """
-  Returns:
-     The subset of resources which are readable based on user_permissions
+class _ReadFilter(object):
+  """Bulk read permission checks for serialized resources.
+
+  All checks are memoized, so every distinct (type, id, context_id) stub is
+  checked only once, and the instances needed for Creator revision checks
+  are loaded with one query per resource type.
   """
 
-  if user_permissions is None:
-    user_permissions = permissions.permissions_for(get_current_user())
+  def __init__(self, user_permissions):
+    self.user_permissions = user_permissions
+    self.is_creator = _is_creator()
+    self.allowed = {}
+    self.allowed_instances = {}
+    self.readable = {}
+
+  def _readable_for(self, type_):
+    """Get sets of readable contexts (None for all) and resources for type."""
+    if type_ not in self.readable:
+      contexts = permissions.read_contexts_for(type_)
+      resources = permissions.read_resources_for(type_) or []
+      self.readable[type_] = (
+          set(contexts) if contexts is not None else None,
+          set(resources),
+      )
+    return self.readable[type_]
 
-  if isinstance(resource, (list, tuple)):
-    filtered = []
-    for sub_resource in resource:
-      filtered_sub_resource = filter_resource(
-          sub_resource, depth=depth + 1, user_permissions=user_permissions)
-      if filtered_sub_resource is not None:
-        filtered.append(filtered_sub_resource)
-    return filtered
-  elif isinstance(resource, dict) and 'type' in resource:
-    # First check current level
+  def _can_read_relationship(self, resource):
+    """Check that Creator can read both sides of the relationship.
+
+    In order to avoid loading full instances and using is_allowed_read_for,
+    we are making a special test for the Creator here. Creator can only see
+    relationship objects where he has read access on both source and
+    destination. This is defined in Creator.py:220 file, but is_allowed_read
+    can not check conditions without the full instance.
+    """
+    for name in ('source', 'destination'):
+      inst = resource[name]
+      if not inst:
+        # If object was deleted but relationship still exists
+        continue
+      contexts, resources = self._readable_for(inst['type'])
+      if contexts is None:
+        # read_contexts_for returns None if the user has access to all the
+        # objects of this type.
+        continue
+      if inst['context_id'] in contexts or inst['id'] in resources:
+        continue
+      return False
+    return True
+
+  def _load_revision_targets(self, resources):
+    """Load objects of Creator readable revisions, one query per type."""
+    ids_by_type = defaultdict(set)
+    for resource in resources:
+      if resource['type'] == "Revision" and \
+         hasattr(ggrc.models.all_models, resource['resource_type']):
+        key = (resource['resource_type'], resource['resource_id'])
+        if key not in self.allowed_instances:
+          ids_by_type[key[0]].add(key[1])
+    for type_, ids in ids_by_type.iteritems():
+      res_model = getattr(ggrc.models.all_models, type_)
+      instances = {obj.id: obj
+                   for obj in res_model.query.filter(res_model.id.in_(ids))}
+      for id_ in ids:
+        instance = instances.get(id_)
+        self.allowed_instances[type_, id_] = instance is not None and \
+            self.user_permissions.is_allowed_read_for(instance)
+
+  def _can_read(self, resource):
+    """Check read permission for a single serialized resource."""
     context_id = False
     if 'context' in resource:
       if resource['context'] is None:
@@ -1625,59 +1719,84 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
       context_id = resource['context_id']
     assert context_id is not False, "No context found for object"
 
-    # In order to avoid loading full instances and using is_allowed_read_for,
-    # we are making a special test for the Creator here. Creator can only
-    # see relationship objects where he has read access on both source and
-    # destination. This is defined in Creator.py:220 file, but is_allowed_read
-    # can not check conditions without the full instance
-    if resource['type'] == "Relationship" and _is_creator():
-      # Make a check for relationship objects that are a special case
-      can_read = True
-      for name in ('source', 'destination'):
-        inst = resource[name]
-        if not inst:
-          # If object was deleted but relationship still exists
-          continue
-        contexts = permissions.read_contexts_for(inst['type'])
-        if contexts is None:
-          # read_contexts_for returns None if the user has access to all the
-          # objects of this type. If the user doesn't have access to any object
-          # an empty list ([]) will be returned
-          continue
-        resources = permissions.read_resources_for(inst['type']) or []
-        if inst['context_id'] in contexts or inst['id'] in resources:
-          continue
-        can_read = False
-      if not can_read:
-        return None
-    elif resource['type'] == "Revision" and _is_creator():
-      # Make a check for revision objects that are a special case
-      if not hasattr(ggrc.models.all_models, resource['resource_type']):
-        # there are no permissions for old objects
-        return None
-      res_model = getattr(ggrc.models.all_models, resource['resource_type'])
-      instance = res_model.query.get(resource['resource_id'])
-      if instance is None or\
-         not user_permissions.is_allowed_read_for(instance):
-        return None
+    if resource['type'] == "Relationship" and self.is_creator:
+      return self._can_read_relationship(resource)
+    if resource['type'] == "Revision" and self.is_creator:
+      # there are no permissions for old objects
+      return self.allowed_instances.get(
+          (resource['resource_type'], resource['resource_id']), False)
+    key = (resource['type'], resource['id'], context_id)
+    if key not in self.allowed:
+      self.allowed[key] = self.user_permissions.is_allowed_read(*key)
+    return self.allowed[key]
+
+  def check(self, resources):
+    """Get read permissions for a list of serialized resources."""
+    if self.is_creator:
+      self._load_revision_targets(resources)
+    return [self._can_read(resource) for resource in resources]
+
+
+def _flatten_resources(resource):
+  """Get all top level resources from nested lists of resources."""
+  stack = [resource]
+  while stack:
+    item = stack.pop()
+    if isinstance(item, (list, tuple)):
+      stack.extend(reversed(item))
+    elif isinstance(item, dict) and 'type' in item:
+      yield item
     else:
-      if not user_permissions.is_allowed_read(resource['type'],
-                                              resource['id'], context_id):
-        return None
-    # Then, filter any typed keys
-    for key, value in resource.items():
-      if key == 'context':
-        # Explicitly allow `context` objects to pass through
-        pass
-      else:
-        # Apply filtering to sub-resources
-        if isinstance(value, dict) and 'type' in value:
-          resource[key] = filter_resource(
-              value, depth=depth + 1, user_permissions=user_permissions)
+      assert False, "Non-object passed to filter_resource"
 
-    return resource
-  else:
-    assert False, "Non-object passed to filter_resource"
+
+def _filter_lists(resource, allowed):
+  """Drop unreadable resources from (nested) lists of resources."""
+  if isinstance(resource, (list, tuple)):
+    return [item for item in (_filter_lists(sub, allowed) for sub in resource)
+            if item is not None]
+  return resource if allowed[id(resource)] else None
+
+
+def filter_resource(resource, depth=0, user_permissions=None):
+  """Filter out resources and sub-resources the user can not read.
+
+  Resources are checked level by level, so that all stubs on the same level
+  are checked in bulk and sub-resources are only checked for readable
+  parents. Unreadable sub-resources are replaced with None.
+
+  Returns:
+     The subset of resources which are readable based on user_permissions
+  """
+  # pylint: disable=unused-argument
+  if user_permissions is None:
+    user_permissions = permissions.permissions_for(get_current_user())
+
+  read_filter = _ReadFilter(user_permissions)
+  allowed = {}
+  # list of (parent, key, resource) tuples, parent is None for top level
+  level = [(None, None, res) for res in _flatten_resources(resource)]
+  while level:
+    pending = {}
+    for _, _, res in level:
+      if id(res) not in allowed:
+        pending[id(res)] = res
+    allowed.update(zip(pending.keys(),
+                       read_filter.check(pending.values())))
+    next_level = []
+    for parent, key, res in level:
+      if not allowed[id(res)]:
+        if parent is not None:
+          parent[key] = None
+        continue
+      if id(res) in pending:
+        next_level.extend(
+            (res, sub_key, value) for sub_key, value in res.items()
+            if sub_key != 'context' and isinstance(value, dict) and
+            'type' in value
+        )
+    level = next_level
+  return _filter_lists(resource, allowed)
 
 
 def _is_creator():
@@ -70,6 +70,98 @@ SECRET_KEY = os.environ.get('GGRC_SECRET_KEY', 'Replace-with-something-secret')
 
 MEMCACHE_MECHANISM = True
 
+# Maximum number of keys sent to memcache in a single get_multi/add_multi call
+MEMCACHE_BATCH_SIZE = int(os.environ.get('GGRC_MEMCACHE_BATCH_SIZE', 500))
+
+# Cache implementation used when MEMCACHE_MECHANISM is enabled. Outside of
+# AppEngine use the in-process 'ggrc.cache.lrucache.LRUCache' or
+# 'ggrc.cache.rediscache.RedisCache' together with CACHE_REDIS_URL.
+CACHE_BACKEND = os.environ.get('GGRC_CACHE_BACKEND',
+                               'ggrc.cache.memcache.MemCache')
+CACHE_LRU_MAX_ENTRIES = int(os.environ.get('GGRC_CACHE_LRU_MAX_ENTRIES',
+                                           10000))
+CACHE_LRU_TTL = int(os.environ.get('GGRC_CACHE_LRU_TTL', 60))
+CACHE_REDIS_URL = os.environ.get('GGRC_CACHE_REDIS_URL',
+                                 'redis://localhost:6379/0')
+
+# Export csv files chunk by chunk instead of building them in memory. Errors
+# that happen after the response has started can not change its status code.
+EXPORT_STREAMING = bool(os.environ.get('GGRC_EXPORT_STREAMING', ''))
+EXPORT_CHUNK_SIZE = int(os.environ.get('GGRC_EXPORT_CHUNK_SIZE', 1000))
+
+# Imported rows are flushed in batches of IMPORT_FLUSH_BATCH_SIZE rows. When a
+# batch fails it is split in halves until the failing rows are found, so
+# errors are still reported per row. 1 flushes every row separately.
+IMPORT_FLUSH_BATCH_SIZE = int(os.environ.get('GGRC_IMPORT_FLUSH_BATCH_SIZE',
+                                             1))
+
+# Objects referenced by import blocks are fetched on IMPORT_WORKERS threads,
+# each using its own database connection. Dry runs fetch them for all blocks,
+# imports only for blocks that do not reference objects of other blocks in the
+# file. 1 fetches them serially while rows are handled.
+IMPORT_WORKERS = int(os.environ.get('GGRC_IMPORT_WORKERS', 1))
+
+# Full text reindex splits objects into chunks of REINDEX_CHUNK_SIZE ids and
+# reindexes them in REINDEX_WORKERS processes. AppEngine supports only 1.
+REINDEX_CHUNK_SIZE = int(os.environ.get('GGRC_REINDEX_CHUNK_SIZE', 1000))
+REINDEX_WORKERS = int(os.environ.get('GGRC_REINDEX_WORKERS', 1))
+
+# Snapshots are created and updated in chunks of SNAPSHOT_CHUNK_SIZE pairs.
+# Upserts of audits with more than SNAPSHOT_BACKGROUND_UPSERT_LIMIT snapshots
+# run in a resumable background task, 0 disables background upserts.
+SNAPSHOT_CHUNK_SIZE = int(os.environ.get('GGRC_SNAPSHOT_CHUNK_SIZE', 1000))
+SNAPSHOT_BACKGROUND_UPSERT_LIMIT = int(
+    os.environ.get('GGRC_SNAPSHOT_BACKGROUND_UPSERT_LIMIT', 0))
+
+# Full text index mode: 'inline' updates index records before every commit,
+# so reads see committed changes. 'deferred' only queues changed objects and
+# reindexes them in batches from /fulltext_index_cron_endpoint, so full text
+# reads stay read-only and may lag behind writes by the cron interval.
+FULLTEXT_INDEX_MODE = os.environ.get('GGRC_FULLTEXT_INDEX_MODE', 'inline')
+FULLTEXT_INDEX_BATCH_SIZE = int(os.environ.get(
+    'GGRC_FULLTEXT_INDEX_BATCH_SIZE', 1000))
+
+# Cache /query results in process for up to QUERY_CACHE_TTL seconds. Entries
+# are keyed by the query, the user's permissions and the latest revisions of
+# the queried models, so they are not used after any of those changes.
+QUERY_CACHE_ENABLED = bool(os.environ.get('GGRC_QUERY_CACHE_ENABLED', ''))
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get('GGRC_QUERY_CACHE_MAX_ENTRIES',
+                                             1000))
+QUERY_CACHE_TTL = int(os.environ.get('GGRC_QUERY_CACHE_TTL', 60))
+
+# Cache ids of objects relevant to other objects, as used by the "relevant"
+# query operator, for the request and in process for up to RELEVANCE_CACHE_TTL
+# seconds. Process level entries are keyed by the watermarks of mapping models
+# like /query results, so they are not used after mappings change. Deletions
+# by other processes are only seen after the TTL.
+RELEVANCE_CACHE_ENABLED = bool(os.environ.get('GGRC_RELEVANCE_CACHE_ENABLED',
+                                              ''))
+RELEVANCE_CACHE_MAX_ENTRIES = int(os.environ.get(
+    'GGRC_RELEVANCE_CACHE_MAX_ENTRIES', 1000))
+RELEVANCE_CACHE_TTL = int(os.environ.get('GGRC_RELEVANCE_CACHE_TTL', 60))
+
+# Queries posted together to /query are evaluated on QUERY_WORKERS threads,
+# each using its own database connection, so the value should not exceed the
+# size of the connection pool. 1 evaluates the queries serially.
+QUERY_WORKERS = int(os.environ.get('GGRC_QUERY_WORKERS', 1))
+
+# Automapping engine: 'bfs' walks the graph from every new relationship,
+# 'bulk' computes automappings of all relationships created in a flush with
+# one INSERT ... SELECT per level of the rules.
+AUTOMAPPER_ENGINE = os.environ.get('GGRC_AUTOMAPPER_ENGINE', 'bfs')
+
+# Revision content format of new revisions: 'json' stores plain JSON text,
+# 'compressed' stores zlib compressed content with lazily decoded fields.
+# Existing revisions are converted with /admin/compress_revisions.
+REVISION_CONTENT_FORMAT = os.environ.get('GGRC_REVISION_CONTENT_FORMAT',
+                                         'json')
+
+# Computed attributes mode: 'full' recomputes every affected object from all
+# its aggregates, 'incremental' updates "max" attributes from the changed
+# aggregates and the stored values.
+COMPUTED_ATTRIBUTES_MODE = os.environ.get('GGRC_COMPUTED_ATTRIBUTES_MODE',
+                                          'full')
+
 # AppEngine Email
 APPENGINE_EMAIL = os.environ.get('APPENGINE_EMAIL', '')
 
@@ -20,6 +20,8 @@ ENABLE_JASMINE = True
 # DEBUG_ASSETS = True
 USE_APP_ENGINE_ASSETS_SUBDOMAIN = False
 MEMCACHE_MECHANISM = False
+CACHE_BACKEND = os.environ.get('GGRC_CACHE_BACKEND',
+                               'ggrc.cache.lrucache.LRUCache')
 APPENGINE_EMAIL = "user@example.com"
 
 LOGGING_FORMATTER = {
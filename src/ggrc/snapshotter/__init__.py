@@ -6,16 +6,34 @@
 Snapshotter creates an immutable scope around an object (e.g. Audit) where
 snapshot object represent a join between parent object (Audit),
 child object (e.g. Control, Regulation, ...) and a particular revision.
+
+Snapshots are created and updated in chunks of SNAPSHOT_CHUNK_SIZE pairs.
+Every chunk goes through revision lookup, snapshot write, revision insert and
+reindex and is committed before the next one starts. When the generator runs
+in a background task, the first pair of every chunk and indexes of finished
+chunks are stored in the task result. A failed task can be resumed with
+/admin/upsert_snapshots/<task id>/resume and only processes unfinished chunks
+and pairs that were added since.
 """
 
+import bisect
+import collections
+import contextlib
+import copy
+import time
 from logging import getLogger
 
-from sqlalchemy.sql.expression import tuple_
+from sqlalchemy.sql.expression import and_
 from sqlalchemy.sql.expression import bindparam
+from sqlalchemy.sql.expression import select
+from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
+from ggrc.automapper import adjacency
 from ggrc.login import get_current_user_id
+from ggrc.models.revision import LatestRevision
 from ggrc.utils import benchmark
 
 from ggrc.snapshotter.datastructures import Attr
@@ -39,7 +57,7 @@ logger = getLogger(__name__)  # pylint: disable=invalid-name
 class SnapshotGenerator(object):
   """Geneate snapshots per rules of all connected objects"""
 
-  def __init__(self, dry_run):
+  def __init__(self, dry_run, chunk_size=None, task=None):
     self.rules = get_rules()
 
     self.parents = set()
@@ -47,6 +65,11 @@ class SnapshotGenerator(object):
     self.snapshots = dict()
     self.context_cache = dict()
     self.dry_run = dry_run
+    self.chunk_size = chunk_size or settings.SNAPSHOT_CHUNK_SIZE
+    self.task = task
+    self.progress = copy.deepcopy(
+        ((task.result if task else None) or {}).get("progress") or
+        {"chunks": None, "done": [], "stages": {}})
 
   def add_parent(self, obj):
     """Add parent object and automatically scan neighborhood for snapshottable
@@ -137,16 +160,111 @@ class SnapshotGenerator(object):
       with benchmark("Snapshot._get_snapshotable_objects.fetch neighborhood"):
         return self._fetch_neighborhood(obj, related_objects)
 
+  @contextlib.contextmanager
+  def _stage(self, name, records, message=None):
+    """Add time spent in a pipeline stage to the progress stats.
+
+    Args:
+      name: name of the stage in the stats.
+      records: number of records processed in the stage.
+      message: benchmark message, name of the stage by default.
+    """
+    started = time.time()
+    with benchmark(message or "Snapshot stage {}".format(name)):
+      yield
+    stage = self.progress["stages"].setdefault(
+        name, {"records": 0, "seconds": 0.0, "records_per_second": 0.0})
+    stage["records"] += records
+    stage["seconds"] += time.time() - started
+    if stage["seconds"]:
+      stage["records_per_second"] = round(
+          stage["records"] / stage["seconds"], 1)
+
+  def _save_progress(self):
+    """Store current progress in the task result."""
+    if self.task is None or self.dry_run:
+      return
+    result = dict(self.task.result or {})
+    result["progress"] = copy.deepcopy(self.progress)
+    self.task.result = result
+    db.session.add(self.task)
+    db.session.commit()
+
+  def _plan_chunks(self, pairs):
+    """Store the first pair of every chunk of sorted pairs in the progress.
+
+    Chunks are planned only once per task, a resumed task keeps the chunks
+    of its first run.
+    """
+    if self.progress["chunks"] is not None:
+      return
+    pairs = sorted(pairs)
+    self.progress["chunks"] = [list(pair.to_4tuple())
+                               for pair in pairs[::self.chunk_size]]
+    self._save_progress()
+
+  def _get_pending_chunks(self, pairs, for_create):
+    """Get (index, pairs) tuples of chunks that are not done yet.
+
+    Every pair belongs to the planned chunk that starts with the closest
+    preceding pair. Pairs of finished chunks are skipped, except for pairs
+    without a snapshot, which were added after the chunk was finished. Those
+    and pairs that precede all planned chunks are returned in extra chunks
+    with index None.
+    """
+    starts = [tuple(start) for start in self.progress["chunks"]]
+    done = set(self.progress["done"])
+    planned = collections.defaultdict(list)
+    added = []
+    for pair in sorted(pairs):
+      index = bisect.bisect_right(starts, pair.to_4tuple()) - 1
+      if index < 0 or (index in done and pair in for_create):
+        added.append(pair)
+      elif index not in done:
+        planned[index].append(pair)
+    return [(key, planned[key]) for key in sorted(planned)] + [
+        (None, added[start:start + self.chunk_size])
+        for start in range(0, len(added), self.chunk_size)]
+
+  def _process(self, for_create, for_update, event, revisions, _filter):
+    """Create and update snapshots chunk by chunk.
+
+    Returns:
+      tuple of merged create and update OperationResponses, None for
+      operations that had nothing to process.
+    """
+    created, updated = [], []
+    self._plan_chunks(for_create | for_update)
+    for index, chunk in self._get_pending_chunks(for_create | for_update,
+                                                 for_create):
+      chunk_create = for_create.intersection(chunk)
+      chunk_update = for_update.intersection(chunk)
+      processed = set()
+      if chunk_update:
+        updated.append(self._update(for_update=chunk_update, event=event,
+                                    revisions=revisions, _filter=_filter))
+        processed |= updated[-1].response
+      if chunk_create:
+        created.append(self._create(for_create=chunk_create, event=event,
+                                    revisions=revisions, _filter=_filter))
+        processed |= created[-1].response
+      if not self.dry_run:
+        with self._stage("reindex", len(processed)):
+          reindex_pairs(processed)
+      if index is not None:
+        self.progress["done"].append(index)
+        self._save_progress()
+    return (_merge_responses("create", created),
+            _merge_responses("update", updated))
+
   def update(self, event, revisions, _filter=None):
     """Update parent object's snapshots."""
-    _, for_update = self.analyze()
-    result = self._update(for_update=for_update, event=event,
-                          revisions=revisions, _filter=_filter)
-    updated = result.response
+    with self._stage("analyze", len(self.parents)):
+      _, for_update = self.analyze()
+    _, result = self._process(set(), for_update, event, revisions, _filter)
     if not self.dry_run:
-      reindex_pairs(updated)
       self._copy_snapshot_relationships()
-    return result
+    return result or OperationResponse("update", True, set(), {})
 
   def _update(self, for_update, event, revisions, _filter):
     """Update (or create) parent objects' snapshots and create revisions for
@@ -197,7 +315,8 @@ class SnapshotGenerator(object):
           pair = Pair.from_4tuple(pair_tuple)
           snapshot_cache[pair] = (sid, rev_id)
 
-      with benchmark("Snapshot._update.retrieve latest revisions"):
+      with self._stage("revisions", len(for_update),
+                       "Snapshot._update.retrieve latest revisions"):
         revision_id_cache = get_revisions(
             for_update,
             filters=[models.Revision.action.in_(["created", "modified"])],
@@ -231,7 +350,8 @@ class SnapshotGenerator(object):
       if not modified_snapshot_keys:
         return OperationResponse("update", True, set(), response_data)
 
-      with benchmark("Snapshot._update.write snapshots to database"):
+      with self._stage("write", len(data_payload_update),
+                       "Snapshot._update.write snapshots to database"):
         update_sql = models.Snapshot.__table__.update().where(
             models.Snapshot.id == bindparam("_id")).values(
             revision_id=bindparam("_revision_id"),
@@ -249,8 +369,10 @@ class SnapshotGenerator(object):
                                                user_id, context_id)
           revision_payload += [data]
 
-      with benchmark("Insert Snapshot entries into Revision"):
+      with self._stage("revision insert", len(revision_payload),
+                       "Insert Snapshot entries into Revision"):
         self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._refresh_latest_revisions(revision_payload)
       return OperationResponse("update", True, for_update, response_data)
 
   def analyze(self):
@@ -289,23 +411,11 @@ class SnapshotGenerator(object):
     Returns:
       OperationResponse
     """
-    for_create, for_update = self.analyze()
-    create, update = None, None
-    created, updated = set(), set()
-
-    if for_update:
-      update = self._update(
-          for_update=for_update, event=event, revisions=revisions,
-          _filter=_filter)
-      updated = update.response
-    if for_create:
-      create = self._create(for_create=for_create, event=event,
-                            revisions=revisions, _filter=_filter)
-      created = create.response
-
-    to_reindex = updated | created
+    with self._stage("analyze", len(self.parents)):
+      for_create, for_update = self.analyze()
+    create, update = self._process(for_create, for_update, event, revisions,
+                                   _filter)
     if not self.dry_run:
-      reindex_pairs(to_reindex)
       self._copy_snapshot_relationships()
     return OperationResponse("upsert", True, {
         "create": create,
@@ -329,18 +439,24 @@ class SnapshotGenerator(object):
       engine.execute(operation, data)
       db.session.commit()
 
+  def _refresh_latest_revisions(self, revision_payload):
+    """Update latest revisions of objects in inserted revision payload."""
+    if revision_payload and not self.dry_run:
+      LatestRevision.refresh(
+          ((data["resource_type"], data["resource_id"])
+           for data in revision_payload),
+          db.engine)
+
   def create(self, event, revisions, _filter=None):
     """Create snapshots of parent object's neighborhood per provided rules
     and split in chuncks if there are too many snapshottable objects."""
-    for_create, _ = self.analyze()
-    result = self._create(
-        for_create=for_create, event=event,
-        revisions=revisions, _filter=_filter)
-    created = result.response
+    with self._stage("analyze", len(self.parents)):
+      for_create, _ = self.analyze()
+    result, _ = self._process(for_create, set(), event, revisions, _filter)
     if not self.dry_run:
-      reindex_pairs(created)
       self._copy_snapshot_relationships()
-    return result
+    return result or OperationResponse("create", True, set(),
+                                       {"revisions": {}})
 
   def _create(self, for_create, event, revisions, _filter):
     """Create snapshots of parent objects neighhood and create revisions for
@@ -373,7 +489,8 @@ class SnapshotGenerator(object):
         if _filter:
           for_create = {elem for elem in for_create if _filter(elem)}
 
-      with benchmark("Snapshot._create._get_revisions"):
+      with self._stage("revisions", len(for_create),
+                       "Snapshot._create._get_revisions"):
         revision_id_cache = get_revisions(for_create, revisions)
 
       response_data["revisions"] = revision_id_cache
@@ -393,7 +510,8 @@ class SnapshotGenerator(object):
             "Tried to create snapshots for the following objects but "
             "found no revisions: %s", missed_keys)
 
-      with benchmark("Snapshot._create.write to database"):
+      with self._stage("write", len(data_payload),
+                       "Snapshot._create.write to database"):
         self._execute(
             models.Snapshot.__table__.insert(),
             data_payload)
@@ -412,6 +530,11 @@ class SnapshotGenerator(object):
       with benchmark("Snapshot._create.write relationships to database"):
         self._execute(models.Relationship.__table__.insert(),
                       relationship_payload)
+        if not self.dry_run:
+          adjacency.add_neighbors(
+              ((rel["source_type"], rel["source_id"]),
+               (rel["destination_type"], rel["destination_id"]))
+              for rel in relationship_payload)
 
       with benchmark("Snapshot._create.get created relationships"):
         created_relationships = {
@@ -437,8 +560,10 @@ class SnapshotGenerator(object):
                 "created", event_id, relationship, user_id, context_id)
             revision_payload += [data]
 
-      with benchmark("Snapshot._create.write revisions to database"):
+      with self._stage("revision insert", len(revision_payload),
+                       "Snapshot._create.write revisions to database"):
         self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._refresh_latest_revisions(revision_payload)
       return OperationResponse("create", True, for_create, response_data)
 
   def _copy_snapshot_relationships(self):
@@ -484,6 +609,39 @@ class SnapshotGenerator(object):
           "user_id": get_current_user_id(),
           "parent_id": parent.id
       })
+      snapshot_ids = select([models.Snapshot.id]).where(
+          models.Snapshot.parent_id == parent.id)
+      relationships = models.Relationship.__table__.c
+      adjacency.add_neighbors_for(and_(
+          relationships.source_type == "Snapshot",
+          relationships.source_id.in_(snapshot_ids),
+          relationships.destination_type == "Snapshot",
+          relationships.destination_id.in_(snapshot_ids),
+      ))
+
+
+def _merge_responses(type_, responses):
+  """Merge OperationResponses of processed chunks into one."""
+  if not responses:
+    return None
+  pairs, data = set(), {}
+  for response in responses:
+    pairs |= response.response
+    _merge_dicts(data, response.data)
+  return OperationResponse(type_, all(r.success for r in responses),
+                           pairs, data)
+
+
+def _merge_dicts(target, source):
+  """Recursively merge source dict into target dict."""
+  for key, value in source.iteritems():
+    if isinstance(value, dict) and isinstance(target.get(key), dict):
+      _merge_dicts(target[key], value)
+    elif isinstance(value, dict):
+      target[key] = _merge_dicts({}, value)
+    else:
+      target[key] = value
+  return target
 
 
 def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
@@ -507,14 +665,15 @@ def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
                               _filter=_filter)
 
 
-def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
+def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False,
+                     task=None):
   """Update (and create if needed) snapshots of parent objects."""
   # pylint: disable=unused-argument
   if not revisions:
     revisions = set()
 
   with benchmark("Snapshot.update_snapshots"):
-    generator = SnapshotGenerator(dry_run)
+    generator = SnapshotGenerator(dry_run, task=task)
     if not isinstance(objs, set):
       objs = {objs}
     for obj in objs:
@@ -523,6 +682,24 @@ def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
     return generator.upsert(event=event, revisions=revisions, _filter=_filter)
 
 
+def upsert_snapshots_task(task):
+  """Update and create snapshots of the parent object of a background task.
+
+  Task parameters contain the parent object stub, id of the event that
+  triggered the upsert and the list of requested revisions in the same format
+  as snapshot settings of PUT requests.
+  """
+  parameters = task.parameters
+  parent = Stub.from_dict(parameters["parent"])
+  obj = getattr(models.all_models, parent.type).query.get(parent.id)
+  event = models.Event.query.get(parameters["event_id"])
+  revisions = {
+      (Stub.from_dict(revision["parent"]),
+       Stub.from_dict(revision["child"])): revision["revision_id"]
+      for revision in parameters.get("revisions", [])}
+  return upsert_snapshots(obj, event, revisions=revisions, task=task)
+
+
 def clone_scope(base_parent, new_parent, event):
   """Create exact copy of parent object scope.
 
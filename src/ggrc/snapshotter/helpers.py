@@ -3,20 +3,78 @@
 
 """Various simple helper functions for snapshot generator"""
 
-import collections
 from logging import getLogger
 
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.revision import LatestRevision
 from ggrc.snapshotter.datastructures import Stub
-from ggrc.snapshotter.datastructures import Pair
 from ggrc.utils import benchmark
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
 
+def _filtered_revisions(query, filters):
+  """Apply filters on a query of revisions."""
+  for _filter in filters or ():
+    query = query.filter(_filter)
+  return query
+
+
+def _get_latest_revisions(child_stubs, filters):
+  """Get ids of latest revisions of child_stubs that match filters.
+
+  Latest revisions are fetched from the latest revisions lookup table. Only
+  objects whose latest revision does not match the filters are searched for in
+  their revision history.
+
+  Returns:
+    dict with child stubs as keys and revision ids as values.
+  """
+  if not child_stubs:
+    return {}
+  revision = models.Revision
+  latest = LatestRevision
+  query = _filtered_revisions(db.session.query(
+      revision.id,
+      revision.resource_type,
+      revision.resource_id,
+  ).join(
+      latest, latest.revision_id == revision.id,
+  ).filter(
+      tuple_(latest.resource_type, latest.resource_id).in_(child_stubs)
+  ), filters)
+  latest_ids = {Stub(restype, resid): revid for revid, restype, resid in query}
+
+  missing = set(child_stubs) - set(latest_ids)
+  if missing:
+    query = _filtered_revisions(db.session.query(
+        revision.id,
+        revision.resource_type,
+        revision.resource_id,
+    ).filter(
+        tuple_(revision.resource_type, revision.resource_id).in_(missing)
+    ).order_by(revision.id.desc()), filters)
+    for revid, restype, resid in query:
+      latest_ids.setdefault(Stub(restype, resid), revid)
+  return latest_ids
+
+
+def _get_requested_revisions(requested, filters):
+  """Get (child stub, revision id) pairs of requested revisions that exist."""
+  if not requested:
+    return set()
+  revision = models.Revision
+  query = _filtered_revisions(db.session.query(
+      revision.id,
+      revision.resource_type,
+      revision.resource_id,
+  ).filter(revision.id.in_(requested)), filters)
+  return {(Stub(restype, resid), revid) for revid, restype, resid in query}
+
+
 def get_revisions(pairs, revisions, filters=None):
   """Retrieve revision ids for pairs
 
@@ -32,42 +90,26 @@ def get_revisions(pairs, revisions, filters=None):
     revision_id_cache = dict()
 
     if pairs:
-      with benchmark("get_revisions.create caches"):
-        child_stubs = {pair.child for pair in pairs}
-
-        with benchmark("get_revisions.create child -> parents cache"):
-          parents_cache = collections.defaultdict(set)
-          for parent, child in pairs:
-            parents_cache[child].add(parent)
-
-      with benchmark("get_revisions.retrieve revisions"):
-        query = db.session.query(
-            models.Revision.id,
-            models.Revision.resource_type,
-            models.Revision.resource_id).filter(
-            tuple_(
-                models.Revision.resource_type,
-                models.Revision.resource_id).in_(child_stubs)
-        ).order_by(models.Revision.id.desc())
-        if filters:
-          for _filter in filters:
-            query = query.filter(_filter)
+      requested = {key: revisions[key] for key in pairs if key in revisions}
+      child_stubs = {pair.child for pair in pairs if pair not in requested}
+
+      with benchmark("get_revisions.retrieve requested revisions"):
+        existing = _get_requested_revisions(set(requested.values()), filters)
+
+      with benchmark("get_revisions.retrieve latest revisions"):
+        latest_ids = _get_latest_revisions(child_stubs, filters)
 
       with benchmark("get_revisions.create revision_id cache"):
-        for revid, restype, resid in query:
-          child = Stub(restype, resid)
-          for parent in parents_cache[child]:
-            key = Pair(parent, child)
-            if key in revisions:
-              if revid == revisions[key]:
-                revision_id_cache[key] = revid
-              else:
-                logger.warning(
-                    "Specified revision for object %s but couldn't find the"
-                    "revision '%s' in object history", key, revisions[key])
-            else:
-              if key not in revision_id_cache:
-                revision_id_cache[key] = revid
+        for key, revid in requested.iteritems():
+          if (key.child, revid) in existing:
+            revision_id_cache[key] = revid
+          else:
+            logger.warning(
+                "Specified revision for object %s but couldn't find the"
+                "revision '%s' in object history", key, revid)
+        for key in pairs:
+          if key not in requested and key.child in latest_ids:
+            revision_id_cache[key] = latest_ids[key.child]
     return revision_id_cache
 
 
@@ -186,15 +228,16 @@ def create_snapshot_revision_dict(action, event_id, snapshot,
   }
   revision_content.update(metadata)
 
-  return {
+  revision = {
       "action": action,
       "event_id": event_id,
-      "content": revision_content,
       "modified_by_id": user_id,
       "resource_id": snapshot[0],
       "resource_type": "Snapshot",
       "context_id": context_id
   }
+  revision.update(models.Revision.content_values(revision_content))
+  return revision
 
 
 def create_relationship_dict(source, destination, user_id, context_id):
@@ -226,16 +269,17 @@ def create_relationship_revision_dict(action, event_id, relationship,  # noqa #
   }
   revision_content.update(metadata)
 
-  return {
+  revision = {
       "action": action,
       "event_id": event_id,
-      "content": revision_content,
       "modified_by_id": user_id,
       "resource_id": relationship.id,
       "resource_type": "Relationship",
       "context_id": context_id,
       "status": None,
   }
+  revision.update(models.Revision.content_values(revision_content))
+  return revision
 
 
 def create_dry_run_response(pairs, old_revisions, new_revisions):
@@ -1,12 +1,22 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
-"""Manage indexing for snapshotter service"""
+"""Manage indexing for snapshotter service
 
+Custom attribute definitions of snapshottable models are cached between
+reindex calls. The cache is rebuilt when definitions change in this process or
+when the count, last id or last update time of definitions in the database
+differs from the cached one. People and access control roles referenced by
+all reindexed revisions are loaded into the indexer cache with one query each
+before records are built.
+"""
+
+import collections
 import logging
 from collections import defaultdict
 import itertools
 
+import sqlalchemy as sa
 from sqlalchemy.sql.expression import tuple_
 from sqlalchemy import orm
 
@@ -55,6 +65,45 @@ PARENT_PROPERTY_TMPL = u"{parent_type}-{parent_id}"
 CHILD_PROPERTY_TMPL = u"{child_type}-{child_id}"
 
 
+class CadInfo(collections.namedtuple(
+    "CadInfo", ["id", "title", "attribute_type", "value_mapping",
+                "default_value"])):
+  """Custom attribute definition data needed for indexing."""
+
+  @classmethod
+  def from_definition(cls, cad):
+    return cls(cad.id, cad.title, cad.attribute_type, cad.value_mapping,
+               cad.default_value)
+
+  def get_indexed_value(self, value):
+    return self.value_mapping.get(value, value)
+
+
+_CAD_CACHE = {}
+
+
+def _get_cad_class_names():
+  # pylint: disable=protected-access
+  return {
+      getattr(all_models, c)._inflector.table_singular: c for c in Types.all
+  }
+
+
+def _get_cad_version(definition_types):
+  """Get count, max id and max updated_at of definitions."""
+  cad = models.CustomAttributeDefinition
+  return tuple(db.session.query(
+      sa.func.count(cad.id),
+      sa.func.max(cad.id),
+      sa.func.max(cad.updated_at),
+  ).filter(cad.definition_type.in_(definition_types)).one())
+
+
+def invalidate_cad_cache(*_):
+  """Drop cached custom attribute definitions."""
+  _CAD_CACHE.clear()
+
+
 def _get_custom_attribute_dict():
   """Get fulltext indexable properties for all snapshottable objects
 
@@ -64,10 +113,10 @@ def _get_custom_attribute_dict():
     custom_attribute_definitions dict - representing dictionary of custom
                                         attribute definition attributes.
   """
-  # pylint: disable=protected-access
-  cadef_klass_names = {
-      getattr(all_models, c)._inflector.table_singular: c for c in Types.all
-  }
+  cadef_klass_names = _get_cad_class_names()
+  version = _get_cad_version(cadef_klass_names.keys())
+  if _CAD_CACHE.get("version") == version:
+    return _CAD_CACHE["cads"]
 
   query = models.CustomAttributeDefinition.query.filter(
       models.CustomAttributeDefinition.definition_type.in_(
@@ -76,16 +125,24 @@ def _get_custom_attribute_dict():
   )
   cads = defaultdict(list)
   for cad in query:
-    cads[cadef_klass_names[cad.definition_type]].append(cad)
+    cads[cadef_klass_names[cad.definition_type]].append(
+        CadInfo.from_definition(cad))
+  _CAD_CACHE["version"] = version
+  _CAD_CACHE["cads"] = cads
   return cads
 
 
+for _event_name in ("after_insert", "after_update", "after_delete"):
+  sa.event.listen(models.CustomAttributeDefinition, _event_name,
+                  invalidate_cad_cache)
+
+
 def get_searchable_attributes(attributes, cads, content):
   """Get all searchable attributes for a given object that should be indexed
 
   Args:
     attributes: Attributes that should be extracted from some model
-    cads: list of CAD instances
+    cads: list of CAD instances or CadInfo tuples
     content: dictionary (JSON) representation of an object
   Return:
     Dict of "key": "value" from objects revision
@@ -139,6 +196,63 @@ def reindex_snapshots(snapshot_ids):
     db.session.commit()
 
 
+def _get_referenced_people(value):
+  """Get ids of people referenced by an indexed value."""
+  if isinstance(value, dict):
+    value = [value]
+  if not isinstance(value, list):
+    return set()
+  ids = set()
+  for item in value:
+    if not isinstance(item, dict):
+      continue
+    if item.get("type") == "Person":
+      ids.add(item.get("id"))
+    elif "ac_role_id" in item:
+      ids.add(item.get("person_id"))
+  return ids
+
+
+def _get_referenced_roles(value):
+  """Get ids of access control roles referenced by an indexed value."""
+  if not isinstance(value, list):
+    return set()
+  return {item["ac_role_id"] for item in value
+          if isinstance(item, dict) and "ac_role_id" in item}
+
+
+def prefetch_people_and_roles(snapshots):
+  """Load people and roles used in snapshot properties into indexer cache.
+
+  The record builder loads every person and role missing from the cache with
+  a separate query, so all missing ones are loaded here with one query each.
+  """
+  cache = get_indexer().cache
+  people_map = cache["people_map"]
+  ac_role_map = cache["ac_role_map"]
+  person_ids, role_ids = set(), set()
+  for snapshot in snapshots:
+    for value in snapshot["revision"].itervalues():
+      person_ids |= _get_referenced_people(value)
+      role_ids |= _get_referenced_roles(value)
+  person_ids = {id_ for id_ in person_ids if id_ and id_ not in people_map}
+  role_ids = {id_ for id_ in role_ids if id_ not in ac_role_map}
+  if person_ids:
+    people_map.update(
+        (person_id, (name, email)) for person_id, name, email in
+        db.session.query(
+            models.Person.id,
+            models.Person.name,
+            models.Person.email,
+        ).filter(models.Person.id.in_(person_ids))
+    )
+  if role_ids:
+    ac_role_map.update(db.session.query(
+        all_models.AccessControlRole.id,
+        all_models.AccessControlRole.name,
+    ).filter(all_models.AccessControlRole.id.in_(role_ids)))
+
+
 def delete_records(snapshot_ids):
   """Delete all records for some snapshots.
   Args:
@@ -152,14 +266,20 @@ def delete_records(snapshot_ids):
   db.session.commit()
 
 
-def insert_records(payload):
-  """Insert records to full text table.
+def replace_records(snapshot_ids, payload):
+  """Replace full text records of snapshots in a single transaction.
 
   Args:
-    payload: List of dictionaries that represent records entries.
+    snapshot_ids: IDs of snapshots whose records are replaced.
+    payload: List of dictionaries that represent new records entries.
   """
-  engine = db.engine
-  engine.execute(Record.__table__.insert(), payload)
+  if snapshot_ids:
+    db.session.query(Record).filter(
+        Record.type == "Snapshot",
+        Record.key.in_(snapshot_ids)
+    ).delete(synchronize_session=False)
+  if payload:
+    db.session.execute(Record.__table__.insert(), payload)
   db.session.commit()
 
 
@@ -318,7 +438,8 @@ def reindex_pairs(pairs):
           "id",
           "resource_type",
           "resource_id",
-          "_content",
+          "_json_content",
+          "_compressed_content",
       ),
       orm.load_only(
           "id",
@@ -343,8 +464,9 @@ def reindex_pairs(pairs):
         "revision": get_searchable_attributes(
             CLASS_PROPERTIES[revision.resource_type],
             cad_dict[revision.resource_type],
-            revision.content)
+            revision.lazy_content)
     }
+  prefetch_people_and_roles(snapshots.values())
   search_payload = []
   for snapshot in snapshots.values():
     for prop, val in get_properties(snapshot).items():
@@ -361,5 +483,4 @@ def reindex_pairs(pairs):
               }
           )
       )
-  delete_records(snapshots.keys())
-  insert_records(search_payload)
+  replace_records(snapshots.keys(), search_payload)
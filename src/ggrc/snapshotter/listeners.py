@@ -4,6 +4,7 @@
 """Register various listeners needed for snapshot operation"""
 
 from ggrc import models
+from ggrc import settings
 from ggrc.services import signals
 from ggrc.snapshotter import create_snapshots
 from ggrc.snapshotter import upsert_snapshots
@@ -23,6 +24,11 @@ def upsert_all(sender, obj=None, src=None, service=None, event=None):  # noqa  #
   snapshot_settings = src.get("snapshots")
   if snapshot_settings:
     if snapshot_settings["operation"] == "upsert":
+      if _upsert_in_background(obj):
+        from ggrc import views
+        views.start_upsert_snapshots(
+            obj, event, snapshot_settings.get("revisions", []))
+        return
       revisions = {
           (Stub.from_dict(revision["parent"]),
            Stub.from_dict(revision["child"])): revision["revision_id"]
@@ -30,6 +36,16 @@ def upsert_all(sender, obj=None, src=None, service=None, event=None):  # noqa  #
       upsert_snapshots(obj, event, revisions=revisions)
 
 
+def _upsert_in_background(obj):
+  """Check if snapshots of obj should be upserted in a background task."""
+  limit = settings.SNAPSHOT_BACKGROUND_UPSERT_LIMIT
+  if not limit:
+    return False
+  count = models.Snapshot.query.filter_by(
+      parent_type=obj.type, parent_id=obj.id).count()
+  return count > limit
+
+
 def register_snapshot_listeners():
   """Attach listeners to various models"""
 
@@ -8,6 +8,7 @@ import re
 import sys
 import sqlalchemy
 
+import flask
 from flask import request
 from ggrc.settings import CUSTOM_URL_ROOT
 from ggrc.utils import benchmarks
@@ -262,6 +263,51 @@ def generate_query_chunks(query, chunk_size=1000):
     yield query.order_by("id").limit(chunk_size).offset(offset)
 
 
+def list_chunks(items, chunk_size=1000):
+  """Make a generator splitting `items` list into chunks of `chunk_size`."""
+  items = list(items)
+  for offset in range(0, len(items), chunk_size):
+    yield items[offset:offset + chunk_size]
+
+
+def in_request_context_copy(function, skip_g=()):
+  """Wrap function to run in a copy of the current request context.
+
+  The wrapper is meant to be called in worker threads. Attributes of flask.g,
+  such as cached permissions, are copied from the current request. The worker
+  gets its own app context and therefore its own database session, which is
+  removed when the call is finished. The logged in user is loaded again in
+  that session, so that lazy loads of the user do not use the session of the
+  current request.
+
+  Args:
+    function: function to wrap.
+    skip_g: names of flask.g attributes that must not be copied, such as
+      queries bound to the session of the current request.
+  """
+  # pylint: disable=protected-access
+  from ggrc.models import all_models
+
+  request_context = flask._request_ctx_stack.top
+  user = getattr(request_context, "user", None)
+  user_id = getattr(user, "id", None)
+  g_values = {key: value for key, value in vars(flask.g._get_current_object())
+              .iteritems() if key not in skip_g}
+
+  def wrapper(*args):
+    """Call function in the copied request context."""
+    context = request_context.copy()
+    with context:
+      if user_id is not None:
+        context.user = all_models.Person.query.get(user_id)
+      elif user is not None:
+        context.user = user
+      for key, value in g_values.iteritems():
+        setattr(flask.g, key, value)
+      return function(*args)
+  return wrapper
+
+
 def create_stub(object_, context_id=None):
   """Create stub from model attribute
 
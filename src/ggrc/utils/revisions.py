@@ -6,6 +6,7 @@
 from logging import getLogger
 
 from sqlalchemy.sql import select
+from sqlalchemy import bindparam
 from sqlalchemy import func
 from sqlalchemy import literal
 
@@ -13,6 +14,7 @@ from ggrc import db
 from ggrc.utils import benchmark
 from ggrc.login import get_current_user_id
 from ggrc.models import all_models
+from ggrc.models.revision import LatestRevision
 from ggrc.snapshotter.rules import Types
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
@@ -28,20 +30,12 @@ def _get_revisions_by_type(type_):
     dict with object_id as key and revision_id of the latest revision as value.
   """
 
-  revisions = db.session.execute(
-      """
-      SELECT * FROM (
-          SELECT id, resource_id
-          FROM revisions
-          WHERE resource_type = :type
-          ORDER BY resource_id, id DESC
-      ) AS revs
-      GROUP BY resource_id
-      """,
-      [{"type": type_}]
-  )
+  revisions = db.session.query(
+      LatestRevision.resource_id,
+      LatestRevision.revision_id,
+  ).filter(LatestRevision.resource_type == type_)
 
-  return {row.resource_id: row.id for row in revisions}
+  return {resource_id: revision_id for resource_id, revision_id in revisions}
 
 
 def _fix_type_revisions(event, type_, obj_rev_map):
@@ -77,12 +71,16 @@ def _fix_type_revisions(event, type_, obj_rev_map):
     # content equal to obj.log_json()
     _recover_create_revisions(revisions_table, event,
                               type_, chunk_without_revisions)
+    LatestRevision.refresh(
+        (type_, obj.id) for obj in chunk_without_revisions)
 
   # 3. For each lost object log a "deleted" revision with content identical
   # to the last logged revision.
   _recover_delete_revisions(
       # Every revision present in obj_rev_map has no object in the DB
       revisions_table, event, list(obj_rev_map.values()))
+  LatestRevision.refresh(
+      (type_, obj_id) for obj_id in obj_rev_map)
 
   db.session.commit()
 
@@ -97,7 +95,7 @@ def _update_existing_revisions(objects, revisions_table, obj_rev_map):
     db.session.execute(
         revisions_table.update()
         .where(revisions_table.c.id == rev_id)
-        .values(content=obj.log_json())
+        .values(**all_models.Revision.content_values(obj.log_json()))
     )
 
 
@@ -150,21 +148,27 @@ def _recover_create_revisions(revisions_table, event, object_type,
   if not object_ids_with_jsons:
     return
 
-  db.session.execute(
-      revisions_table.insert(),
-      [{"resource_id": obj_id,
+  def revision_values(obj_id, obj_content):
+    values = {
+        "resource_id": obj_id,
         "resource_type": object_type,
         "resource_slug": obj_content.get("slug"),
         "event_id": event.id,
         "action": determine_action(obj_content),
-        "content": obj_content,
         "context_id": obj_content.get("context_id"),
         "modified_by_id": (obj_content.get("modified_by_id") or
                            get_current_user_id()),
         "source_type": obj_content.get("source_type"),
         "source_id": obj_content.get("source_id"),
         "destination_type": obj_content.get("destination_type"),
-        "destination_id": obj_content.get("destination_id")}
+        "destination_id": obj_content.get("destination_id"),
+    }
+    values.update(all_models.Revision.content_values(obj_content))
+    return values
+
+  db.session.execute(
+      revisions_table.insert(),
+      [revision_values(obj_id, obj_content)
        for (obj_id, obj_content) in object_ids_with_jsons],
   )
 
@@ -175,17 +179,21 @@ def set_resource_slugs():
     rows = db.session.execute(select([
         revisions_table.c.id,
         revisions_table.c.content,
+        revisions_table.c.compressed_content,
     ]).where(
         revisions_table.c.resource_type.in_(Types.all)
     ).where(
         revisions_table.c.resource_slug.is_(None)
     ))
     for row in rows:
-      if row.content.get("slug"):
+      content = row.content
+      if row.compressed_content is not None:
+        content = row.compressed_content
+      if content.get("slug"):
         db.session.execute(
             revisions_table.update()
             .where(revisions_table.c.id == row.id)
-            .values(resource_slug=row.content.get("slug"))
+            .values(resource_slug=content.get("slug"))
         )
     db.session.commit()
 
@@ -203,3 +211,40 @@ def do_refresh_revisions():
   for type_ in sorted(Types.all | {"Assessment"}):
     logger.info("Updating revisions for: %s", type_)
     _fix_type_revisions(event, type_, _get_revisions_by_type(type_))
+
+
+def do_compress_revisions(chunk_size=1000):
+  """Move content of all revisions into the compressed_content column.
+
+  Every chunk is committed separately, so the conversion can be stopped and
+  continued at any time.
+  """
+  revisions_table = all_models.Revision.__table__
+  update = revisions_table.update().where(
+      revisions_table.c.id == bindparam("revision_id")
+  ).values(
+      content=None,
+      compressed_content=bindparam("revision_content"),
+  )
+  last_id = 0
+  while True:
+    rows = db.session.execute(select([
+        revisions_table.c.id,
+        revisions_table.c.content,
+    ]).where(
+        revisions_table.c.id > last_id
+    ).where(
+        revisions_table.c.content.isnot(None)
+    ).order_by(
+        revisions_table.c.id
+    ).limit(chunk_size)).fetchall()
+    if not rows:
+      break
+    with benchmark("compress revisions chunk"):
+      db.session.execute(update, [
+          {"revision_id": row.id, "revision_content": row.content}
+          for row in rows
+      ])
+      db.session.commit()
+    last_id = rows[-1].id
+    logger.info("Compressed revisions up to id %s", last_id)
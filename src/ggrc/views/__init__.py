@@ -15,7 +15,9 @@ from flask import g
 from flask import render_template
 from flask import url_for
 from flask import request
+from werkzeug.exceptions import BadRequest
 from werkzeug.exceptions import Forbidden
+from werkzeug.exceptions import NotFound
 
 from ggrc import models
 from ggrc import settings
@@ -25,27 +27,29 @@ from ggrc.builder.json import publish
 from ggrc.builder.json import publish_representation
 from ggrc.converters import get_importables, get_exportables
 from ggrc.extensions import get_extension_modules
-from ggrc.fulltext import get_indexer, mixin
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext import reindex as fulltext_reindex
+from ggrc.fulltext.reindex import Reindexer
 from ggrc.login import get_current_user
 from ggrc.login import login_required
 from ggrc.models import all_models
+from ggrc.models import similarity_index
 from ggrc.models.background_task import create_task
 from ggrc.models.background_task import make_task_response
 from ggrc.models.background_task import queued_task
+from ggrc.models.background_task import resume_task
 from ggrc.models.reflection import AttributeInfo
 from ggrc.rbac import permissions
 from ggrc.services.common import as_json
 from ggrc.services.common import inclusion_filter
 from ggrc.query import views as query_views
 from ggrc.snapshotter import rules
-from ggrc.snapshotter.indexer import reindex as reindex_snapshots
 from ggrc.views import converters
 from ggrc.views import cron
 from ggrc.views import filters
 from ggrc.views import notifications
 from ggrc.views.registry import object_view
 from ggrc.utils import benchmark
-from ggrc.utils import generate_query_chunks
 from ggrc.utils import revisions
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -60,11 +64,29 @@ def refresh_revisions(_):
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
+@app.route("/_background_tasks/compress_revisions", methods=["POST"])
+@queued_task
+def compress_revisions(_):
+  """Web hook to convert revision content to the compressed format."""
+  revisions.do_compress_revisions()
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
+@app.route("/_background_tasks/rebuild_similarity_index", methods=["POST"])
+@queued_task
+def rebuild_similarity_index(_):
+  """Web hook to rebuild the similarity index."""
+  with benchmark("Rebuild similarity index"):
+    similarity_index.rebuild()
+    db.session.commit()
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
 @app.route("/_background_tasks/reindex", methods=["POST"])
 @queued_task
-def reindex(_):
+def reindex(task):
   """Web hook to update the full text search index."""
-  do_reindex()
+  do_reindex(task)
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
@@ -94,14 +116,48 @@ def start_compute_attributes(revision_ids):
   task.start()
 
 
-def do_reindex():
-  """Update the full text search index."""
+@app.route("/_background_tasks/upsert_snapshots", methods=["POST"])
+@queued_task
+def upsert_snapshots(task):
+  """Web hook to update and create snapshots of a parent object."""
+  from ggrc import snapshotter
+  snapshotter.upsert_snapshots_task(task)
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
+def start_upsert_snapshots(obj, event, revisions):
+  """Start a background task for upserting snapshots of obj.
+
+  Args:
+    obj: parent object of the snapshots.
+    event: event that triggered the upsert.
+    revisions: list of requested revisions from the snapshot settings.
+  """
+  task = create_task(
+      name="upsert_snapshots",
+      url=url_for(upsert_snapshots.__name__),
+      parameters={
+          "parent": {"type": obj.type, "id": obj.id},
+          "event_id": event.id,
+          "revisions": revisions,
+      },
+      method=u"POST",
+      queued_callback=upsert_snapshots
+  )
+  # Without a task queue the task has already run in create_task
+  if task.status == "Pending":
+    task.start()
+  return task
+
+
+def do_reindex(task=None):
+  """Update the full text search index.
+
+  Args:
+    task: reindex background task that stores progress of the reindex.
+  """
 
   indexer = get_indexer()
-  indexed_models = {
-      m.__name__: m for m in all_models.all_models
-      if issubclass(m, mixin.Indexed) and m.REQUIRED_GLOBAL_REINDEX
-  }
   people_query = db.session.query(all_models.Person.id,
                                   all_models.Person.name,
                                   all_models.Person.email)
@@ -110,17 +166,9 @@ def do_reindex():
       all_models.AccessControlRole.id,
       all_models.AccessControlRole.name,
   ))
-  for model_name in sorted(indexed_models.keys()):
-    logger.info("Updating index for: %s", model_name)
-    with benchmark("Create records for %s" % model_name):
-      model = indexed_models[model_name]
-      for query_chunk in generate_query_chunks(db.session.query(model.id)):
-        model.bulk_record_update_for([i.id for i in query_chunk])
-        db.session.commit()
-
-  logger.info("Updating index for: %s", "Snapshot")
-  with benchmark("Create records for %s" % "Snapshot"):
-    reindex_snapshots()
+  with benchmark("Create records for all indexed objects"):
+    reindexer = Reindexer(task)
+    reindexer.run()
   indexer.invalidate_cache()
   start_compute_attributes("all_latest")
 
@@ -341,7 +389,36 @@ def admin_reindex():
   if not permissions.is_allowed_read("/admin", None, 1):
     raise Forbidden()
   task_queue = create_task(
-      name="reindex",
+      name=fulltext_reindex.TASK_NAME,
+      url=url_for(reindex.__name__),
+      queued_callback=reindex
+  )
+  return task_queue.make_response(
+      app.make_response(("scheduled %s" % task_queue.name, 200,
+                         [('Content-Type', 'text/html')])))
+
+
+def get_failed_task(task_id, name):
+  """Get a failed background task with the given id and name prefix."""
+  task = all_models.BackgroundTask.query.get(task_id)
+  if task is None or not task.name.startswith(name):
+    raise NotFound()
+  if task.status != "Failure":
+    raise BadRequest("Only failed tasks can be resumed.")
+  return task
+
+
+@app.route("/admin/reindex/<int:task_id>/resume", methods=["POST"])
+@login_required
+def admin_resume_reindex(task_id):
+  """Calls the reindex webhook again for a failed reindex task.
+
+  The task continues with the chunks that it did not finish.
+  """
+  if not permissions.is_allowed_read("/admin", None, 1):
+    raise Forbidden()
+  task_queue = resume_task(
+      get_failed_task(task_id, fulltext_reindex.TASK_NAME),
       url=url_for(reindex.__name__),
       queued_callback=reindex
   )
@@ -350,6 +427,25 @@ def admin_reindex():
                          [('Content-Type', 'text/html')])))
 
 
+@app.route("/admin/upsert_snapshots/<int:task_id>/resume", methods=["POST"])
+@login_required
+def admin_resume_upsert_snapshots(task_id):
+  """Calls the upsert_snapshots webhook again for a failed task.
+
+  The task continues with the chunks that it did not finish.
+  """
+  if not permissions.is_allowed_read("/admin", None, 1):
+    raise Forbidden()
+  task_queue = resume_task(
+      get_failed_task(task_id, "upsert_snapshots"),
+      url=url_for(upsert_snapshots.__name__),
+      queued_callback=upsert_snapshots
+  )
+  return task_queue.make_response(
+      app.make_response(("scheduled %s" % task_queue.name, 200,
+                         [('Content-Type', 'text/html')])))
+
+
 @app.route("/admin/refresh_revisions", methods=["POST"])
 @login_required
 def admin_refresh_revisions():
@@ -365,6 +461,36 @@ def admin_refresh_revisions():
                          [('Content-Type', 'text/html')])))
 
 
+@app.route("/admin/compress_revisions", methods=["POST"])
+@login_required
+def admin_compress_revisions():
+  """Calls a webhook that compresses content of all revisions."""
+  admins = getattr(settings, "BOOTSTRAP_ADMIN_USERS", [])
+  if get_current_user().email not in admins:
+    raise Forbidden()
+
+  task_queue = create_task("compress_revisions", url_for(
+      compress_revisions.__name__), compress_revisions)
+  return task_queue.make_response(
+      app.make_response(("scheduled %s" % task_queue.name, 200,
+                         [('Content-Type', 'text/html')])))
+
+
+@app.route("/admin/rebuild_similarity_index", methods=["POST"])
+@login_required
+def admin_rebuild_similarity_index():
+  """Calls a webhook that rebuilds the similarity index."""
+  admins = getattr(settings, "BOOTSTRAP_ADMIN_USERS", [])
+  if get_current_user().email not in admins:
+    raise Forbidden()
+
+  task_queue = create_task("rebuild_similarity_index", url_for(
+      rebuild_similarity_index.__name__), rebuild_similarity_index)
+  return task_queue.make_response(
+      app.make_response(("scheduled %s" % task_queue.name, 200,
+                         [('Content-Type', 'text/html')])))
+
+
 @app.route("/admin/compute_attributes", methods=["POST"])
 @login_required
 def send_event_job():
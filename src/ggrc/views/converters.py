@@ -7,6 +7,7 @@ This module handles all view related function to import and export pages
 including the import/export api endponts.
 """
 
+import tempfile
 from logging import getLogger
 
 import httplib2
@@ -19,6 +20,7 @@ from flask import current_app
 from flask import request
 from flask import json
 from flask import render_template
+from flask import stream_with_context
 from werkzeug.exceptions import (
     BadRequest, NotFound, InternalServerError, Unauthorized
 )
@@ -28,6 +30,7 @@ from ggrc_gdrive_integration import get_credentials
 from ggrc_gdrive_integration import verify_credentials
 from ggrc.app import app
 from ggrc.converters.base import Converter
+from ggrc.converters.import_helper import generate_csv_chunks
 from ggrc.converters.import_helper import generate_csv_string
 from ggrc.converters.import_helper import read_csv_file
 from ggrc.query.exceptions import BadQueryException
@@ -66,6 +69,14 @@ def parse_export_request():
 
 def create_gdrive_file(csv_string, filename):
   """Post text/csv data to a gdrive file"""
+  media = http.MediaInMemoryUpload(csv_string,
+                                   mimetype='text/csv',
+                                   resumable=True)
+  return upload_gdrive_file(media, filename)
+
+
+def upload_gdrive_file(media, filename):
+  """Upload text/csv media to a gdrive spreadsheet"""
   credentials = get_credentials()
   http_auth = credentials.authorize(httplib2.Http())
   drive_service = discovery.build('drive', 'v3', http=http_auth)
@@ -74,14 +85,66 @@ def create_gdrive_file(csv_string, filename):
       'name': filename,
       'mimeType': 'application/vnd.google-apps.spreadsheet'
   }
-  media = http.MediaInMemoryUpload(csv_string,
-                                   mimetype='text/csv',
-                                   resumable=True)
   return drive_service.files().create(body=file_metadata,
                                       media_body=media,
                                       fields='id, name, parents').execute()
 
 
+def make_export_response(converter, export_to):
+  """Make export response with the whole csv file generated in memory."""
+  with benchmark("Generate CSV array"):
+    csv_data = converter.to_array()
+  with benchmark("Generate CSV string"):
+    csv_string = generate_csv_string(csv_data)
+  with benchmark("Make response."):
+    object_names = "_".join(converter.get_object_names())
+    filename = "{}.csv".format(object_names)
+    if export_to == "gdrive":
+      gfile = create_gdrive_file(csv_string, filename)
+      headers = [('Content-Type', 'application/json'), ]
+      return current_app.make_response((json.dumps(gfile), 200, headers))
+    if export_to == "csv":
+      headers = [
+          ("Content-Type", "text/csv"),
+          ("Content-Disposition",
+           "attachment; filename='{}'".format(filename)),
+      ]
+      return current_app.make_response((csv_string, 200, headers))
+
+
+def make_streamed_export_response(converter, export_to):
+  """Make export response with the csv file generated chunk by chunk.
+
+  Only one chunk of exported objects is held in memory at a time. For csv
+  export the chunks are streamed to the client and for gdrive export they are
+  written to a temporary file which is then uploaded.
+  """
+  with benchmark("Generate CSV headers"):
+    width, csv_chunks = converter.to_array_chunks(settings.EXPORT_CHUNK_SIZE)
+    csv_strings = generate_csv_chunks(csv_chunks, width)
+    object_names = "_".join(converter.get_object_names())
+    filename = "{}.csv".format(object_names)
+  if export_to == "gdrive":
+    with benchmark("Write CSV file"), tempfile.TemporaryFile() as csv_file:
+      for csv_string in csv_strings:
+        csv_file.write(csv_string)
+      csv_file.seek(0)
+      media = http.MediaIoBaseUpload(csv_file,
+                                     mimetype='text/csv',
+                                     resumable=True)
+      gfile = upload_gdrive_file(media, filename)
+    headers = [('Content-Type', 'application/json'), ]
+    return current_app.make_response((json.dumps(gfile), 200, headers))
+  if export_to == "csv":
+    headers = [
+        ("Content-Type", "text/csv"),
+        ("Content-Disposition",
+         "attachment; filename='{}'".format(filename)),
+    ]
+    return current_app.response_class(stream_with_context(csv_strings),
+                                      headers=headers)
+
+
 def handle_export_request():
   """Export request handler"""
   try:
@@ -91,25 +154,10 @@ def handle_export_request():
       export_to = data.get("export_to")
       query_helper = QueryHelper(objects)
       ids_by_type = query_helper.get_ids()
-    with benchmark("Generate CSV array"):
-      converter = Converter(ids_by_type=ids_by_type)
-      csv_data = converter.to_array()
-    with benchmark("Generate CSV string"):
-      csv_string = generate_csv_string(csv_data)
-    with benchmark("Make response."):
-      object_names = "_".join(converter.get_object_names())
-      filename = "{}.csv".format(object_names)
-      if export_to == "gdrive":
-        gfile = create_gdrive_file(csv_string, filename)
-        headers = [('Content-Type', 'application/json'), ]
-        return current_app.make_response((json.dumps(gfile), 200, headers))
-      if export_to == "csv":
-        headers = [
-            ("Content-Type", "text/csv"),
-            ("Content-Disposition",
-             "attachment; filename='{}'".format(filename)),
-        ]
-        return current_app.make_response((csv_string, 200, headers))
+    converter = Converter(ids_by_type=ids_by_type)
+    if getattr(settings, "EXPORT_STREAMING", False):
+      return make_streamed_export_response(converter, export_to)
+    return make_export_response(converter, export_to)
   except BadQueryException as exception:
     raise BadRequest(exception.message)
   except HttpError as e:
@@ -37,7 +37,18 @@ def nightly_cron_endpoint():
   return 'Ok'
 
 
+def fulltext_index_cron_endpoint():
+  """Reindex objects queued in deferred full text index mode."""
+  from ggrc.fulltext import mysql
+  if mysql.is_index_deferred():
+    mysql.process_index_queue()
+  return 'Ok'
+
+
 def init_cron_views(app):
   app.add_url_rule(
       "/nightly_cron_endpoint", "nightly_cron_endpoint",
       view_func=nightly_cron_endpoint)
+  app.add_url_rule(
+      "/fulltext_index_cron_endpoint", "fulltext_index_cron_endpoint",
+      view_func=fulltext_index_cron_endpoint)
@@ -23,6 +23,7 @@ from ggrc.models import all_models
 from ggrc.models.audit import Audit
 from ggrc.models.program import Program
 from ggrc.rbac import permissions as rbac_permissions
+from ggrc.rbac import permissions_cache as permissions_cache_
 from ggrc.rbac.permissions_provider import DefaultUserPermissions
 from ggrc.services.common import _get_cache_manager
 from ggrc.services import signals
@@ -47,8 +48,6 @@ blueprint = Blueprint(
     static_url_path='/static/ggrc_basic_permissions',
 )
 
-PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
-
 
 def get_public_config(_):
   """Expose additional permissions-dependent config to client.
@@ -350,35 +349,26 @@ def collect_permissions(src_permissions, context_id, permissions):
             })
 
 
-def query_memcache(key):
+def query_memcache(user_id):
   """Check if cached permissions are available
 
   Args:
-      key (string): key of the stored permissions
+      user_id (int): id of the user whose permissions are loaded
   Returns:
       cache (memcache_client): memcache client or None if caching
                                is not available
+      versions (tuple): permission versions that were current when the
+                        cache was queried
       permissions_cache (dict): dict with all permissions or None if there
                                 was a cache miss
   """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
-    return None, None
+    return None, None, None
 
   cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key not in cached_keys_set:
-    # We set the permissions:list variable so that we are able to batch
-    # remove all permissions related keys from memcache
-    cached_keys_set.add(key)
-    cache.set('permissions:list', cached_keys_set, PERMISSION_CACHE_TIMEOUT)
-    return cache, None
-
-  permissions_cache = cache.get(key)
-  if permissions_cache:
-    # If the key is both in permissions:list and in memcache itself
-    # it is safe to return the cached permissions
-    return cache, permissions_cache
-  return cache, None
+  versions, permissions_cache = permissions_cache_.get_cached_permissions(
+      cache, user_id)
+  return cache, versions, permissions_cache
 
 
 def load_default_permissions(permissions):
@@ -716,26 +706,41 @@ def load_backlog_workflows(permissions):
             .append(wf_context_id)
 
 
-def store_results_into_memcache(permissions, cache, key):
-  """Load personal context for user
+def compact_permissions(permissions):
+  """Remove duplicate context and resource ids from permissions
+
+  Args:
+      permissions (dict): dict with loaded permissions
+  Returns:
+      permissions with sorted lists of unique contexts and resources
+  """
+  for resource_permissions in permissions.values():
+    for permission in resource_permissions.values():
+      for key in ('contexts', 'resources'):
+        if key in permission:
+          permission[key] = sorted(set(permission[key]))
+  return permissions
+
+
+def store_results_into_memcache(permissions, cache, user_id, versions):
+  """Store loaded permissions into memcache
 
   Args:
       permissions (dict): dict where the permissions will be stored
       cache (cache_manager): Cache manager that should be used for storing
                              permissions
-      key (string): key of under which permissions should be stored
+      user_id (int): id of the user whose permissions are stored
+      versions (tuple): permission versions from before permissions were
+                        loaded
   Returns:
       None
   """
   if cache is None:
     return
 
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key in cached_keys_set:
-    # We only add the permissions to the cache if the
-    # key still exists in the permissions:list after
-    # the query has executed.
-    cache.set(key, permissions, PERMISSION_CACHE_TIMEOUT)
+  # Permissions that were invalidated while they were being loaded are
+  # stored with old versions and will not be used.
+  permissions_cache_.store_permissions(cache, user_id, versions, permissions)
 
 
 def load_permissions_for(user):
@@ -757,10 +762,9 @@ def load_permissions_for(user):
   'terms' are the arguments to the 'condition'.
   """
   permissions = {}
-  key = 'permissions:{}'.format(user.id)
 
   with benchmark("load_permissions > query memcache"):
-    cache, result = query_memcache(key)
+    cache, versions, result = query_memcache(user.id)
     if result:
       return result
 
@@ -796,8 +800,11 @@ def load_permissions_for(user):
   with benchmark("load_permissions > load backlog workflows"):
     load_backlog_workflows(permissions)
 
+  with benchmark("load_permissions > compact permissions"):
+    compact_permissions(permissions)
+
   with benchmark("load_permissions > store results into memcache"):
-    store_results_into_memcache(permissions, cache, key)
+    store_results_into_memcache(permissions, cache, user.id, versions)
 
   return permissions
 
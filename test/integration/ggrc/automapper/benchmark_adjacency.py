@@ -0,0 +1,132 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark neighborhood lookups of the automapper
+
+ Synthetic graphs of 10k, 100k and 1M relationships are inserted into the
+ relationships table and the relationship_neighbors index. Breadth first
+ searches from random objects fetch the neighborhood of each frontier twice:
+ with the UNION ALL query over relationships sources and destinations that
+ AutomapperGenerator used to run, and with a single lookup in the adjacency
+ index. The inserted rows are removed at the end.
+
+ Prerequisite: a migrated database configured for the ggrc app.
+
+ Usage: python benchmark_adjacency.py [searches] [max_frontier]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.automapper import adjacency
+from ggrc.models.relationship import Relationship
+
+
+graph_sizes = [10000, 100000, 1000000]
+node_types = ["BenchmarkProgram", "BenchmarkControl", "BenchmarkObjective"]
+chunk_size = 10000
+
+
+def union_neighbors(stubs):
+  """Get neighbors the way AutomapperGenerator._populate_cache used to."""
+  stubs = [tuple(stub) for stub in stubs]
+  cols = db.session.query(
+      Relationship.source_type, Relationship.source_id,
+      Relationship.destination_type, Relationship.destination_id)
+  relationships = cols.filter(
+      tuple_(Relationship.source_type, Relationship.source_id).in_(stubs)
+  ).union_all(
+      cols.filter(
+          tuple_(Relationship.destination_type,
+                 Relationship.destination_id).in_(stubs))
+  ).all()
+  return relationships
+
+
+def index_neighbors(stubs):
+  return adjacency.get_neighbors(stubs)
+
+
+def create_graph(size):
+  """Insert size random relationships between size / 5 objects."""
+  node_count = size // 5
+  now = datetime.datetime.now()
+  edges = set()
+  while len(edges) < size:
+    edge = tuple((random.choice(node_types), random.randint(1, node_count))
+                 for _ in range(2))
+    if edge[0] != edge[1] and edge[::-1] not in edges:
+      edges.add(edge)
+  edges = list(edges)
+  for start in range(0, size, chunk_size):
+    chunk = edges[start:start + chunk_size]
+    db.session.execute(Relationship.__table__.insert(), [
+        {"source_type": src[0], "source_id": src[1],
+         "destination_type": dst[0], "destination_id": dst[1],
+         "created_at": now, "updated_at": now}
+        for src, dst in chunk
+    ])
+    adjacency.add_neighbors(chunk)
+    db.session.commit()
+  return node_count
+
+
+def delete_graph():
+  for table, column in ((Relationship.__table__, "source_type"),
+                        (adjacency.RelationshipNeighbor.__table__,
+                         "object_type")):
+    db.session.execute(table.delete().where(
+        table.c[column].in_(node_types)))
+  db.session.commit()
+
+
+def search(lookup, start, max_frontier):
+  """Breadth first search with one lookup per frontier."""
+  visited = {start}
+  frontier = [start]
+  lookups = 0
+  while frontier:
+    rows = lookup(frontier[:max_frontier])
+    lookups += 1
+    frontier = []
+    for row in rows:
+      for stub in ((row[0], row[1]), (row[2], row[3])):
+        if stub not in visited:
+          visited.add(stub)
+          frontier.append(stub)
+  return lookups
+
+
+def run_benchmark(searches, max_frontier):
+  with app.app_context():
+    for size in graph_sizes:
+      delete_graph()
+      node_count = create_graph(size)
+      starts = [(random.choice(node_types), random.randint(1, node_count))
+                for _ in range(searches)]
+      try:
+        for name, lookup in (("union all", union_neighbors),
+                             ("adjacency", index_neighbors)):
+          lookups = 0
+          start_time = time.time()
+          for start in starts:
+            lookups += search(lookup, start, max_frontier)
+          elapsed = time.time() - start_time
+          print "{:>8} relationships - {:9}: {:>6} lookups - {:8.4f}s".format(
+              size, name, lookups, elapsed)
+      finally:
+        delete_graph()
+
+
+if __name__ == "__main__":
+  run_benchmark(
+      int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+      int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+  )
@@ -0,0 +1,77 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the relationship adjacency index."""
+
+from ggrc import db
+from ggrc.automapper import adjacency
+from ggrc.models import all_models
+
+from integration.ggrc import TestCase
+from integration.ggrc import generator
+from integration.ggrc.models import factories
+
+
+def _get_index():
+  return set(db.session.query(
+      adjacency.RelationshipNeighbor.object_type,
+      adjacency.RelationshipNeighbor.object_id,
+      adjacency.RelationshipNeighbor.neighbor_type,
+      adjacency.RelationshipNeighbor.neighbor_id,
+  ))
+
+
+def _get_expected_index():
+  index = set()
+  for rel in all_models.Relationship.query:
+    index.add((rel.source_type, rel.source_id,
+               rel.destination_type, rel.destination_id))
+    index.add((rel.destination_type, rel.destination_id,
+               rel.source_type, rel.source_id))
+  return index
+
+
+class TestAdjacency(TestCase):
+  """Tests for keeping the adjacency index in sync with relationships."""
+
+  def setUp(self):
+    super(TestAdjacency, self).setUp()
+    self.gen = generator.ObjectGenerator()
+
+  def test_automappings(self):
+    """Relationships and automappings are added to the index."""
+    program = factories.ProgramFactory()
+    regulation = factories.RegulationFactory()
+    control = factories.ControlFactory()
+    self.gen.generate_relationship(program, regulation)
+    self.gen.generate_relationship(regulation, control)
+    self.assertEqual(len(_get_expected_index()), 6)
+    self.assertEqual(_get_index(), _get_expected_index())
+    self.assertEqual(
+        {(row[2], row[3]) for row in adjacency.get_neighbors(
+            [("Control", control.id)])},
+        {("Program", program.id), ("Regulation", regulation.id)},
+    )
+
+  def test_deletion(self):
+    """Pairs stay in the index while related in any direction."""
+    control = factories.ControlFactory()
+    objective = factories.ObjectiveFactory()
+    rel1 = factories.RelationshipFactory(source=control,
+                                         destination=objective)
+    rel2 = factories.RelationshipFactory(source=objective,
+                                         destination=control)
+    db.session.delete(rel1)
+    db.session.commit()
+    self.assertEqual(len(_get_index()), 2)
+    db.session.delete(rel2)
+    db.session.commit()
+    self.assertEqual(_get_index(), set())
+
+  def test_rebuild(self):
+    """Rebuilt index matches relationships."""
+    factories.RelationshipFactory(source=factories.ControlFactory(),
+                                  destination=factories.ObjectiveFactory())
+    db.session.execute(adjacency.RelationshipNeighbor.__table__.delete())
+    adjacency.rebuild()
+    self.assertEqual(_get_index(), _get_expected_index())
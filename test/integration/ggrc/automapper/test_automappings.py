@@ -6,6 +6,8 @@
 import itertools
 from contextlib import contextmanager
 
+import mock
+
 import ggrc
 from ggrc import automapper
 from ggrc import models
@@ -377,3 +379,45 @@ class TestAutomappings(TestCase):
     assert rel2.id == rel2_after_delete.id
     # Parent id should now be None
     assert rel2_after_delete.parent_id is None
+
+
+class TestBulkAutomappings(TestAutomappings):
+  """Test automappings generated by the bulk engine"""
+  def setUp(self):
+    super(TestBulkAutomappings, self).setUp()
+    patcher = mock.patch("ggrc.settings.AUTOMAPPER_ENGINE", "bulk",
+                         create=True)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def test_batch(self):
+    """Test automappings of relationships created in one flush"""
+    program = factories.ProgramFactory()
+    regulation = factories.RegulationFactory()
+    section = factories.SectionFactory()
+    objective = factories.ObjectiveFactory()
+    with factories.single_commit():
+      factories.RelationshipFactory(source=program, destination=regulation)
+      factories.RelationshipFactory(source=regulation, destination=section)
+      factories.RelationshipFactory(source=section, destination=objective)
+    for src, dst in [(program, section), (program, objective),
+                     (regulation, objective)]:
+      self.assert_mapping(src, dst)
+
+  def test_batch_without_mappings(self):
+    """Test automappings are kept only for relationships with mappings"""
+    program = factories.ProgramFactory()
+    regulation = factories.RegulationFactory()
+    section = factories.SectionFactory()
+    with factories.single_commit():
+      factories.RelationshipFactory(source=program, destination=regulation)
+      factories.RelationshipFactory(source=regulation, destination=section)
+      unmapped = factories.RelationshipFactory(
+          source=factories.ControlFactory(),
+          destination=factories.ObjectiveFactory(),
+      )
+    self.assert_mapping(program, section)
+    automapped = models.Relationship.find_related(program, section)
+    self.assertIsNotNone(Automapping.query.get(automapped.automapping_id))
+    self.assertEqual(
+        Automapping.query.filter_by(relationship_id=unmapped.id).count(), 0)
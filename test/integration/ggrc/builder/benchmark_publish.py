@@ -0,0 +1,81 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark publishing of controls with compiled publish plans
+
+ The given number of controls is created and loaded and every control is
+ published with the cached publish plan of the Control builder and with a
+ plan compiled for every object, which is what publishing did before plans
+ were cached. Both ways must give the same representations. Total times of
+ all rounds are printed.
+
+ Prerequisite: a scratch database migrated for the ggrc app. Created objects
+ are not removed.
+
+ Usage: python benchmark_publish.py [controls] [rounds]
+"""
+
+import json
+import sys
+import time
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.builder.json import get_json_builder
+from ggrc.builder.json import publish
+from ggrc.models import all_models
+
+from integration.ggrc.models import factories
+
+
+def create_controls(control_count):
+  """Create controls and return their ids."""
+  with factories.single_commit():
+    controls = [factories.ControlFactory() for _ in range(control_count)]
+  return [control.id for control in controls]
+
+
+def publish_uncached(obj):
+  """Publish obj with a publish plan compiled only for this object."""
+  # pylint: disable=protected-access
+  builder = get_json_builder(obj)
+  builder._publish_plans.clear()
+  return publish(obj)
+
+
+def dump(representations):
+  return json.dumps(representations, sort_keys=True, default=vars)
+
+
+def run_rounds(name, publish_function, objects, round_count):
+  """Publish all objects round_count times and return the last result."""
+  start = time.time()
+  for _ in range(round_count):
+    result = [publish_function(obj) for obj in objects]
+  duration = time.time() - start
+  print "{:>8}: {:8.3f}s - {:8.1f} objects/s".format(
+      name, duration, len(objects) * round_count / duration)
+  return result
+
+
+def run_benchmark(control_count, round_count):
+  with app.app_context():
+    ids = create_controls(control_count)
+    with app.test_request_context():
+      controls = all_models.Control.eager_query().filter(
+          all_models.Control.id.in_(ids)).all()
+      for control in controls:
+        publish(control)  # load lazy attributes
+      uncached = run_rounds("uncached", publish_uncached, controls,
+                            round_count)
+      cached = run_rounds("cached", publish, controls, round_count)
+      assert dump(uncached) == dump(cached)
+    db.session.rollback()
+
+
+if __name__ == "__main__":
+  run_benchmark(
+      int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+      int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+  )
@@ -1,13 +1,18 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+import mock
 from mock import MagicMock
 
 import ggrc.builder
 import ggrc.models
+from ggrc.builder.json import LazyStubRepresentation
 from ggrc.builder.json import publish
+from ggrc.builder.json import publish_representation
 from ggrc.services.common import Resource
+from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
+from integration.ggrc.models import factories
 
 
 class TestBuilder(TestCase):
@@ -107,3 +112,62 @@ class TestBuilder(TestCase):
     self.assertDictContainsSubset(
         {'prop_b': 'prop_b', 'mixin': 'mixin_b'},
         json_obj)
+
+  def test_publish_plan_cached(self):
+    """Attributes are reflected once for all objects of a model."""
+    self.mock_service('MockPlanModel')
+    model = self.mock_model('MockPlanModel', foo='bar', boo='far', id=1,
+                            _publish_attrs=['foo', 'boo'])
+    other = MagicMock()
+    other.__class__ = model.__class__
+    other.foo, other.boo = 'baz', 'faz'
+    builder = ggrc.builder.json.get_json_builder(model)
+    with mock.patch.object(builder, '_compile_publish_attr',
+                           wraps=builder._compile_publish_attr) as compile_:
+      self.assertDictContainsSubset({'foo': 'bar', 'boo': 'far'},
+                                    publish(model))
+      self.assertDictContainsSubset({'foo': 'baz', 'boo': 'faz'},
+                                    publish(other))
+      self.assertEqual(compile_.call_count, 2)
+      whitelisted = publish(other, attribute_whitelist=['foo'])
+    self.assertIn('foo', whitelisted)
+    self.assertNotIn('boo', whitelisted)
+
+
+class TestPublishRepresentation(TestCase):
+  """Tests for resolving stubs of published objects."""
+
+  def test_stubs_resolved_in_place(self):
+    """Stubs are replaced in place and served from the request cache."""
+    with factories.single_commit():
+      control = factories.ControlFactory()
+      objective = factories.ObjectiveFactory()
+      relationship = factories.RelationshipFactory(source=control,
+                                                   destination=objective)
+
+    published = [publish(relationship)]
+    self.assertIsInstance(published[0]["source"], LazyStubRepresentation)
+    publish_representation(published)
+    self.assertDictContainsSubset({"type": "Control", "id": control.id},
+                                  published[0]["source"])
+    self.assertDictContainsSubset({"type": "Objective", "id": objective.id},
+                                  published[0]["destination"])
+
+    republished = publish(relationship)
+    with QueryCounter() as counter:
+      publish_representation(republished)
+    self.assertEqual(counter.get, 0)
+    self.assertEqual(republished["source"], published[0]["source"])
+
+  def test_stubs_outside_published_objects(self):
+    """Stubs in copies of published objects and added stubs are resolved."""
+    control = factories.ControlFactory()
+    resource = {"controls": [
+        dict(publish(control)),
+        LazyStubRepresentation("Control", control.id),
+    ]}
+    publish_representation(resource)
+    self.assertDictContainsSubset({"type": "Control", "id": control.id},
+                                  resource["controls"][1])
+    self.assertNotIsInstance(resource["controls"][0]["modified_by"],
+                             LazyStubRepresentation)
@@ -0,0 +1,71 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark throughput of control imports with different flush batch sizes
+
+ For every batch size a csv file with the given number of new controls is
+ imported through /_service/import_csv and rows per second are printed
+ together with the number of row errors.
+
+ Prerequisite: a scratch database migrated for the ggrc app. Created objects
+ are not removed.
+
+ Usage: python benchmark_import.py [rows] [batch_size ...]
+ e.g. python benchmark_import.py 10000 1 100 1000
+"""
+
+import json
+import sys
+import time
+import uuid
+from StringIO import StringIO
+
+import mock
+
+from ggrc.app import app
+
+from integration.ggrc import read_imported_file
+
+
+def make_csv(row_count):
+  """Make a csv file with row_count new controls."""
+  prefix = uuid.uuid4().hex[:8]
+  lines = ["Object type,,,", "Control,Code*,Title*,Admin*"]
+  lines.extend(
+      ",control-{0}-{1},Control {0} {1},user@example.com".format(prefix, i)
+      for i in range(row_count)
+  )
+  return "\n".join(lines) + "\n"
+
+
+def run_import(client, row_count, batch_size):
+  """Import row_count controls flushed in batches of batch_size."""
+  data = {"file": (StringIO(make_csv(row_count)), "controls.csv")}
+  headers = {"X-test-only": "false", "X-requested-by": "GGRC"}
+  with mock.patch("ggrc.settings.IMPORT_FLUSH_BATCH_SIZE", batch_size,
+                  create=True):
+    start = time.time()
+    response = client.post("/_service/import_csv", data=data,
+                           headers=headers)
+    duration = time.time() - start
+  blocks = json.loads(response.data)
+  row_errors = sum(len(block["row_errors"]) for block in blocks)
+  print "batch {:>5}: {:8.1f} rows/s - {:8.2f}s - {} row errors".format(
+      batch_size, row_count / duration, duration, row_errors)
+
+
+def run_benchmark(row_count, batch_sizes):
+  with mock.patch("ggrc.views.converters.get_gdrive_file",
+                  new=read_imported_file):
+    client = app.test_client()
+    client.get("/login")
+    for batch_size in batch_sizes:
+      run_import(client, row_count, batch_size)
+
+
+if __name__ == "__main__":
+  run_benchmark(
+      int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+      [int(size) for size in sys.argv[2:]] or [1, 100, 1000],
+  )
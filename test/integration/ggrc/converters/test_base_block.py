@@ -3,13 +3,18 @@
 
 """Tests for basic Block Converter."""
 
+import os
+import tempfile
 from collections import defaultdict
+from collections import OrderedDict
 
 import mock
 from ddt import data, ddt
 
 from ggrc import models
 from ggrc.converters import base_block
+from ggrc.converters import base_row
+from ggrc.converters.handlers import handlers
 from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories
@@ -99,3 +104,64 @@ class TestBaseBlock(TestCase):
     block.object_ids = [regulation.id]
     id_map = block._get_identifier_mappings(relationships)
     self.assertEqual(expected_id_map, id_map)
+
+  def test_prefetched_lookups(self):
+    """Objects referenced anywhere in the block are fetched together."""
+    with factories.single_commit():
+      markets = [factories.MarketFactory() for _ in range(4)]
+      person = factories.PersonFactory()
+    block = base_block.BlockConverter(mock.MagicMock())
+    block.headers = OrderedDict([
+        ("slug", {"handler": handlers.ColumnHandler}),
+        ("map:market", {"handler": handlers.MappingColumnHandler}),
+        ("contact", {"handler": handlers.UserColumnHandler}),
+    ])
+    block.rows = [
+        ["control-{}".format(i), market.slug.upper(), person.email]
+        for i, market in enumerate(markets)
+    ]
+
+    with QueryCounter() as counter:
+      found = [block.find_object(models.Market, "slug", market.slug)
+               for market in markets]
+      self.assertIsNone(block.find_object(models.Market, "slug", "control-1"))
+      self.assertEqual(counter.get, 1)
+      self.assertEqual(block.get_person(person.email.upper()), person)
+      self.assertEqual(counter.get, 2)
+    self.assertEqual(found, markets)
+
+  def test_batched_import_failing_row(self):
+    """Rows of a failing batch are imported, only the failing row is not."""
+    existing_slug = factories.ControlFactory().slug
+    insert_object = base_row.RowConverter.insert_object
+
+    def insert_duplicate(row_converter):
+      insert_object(row_converter)
+      if row_converter.obj.slug == "control-bad":
+        row_converter.obj.slug = existing_slug
+
+    slugs = ["control-{}".format(i) for i in range(5)]
+    slugs.insert(3, "control-bad")
+    with tempfile.NamedTemporaryFile(dir=self.CSV_DIR, suffix=".csv") as tmp:
+      tmp.write("Object type,,,\nControl,Code*,Title*,Admin*\n")
+      for slug in slugs:
+        tmp.write(",{0},{0} title,user@example.com\n".format(slug))
+      tmp.flush()
+      with mock.patch("ggrc.settings.IMPORT_FLUSH_BATCH_SIZE", 4,
+                      create=True), \
+          mock.patch.object(base_row.RowConverter, "insert_object",
+                            insert_duplicate):
+        response = self._import_file(os.path.basename(tmp.name))
+
+    self.assertEqual(response[0]["created"], 5)
+    self.assertEqual(len(response[0]["row_errors"]), 1)
+    self.assertIn("unknown error", response[0]["row_errors"][0])
+    imported = models.Control.query.filter(
+        models.Control.slug.in_(slugs)).all()
+    self.assertEqual(sorted(control.slug for control in imported),
+                     sorted(set(slugs) - {"control-bad"}))
+    revisions = models.Revision.query.filter(
+        models.Revision.resource_type == "Control",
+        models.Revision.resource_id.in_([c.id for c in imported]),
+    ).count()
+    self.assertEqual(revisions, len(imported))
@@ -4,6 +4,7 @@ import string
 from os.path import abspath, dirname, join
 
 import ddt
+import mock
 from flask.json import dumps
 
 from ggrc.converters import get_importables
@@ -406,6 +407,26 @@ class TestExportMultipleObjects(TestCase):
         self.assertNotIn(programs[i], response.data)
         self.assertNotIn(regulations[i], response.data)
 
+  def test_streamed_multi_export(self):
+    """Test streamed export is the same as export generated in memory"""
+    with factories.single_commit():
+      for _ in range(5):
+        factories.ControlFactory()
+        factories.RegulationFactory()
+    data = [
+        {"object_name": "Control", "fields": "all",
+         "filters": {"expression": {}}},
+        {"object_name": "Regulation", "fields": "all",
+         "filters": {"expression": {}}},
+    ]
+    response = self.export_csv(data)
+    self.assert200(response)
+    with mock.patch.multiple("ggrc.settings", EXPORT_STREAMING=True,
+                             EXPORT_CHUNK_SIZE=2, create=True):
+      streamed_response = self.export_csv(data)
+    self.assert200(streamed_response)
+    self.assertEqual(streamed_response.data, response.data)
+
   def test_relevant_to_previous_export(self):
     """Test relevant to previous export"""
     res = self._import_file("data_for_export_testing_relevant_previous.csv")
@@ -3,6 +3,7 @@
 
 import unittest
 
+import mock
 from sqlalchemy import and_
 from sqlalchemy import or_
 
@@ -131,6 +132,24 @@ class TestCsvImport(TestCase):
     self.assertEqual(get_relationships_for(p1).count(), 3)
     self.assertEqual(get_relationships_for(org1).count(), 5)
 
+  def test_multi_import_on_workers(self):
+    """Lookups fetched on import workers give the same results."""
+    filename = "multi_basic_policy_orggroup_product_with_mappings.csv"
+    response_serial = self.import_file(filename, dry_run=True)
+    with mock.patch("ggrc.settings.IMPORT_WORKERS", 4, create=True):
+      response = self.import_file(filename)
+
+    self.assertEqual(response, response_serial)
+    self.assertEqual(Policy.query.count(), 4)
+    self.assertEqual(Product.query.count(), 5)
+    org1 = OrgGroup.query.filter_by(slug="org-1").first()
+    self.assertEqual(Relationship.query.filter(or_(
+        and_(Relationship.source_id == org1.id,
+             Relationship.source_type == org1.type),
+        and_(Relationship.destination_id == org1.id,
+             Relationship.destination_type == org1.type),
+    )).count(), 5)
+
   @unittest.skip("unskip when import/export fixed for workflows")
   def test_big_import_with_mappings(self):
     """Test big import with mappings"""
@@ -29,6 +29,7 @@ import datetime
 
 import freezegun
 import itertools
+import mock
 
 from ggrc import models
 from ggrc.converters import errors
@@ -239,3 +240,39 @@ class TestLastAssessmentDate(TestCase):
     self.assertEqual(1, len(resp))
     self.assertEqual(1, resp[0]["updated"])
     self.assertEqual(control.last_assessment_date, finish_date)
+
+
+class TestIncrementalLastAssessmentDate(TestLastAssessmentDate):
+  """Test last assessment dates computed in incremental mode."""
+
+  def setUp(self):
+    super(TestIncrementalLastAssessmentDate, self).setUp()
+    patcher = mock.patch("ggrc.settings.COMPUTED_ATTRIBUTES_MODE",
+                         "incremental", create=True)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def test_later_and_reopened_assessment(self):
+    """Test incremental updates of a maximum and of a lowered maximum."""
+    first_date = datetime.datetime(2017, 2, 20, 13, 40, 0)
+    second_date = datetime.datetime(2017, 3, 20, 13, 40, 0)
+
+    with freezegun.freeze_time(first_date):
+      asmt = models.Assessment.query.filter_by(title="Assessment_0").first()
+      self.api.put(asmt, {"status": "Completed"})
+    with freezegun.freeze_time(second_date):
+      asmt = models.Assessment.query.filter_by(title="Assessment_1").first()
+      self.api.put(asmt, {"status": "Completed"})
+
+    dates = {control.title: control.last_assessment_date
+             for control in models.Control.query}
+    self.assertEqual(dates["Control_1"], second_date)
+    self.assertEqual(dates["Control_2"], second_date)
+
+    asmt = models.Assessment.query.filter_by(title="Assessment_1").first()
+    self.api.put(asmt, {"status": "In Progress"})
+
+    dates = {control.title: control.last_assessment_date
+             for control in models.Control.query}
+    self.assertEqual(dates["Control_1"], first_date)
+    self.assertEqual(dates["Control_2"], None)
@@ -0,0 +1,86 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Integration tests for deferred full text indexing."""
+
+import mock
+
+from ggrc import db
+from ggrc.fulltext import mysql
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+Record = mysql.MysqlRecordProperty
+Queue = mysql.FulltextIndexQueue
+
+
+class TestDeferredIndex(TestCase):
+  """Tests for indexing objects through the index queue."""
+
+  def setUp(self):
+    super(TestDeferredIndex, self).setUp()
+    patcher = mock.patch.multiple("ggrc.settings", create=True,
+                                  FULLTEXT_INDEX_MODE="deferred")
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  @staticmethod
+  def _get_titles(model_name):
+    return {content for content, in db.session.query(Record.content).filter(
+        Record.type == model_name, Record.property == "title")}
+
+  def test_commit_enqueues_objects(self):
+    """Committed objects are queued and reindexed by the queue job."""
+    with factories.single_commit():
+      control = factories.ControlFactory(title="deferred control")
+    control_id = control.id
+    self.assertEqual(self._get_titles("Control"), set())
+    self.assertIn(("Control", control_id),
+                  set(db.session.query(Queue.type, Queue.key)))
+
+    response = self.client.get("/fulltext_index_cron_endpoint")
+
+    self.assert200(response)
+    self.assertEqual(self._get_titles("Control"), {"deferred control"})
+    self.assertEqual(Queue.query.count(), 0)
+
+  def test_duplicates_coalesced(self):
+    """Duplicate queue entries are reindexed once and all removed."""
+    with factories.single_commit():
+      control = factories.ControlFactory(title="first title")
+    control.title = "second title"
+    db.session.commit()
+    queued = Queue.query.count()
+    self.assertGreaterEqual(queued, 2)
+
+    self.assertEqual(mysql.process_index_queue(), queued)
+    self.assertEqual(self._get_titles("Control"), {"second title"})
+    self.assertEqual(Queue.query.count(), 0)
+
+  def _query_control_ids(self, title):
+    """Return ids of controls with the title through the query API."""
+    response = self.client.post(
+        "/query",
+        data='[{"object_name": "Control", "type": "ids", "filters": '
+             '{"expression": {"left": "title", "op": {"name": "="}, '
+             '"right": "%s"}}}]' % title,
+        headers={"Content-Type": "application/json",
+                 "X-Requested-By": "GGRC"},
+    )
+    self.assert200(response)
+    return response.json[0]["Control"]["ids"]
+
+  def test_reads_do_not_reindex(self):
+    """Queries leave queued objects to the queue job."""
+    with factories.single_commit():
+      factories.ControlFactory(title="queued control")
+    self.client.get("/login")
+
+    self.assertEqual(self._query_control_ids("queued control"), [])
+    self.assertEqual(self._get_titles("Control"), set())
+    self.assertEqual(Queue.query.count(), 1)
+
+    self.client.get("/fulltext_index_cron_endpoint")
+
+    self.assertEqual(len(self._query_control_ids("queued control")), 1)
@@ -4,13 +4,16 @@
 """Test for total reindex procedure"""
 
 import ddt
+import mock
 from sqlalchemy import orm
 
 from ggrc import db
 from ggrc import fulltext
+from ggrc.fulltext import reindex
 from ggrc.fulltext.mysql import MysqlRecordProperty
 from ggrc.utils import QueryCounter
 from ggrc.fulltext import mysql
+from ggrc.models import all_models
 
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories as ggrc_factories
@@ -103,6 +106,131 @@ class TestTotalReindex(TestCase):
     ).count()
     self.assertEqual(count, reindexed_count)
 
+  def test_reindex_progress(self):
+    """Test reindex task result contains progress of all models."""
+    with ggrc_factories.single_commit():
+      control_ids = [ggrc_factories.ControlFactory().id for _ in range(3)]
+    self.client.get("/login")
+    self.client.post("/admin/reindex")
+
+    task = all_models.BackgroundTask.query.order_by(
+        all_models.BackgroundTask.id.desc()).first()
+    self.assertEqual(task.status, "Success")
+    progress = task.result["progress"]
+    self.assertEqual(progress["Control"]["chunks"], [min(control_ids)])
+    self.assertEqual(progress["Control"]["done"], [0])
+    self.assertEqual(progress["Control"]["records"], 3)
+    self.assertIn("Snapshot", progress)
+
+  def test_reindex_ignores_failed_task(self):
+    """Test reindex does not skip chunks done by an older failed reindex."""
+    with ggrc_factories.single_commit():
+      control = ggrc_factories.ControlFactory()
+      ggrc_factories.PolicyFactory()
+    failed_task = all_models.BackgroundTask(name="reindex1", status="Failure")
+    failed_task.result = {"progress": {
+        "Control": {"chunks": [control.id], "done": [0], "records": 1,
+                    "seconds": 1.0, "records_per_second": 1.0},
+    }}
+    db.session.add(failed_task)
+    db.session.commit()
+    indexer = fulltext.get_indexer()
+    indexer.record_type.query.delete()
+    db.session.commit()
+
+    self.client.get("/login")
+    self.client.post("/admin/reindex")
+
+    indexed_types = {record.type for record in indexer.record_type.query}
+    self.assertIn("Control", indexed_types)
+    self.assertIn("Policy", indexed_types)
+
+  def test_reindex_retry_continues_progress(self):
+    """Test retried reindex task skips chunks it finished before."""
+    with ggrc_factories.single_commit():
+      control = ggrc_factories.ControlFactory()
+      ggrc_factories.PolicyFactory()
+    task = all_models.BackgroundTask(name="reindex1", status="Pending")
+    task.result = {"progress": {
+        "Control": {"chunks": [control.id], "done": [0], "records": 1,
+                    "seconds": 1.0, "records_per_second": 1.0},
+    }}
+    db.session.add(task)
+    db.session.commit()
+    indexer = fulltext.get_indexer()
+    indexer.record_type.query.delete()
+    db.session.commit()
+
+    reindex.Reindexer(task=task, workers=1).run()
+
+    indexed_types = {record.type for record in indexer.record_type.query}
+    self.assertNotIn("Control", indexed_types)
+    self.assertIn("Policy", indexed_types)
+
+  @mock.patch.multiple("ggrc.settings", create=True,
+                       REINDEX_CHUNK_SIZE=1, REINDEX_WORKERS=1)
+  def test_resume_failed_reindex(self):
+    """Test resumed reindex task skips chunks finished before a failure."""
+    with ggrc_factories.single_commit():
+      control_ids = sorted(ggrc_factories.ControlFactory().id
+                           for _ in range(3))
+    calls = []
+    failures = []
+    reindex_chunk = reindex.reindex_chunk
+
+    def failing_reindex_chunk(model_name, start, end):
+      calls.append((model_name, start))
+      if (model_name, start) == ("Control", control_ids[1]) and not failures:
+        failures.append(start)
+        raise Exception("Reindex failed")
+      return reindex_chunk(model_name, start, end)
+
+    self.client.get("/login")
+    with mock.patch("ggrc.fulltext.reindex.reindex_chunk",
+                    side_effect=failing_reindex_chunk):
+      self.client.post("/admin/reindex")
+      task = all_models.BackgroundTask.query.order_by(
+          all_models.BackgroundTask.id.desc()).first()
+      self.assertEqual(task.status, "Failure")
+      first_run = list(calls)
+      del calls[:]
+      response = self.client.post("/admin/reindex/{}/resume".format(task.id))
+
+    self.assert200(response)
+    task = all_models.BackgroundTask.query.get(task.id)
+    self.assertEqual(task.status, "Success")
+    self.assertIn(("Control", control_ids[0]), first_run)
+    self.assertEqual([start for name, start in calls if name == "Control"],
+                     control_ids[1:])
+    self.assertFalse(set(first_run[:-1]) & set(calls))
+    self.assertEqual(task.result["progress"]["Control"]["records"], 3)
+
+  def test_resume_only_failed_reindex(self):
+    """Test only failed reindex tasks can be resumed."""
+    self.client.get("/login")
+    self.client.post("/admin/reindex")
+    task = all_models.BackgroundTask.query.order_by(
+        all_models.BackgroundTask.id.desc()).first()
+    response = self.client.post("/admin/reindex/{}/resume".format(task.id))
+    self.assert400(response)
+
+  def test_reindex_chunks(self):
+    """Test reindex of objects split into multiple chunks."""
+    with ggrc_factories.single_commit():
+      for _ in range(5):
+        ggrc_factories.ControlFactory()
+    indexer = fulltext.get_indexer()
+    indexer.record_type.query.delete()
+    db.session.commit()
+
+    progress = reindex.Reindexer(chunk_size=2, workers=1).run()
+
+    self.assertEqual(len(progress["Control"]["chunks"]), 3)
+    self.assertEqual(progress["Control"]["records"], 5)
+    indexed_ids = {record.key for record in indexer.record_type.query.filter(
+        MysqlRecordProperty.type == "Control")}
+    self.assertEqual(len(indexed_ids), 5)
+
   COMMIT_INDEX_TEST_CASES = [(f, OBJECT_TEST_COUNT)
                              for f in INDEXED_MODEL_FACTORIES]
 
@@ -0,0 +1,90 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark round trips for per-key and batched collection cache access
+
+ Collection pages of 100, 1k and 10k objects are written to and read from the
+ App Engine memcache stub twice: once with a memcache call per object, the way
+ Resource.get_resources_from_cache used to work, and once through
+ CacheManager.bulk_add/bulk_get. Each memcache call counts as one round trip
+ and is delayed by `rtt` seconds to emulate the network latency of a real
+ memcache server.
+
+ Prerequisite: google_appengine must be on PYTHONPATH (see bin/init_env).
+
+ Usage: python benchmark_batched_cache.py [rtt_seconds] [batch_size]
+"""
+
+import sys
+import time
+
+from google.appengine.ext import testbed
+
+from ggrc.cache import CacheManager, MemCache
+
+
+page_sizes = [100, 1000, 10000]
+
+
+class CountingClient(object):
+  """Memcache client proxy counting calls and emulating network latency."""
+
+  def __init__(self, client, rtt):
+    self.client = client
+    self.rtt = rtt
+    self.round_trips = 0
+
+  def __getattr__(self, name):
+    method = getattr(self.client, name)
+
+    def call(*args, **kwargs):
+      self.round_trips += 1
+      time.sleep(self.rtt)
+      return method(*args, **kwargs)
+    return call
+
+
+def per_key(client, entries):
+  for key, value in entries.iteritems():
+    client.add(key, value)
+  return [client.get(key) for key in entries]
+
+
+def batched(cache_manager, entries):
+  cache_manager.bulk_add(entries)
+  return cache_manager.bulk_get(entries.keys())
+
+
+def run_benchmark(rtt, batch_size):
+  bed = testbed.Testbed()
+  bed.activate()
+  try:
+    for page_size in page_sizes:
+      entries = {
+          "collection:controls:{}".format(i): {"id": i, "selfLink": i}
+          for i in range(page_size)
+      }
+      cache_manager = CacheManager()
+      cache_manager.initialize(MemCache(), batch_size)
+      client = CountingClient(cache_manager.cache_object.memcache_client, rtt)
+      cache_manager.cache_object.memcache_client = client
+
+      for name, func, arg in (("per key", per_key, client),
+                              ("batched", batched, cache_manager)):
+        bed.init_memcache_stub()
+        client.client.flush_all()
+        client.round_trips = 0
+        start = time.time()
+        func(arg, entries)
+        print "{:>6} objects - {:8}: {:>6} round trips - {:8.4f}s".format(
+            page_size, name, client.round_trips, time.time() - start)
+  finally:
+    bed.deactivate()
+
+
+if __name__ == "__main__":
+  run_benchmark(
+      float(sys.argv[1]) if len(sys.argv) > 1 else 0.0005,
+      int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+  )
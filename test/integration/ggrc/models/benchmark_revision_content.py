@@ -0,0 +1,82 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark storage size and decoding of revision content formats
+
+ Content similar to Control revisions is stored as JSON text the way the
+ revisions.content column stores it and compressed the way the
+ revisions.compressed_content column stores it. For both formats the script
+ prints the total stored size and the time needed to load the stored values
+ and read either all fields or only the title and slug.
+
+ Usage: python benchmark_revision_content.py [revision_count]
+"""
+
+import random
+import sys
+import time
+
+from ggrc.models.types import CompressedJsonType
+from ggrc.models.types import LongJsonType
+
+
+def make_content(index):
+  """Make revision content of a control with a few text fields."""
+  words = ["control", "access", "review", "policy", "audit", "quarterly",
+           "system", "owner", "evidence", "process"]
+  text = " ".join(random.choice(words) for _ in range(200))
+  person = {"id": index % 50, "type": "Person",
+            "href": "/api/people/{}".format(index % 50)}
+  return {
+      "id": index,
+      "type": "Control",
+      "slug": "CONTROL-{}".format(index),
+      "title": "Control {}".format(index),
+      "description": text,
+      "notes": text[:400],
+      "test_plan": text[:800],
+      "status": "Draft",
+      "created_at": "2017-09-01T10:00:00",
+      "updated_at": "2017-09-02T10:00:00",
+      "modified_by": person,
+      "access_control_list": [
+          {"ac_role_id": role_id, "person_id": person["id"],
+           "person": person, "object_id": index, "object_type": "Control"}
+          for role_id in range(1, 5)
+      ],
+      "custom_attribute_values": [
+          {"custom_attribute_id": cad_id, "attribute_value": "value",
+           "attributable_id": index, "attributable_type": "Control"}
+          for cad_id in range(10)
+      ],
+  }
+
+
+def read_all(content):
+  return content.copy()
+
+
+def read_title(content):
+  return content["title"], content["slug"]
+
+
+def run_benchmark(revision_count):
+  contents = [make_content(index) for index in range(revision_count)]
+  for name, type_ in (("json", LongJsonType()),
+                      ("compressed", CompressedJsonType())):
+    stored = [type_.process_bind_param(content, None) for content in contents]
+    size = sum(len(value) for value in stored)
+    print "{:>10}: {:>12} bytes".format(name, size)
+    for read_name, read in (("all fields", read_all),
+                            ("title, slug", read_title)):
+      start = time.time()
+      for value in stored:
+        read(type_.process_result_value(value, None))
+      elapsed = time.time() - start
+      print "{:>10}: {:>12} - {:8.4f}s - {:>8.0f} revisions/s".format(
+          name, read_name, elapsed, revision_count / elapsed)
+
+
+if __name__ == "__main__":
+  run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,96 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark latency of similar assessment lookups
+
+ Assessments of one audit are mapped to random subsets of controls, the
+ similarity index is rebuilt and similar assessments of random assessments
+ are fetched twice: with the join over relationships and snapshots and with
+ the similarity index. Both lookups must return the same assessments and
+ weights. The average and maximum latency of both lookups is printed.
+
+ Prerequisite: a scratch database migrated for the ggrc app. Created objects
+ are not removed.
+
+ Usage: python benchmark_similarity.py [assessments] [controls] [lookups]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.models import all_models
+from ggrc.models import similarity_index
+
+from integration.ggrc.models import factories
+
+
+mappings_per_assessment = 5
+
+
+def create_data(assessment_count, control_count):
+  """Create assessments mapped to random controls."""
+  with factories.single_commit():
+    audit = factories.AuditFactory()
+    controls = [factories.ControlFactory() for _ in range(control_count)]
+    assessments = [
+        factories.AssessmentFactory(audit=audit, assessment_type="Control")
+        for _ in range(assessment_count)
+    ]
+  now = datetime.datetime.now()
+  db.session.execute(all_models.Relationship.__table__.insert(), [
+      {"source_type": "Assessment", "source_id": assessment.id,
+       "destination_type": "Control", "destination_id": control.id,
+       "created_at": now, "updated_at": now}
+      for assessment in assessments
+      for control in random.sample(controls, mappings_per_assessment)
+  ])
+  similarity_index.rebuild()
+  db.session.commit()
+  return [assessment.id for assessment in assessments]
+
+
+def run_lookups(name, lookup, ids):
+  """Time lookups of similar assessments and return their results."""
+  results = []
+  times = []
+  for id_ in ids:
+    start = time.time()
+    results.append(sorted(lookup(id_)))
+    times.append(time.time() - start)
+  print "{:>6}: avg {:8.4f}s - max {:8.4f}s".format(
+      name, sum(times) / len(times), max(times))
+  return results
+
+
+def run_benchmark(assessment_count, control_count, lookup_count):
+  with app.app_context():
+    ids = create_data(assessment_count, control_count)
+    lookup_ids = [random.choice(ids) for _ in range(lookup_count)]
+    model = all_models.Assessment
+
+    def join_lookup(id_):
+      # pylint: disable=protected-access
+      return model._get_similar_from_joins(
+          id_, ["Assessment"],
+          db.session.query(model.assessment_type).filter(model.id == id_),
+          1).all()
+
+    def index_lookup(id_):
+      return model.get_similar_objects_query(id_, ["Assessment"]).all()
+
+    join_results = run_lookups("join", join_lookup, lookup_ids)
+    index_results = run_lookups("index", index_lookup, lookup_ids)
+    assert join_results == index_results
+
+
+if __name__ == "__main__":
+  run_benchmark(
+      int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+      int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+      int(sys.argv[3]) if len(sys.argv) > 3 else 50,
+  )
@@ -9,6 +9,7 @@ import ddt
 
 from ggrc import db
 from ggrc import models
+from ggrc.models import similarity_index
 from ggrc.snapshotter.rules import Types
 from ggrc_risks import models as risk_models
 
@@ -627,3 +628,54 @@ class TestWithSimilarityScore(TestCase):
             data["Issue"]["ids"],
             []
         )
+
+  def test_similarity_index_maintenance(self):
+    """Similarity index follows created and deleted relationships."""
+    with factories.single_commit():
+      audit = factories.AuditFactory()
+      control = factories.ControlFactory()
+      assessments = [
+          factories.AssessmentFactory(audit=audit, assessment_type="Control")
+          for _ in range(3)
+      ]
+    assessment_ids = [assessment.id for assessment in assessments]
+    for assessment in assessments[:2]:
+      factories.RelationshipFactory(source=assessment, destination=control)
+
+    def get_similar_ids():
+      return {obj.id for obj in models.Assessment.get_similar_objects_query(
+          id_=assessment_ids[0],
+          types=["Assessment"],
+      )}
+
+    self.assertSetEqual(get_similar_ids(), {assessment_ids[1]})
+
+    db.session.delete(models.Relationship.query.filter_by(
+        source_type="Assessment",
+        source_id=assessment_ids[1],
+        destination_type="Control",
+    ).one())
+    db.session.commit()
+    self.assertSetEqual(get_similar_ids(), set())
+
+    factories.RelationshipFactory(
+        source=models.Control.query.get(control.id),
+        destination=models.Assessment.query.get(assessment_ids[2]),
+    )
+    self.assertSetEqual(get_similar_ids(), {assessment_ids[2]})
+
+    def get_features():
+      feature = similarity_index.SimilarityFeature
+      return set(db.session.query(
+          feature.object_type,
+          feature.object_id,
+          feature.kind,
+          feature.feature_type,
+          feature.feature_id,
+          feature.weight,
+      ))
+
+    features = get_features()
+    similarity_index.rebuild()
+    db.session.commit()
+    self.assertSetEqual(features, get_features())
@@ -2,8 +2,14 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 """ Tests for ggrc.models.Revision """
+# pylint: disable=protected-access
+
+import mock
 
 import ggrc.models
+from ggrc import db
+from ggrc.models.revision import LatestRevision
+from ggrc.utils import revisions
 import integration.ggrc.generator
 from integration.ggrc import TestCase
 
@@ -125,3 +131,89 @@ class TestRevisions(TestCase):
     self.assertIsNotNone(revision)
     self.assertEqual(revision.content["title"], process.title)
     self.assertEqual(revision.content["description"], process.description)
+
+  def test_compressed_content(self):
+    """Test revisions stored and converted to the compressed format."""
+    json_control = factories.ControlFactory(title="json control")
+    with mock.patch("ggrc.settings.REVISION_CONTENT_FORMAT", "compressed",
+                    create=True):
+      compressed_control = factories.ControlFactory(title="compressed")
+    revision = _get_revisions(compressed_control)[0]
+    self.assertIsNone(revision._json_content)
+    self.assertEqual(revision.content["title"], "compressed")
+
+    revision = _get_revisions(json_control)[0]
+    self.assertIsNotNone(revision._json_content)
+    content = revision.content
+
+    revisions.do_compress_revisions(chunk_size=1)
+    db.session.expire_all()
+    revision = _get_revisions(json_control)[0]
+    self.assertIsNone(revision._json_content)
+    self.assertEqual(revision.content, content)
+
+  def test_recovered_revisions_compressed(self):
+    """Test recovered revisions are stored in the configured format."""
+    control = factories.ControlFactory(title="recovered control")
+    for model in (ggrc.models.Revision, LatestRevision):
+      model.query.filter_by(
+          resource_type=control.type,
+          resource_id=control.id,
+      ).delete()
+    db.session.commit()
+    with mock.patch("ggrc.settings.REVISION_CONTENT_FORMAT", "compressed",
+                    create=True):
+      revisions.do_refresh_revisions()
+    revision = _get_revisions(control)[0]
+    self.assertIsNone(revision._json_content)
+    self.assertEqual(revision.content["title"], "recovered control")
+
+  def test_lazy_content(self):
+    """Test single content values match the populated content."""
+    with mock.patch("ggrc.settings.REVISION_CONTENT_FORMAT", "compressed",
+                    create=True):
+      control = factories.ControlFactory(title="lazy control")
+    revision = _get_revisions(control)[0]
+    content = revision.content
+    self.assertEqual(dict(revision.lazy_content), content)
+    for key, value in content.iteritems():
+      self.assertEqual(revision.get_content_value(key), value)
+    self.assertIsNone(revision.get_content_value("missing"))
+    self.assertNotIn("missing", revision.lazy_content)
+
+  def _assert_latest_revision(self, obj):
+    """Check the lookup table points to the latest revision of obj."""
+    latest = max(_get_revisions(obj), key=lambda revision: revision.id)
+    self.assertEqual(
+        LatestRevision.get_latest([(obj.type, obj.id)]),
+        {(obj.type, obj.id): (latest.id, latest.action)},
+    )
+
+  def test_latest_revisions(self):
+    """Test latest revisions lookup table for POST and PUT."""
+    cls = ggrc.models.DataAsset
+    name = cls._inflector.table_singular  # pylint: disable=protected-access
+    _, obj = self.gen.generate(cls, name, {name: {
+        "title": "revisioned v1",
+        "context": None,
+    }})
+    self._assert_latest_revision(obj)
+    _, obj = self.gen.modify(obj, name, {name: {
+        "slug": obj.slug,
+        "title": "revisioned v2",
+        "context": None,
+    }})
+    self._assert_latest_revision(obj)
+
+  def test_latest_revisions_refresh(self):
+    """Test older revisions do not replace the latest one."""
+    control = factories.ControlFactory()
+    factories.ControlFactory(title="other")
+    latest = _get_revisions(control)[0]
+    stub = (control.type, control.id)
+    LatestRevision.store([stub + (latest.id - 1, "deleted")])
+    self._assert_latest_revision(control)
+
+    db.session.query(LatestRevision).delete()
+    LatestRevision.refresh([stub])
+    self._assert_latest_revision(control)
@@ -14,6 +14,7 @@ from operator import itemgetter
 from flask import json
 
 import ddt
+import mock
 
 from ggrc import app
 from ggrc import db
@@ -801,6 +802,38 @@ class TestAdvancedQueryAPI(TestCase, WithQueryApi):
 
     self.assertEqual(response_multiple_posts, response_single_post)
 
+  def test_multiple_queries_on_workers(self):
+    """Queries evaluated on workers give the same results as serially."""
+    data_list = [
+        self._make_query_dict("Program",
+                              type_="ids",
+                              expression=["title", "~", "1"]),
+        self._make_query_dict("Program",
+                              type_="count",
+                              expression=["title", "!=", "Cat ipsum 1"]),
+        self._make_query_dict("Program",
+                              order_by=[{"name": "title"}],
+                              limit=[0, 5],
+                              expression=["title", "~", "Cat ipsum"]),
+        {
+            "object_name": "Regulation",
+            "type": "ids",
+            "filters": {
+                "expression": {
+                    "object_name": "__previous__",
+                    "op": {"name": "relevant"},
+                    "ids": ["0"],
+                },
+            },
+        },
+    ]
+
+    response_serial = json.loads(self._post(data_list).data)
+    with mock.patch("ggrc.settings.QUERY_WORKERS", 4, create=True):
+      response_parallel = json.loads(self._post(data_list).data)
+
+    self.assertEqual(response_serial, response_parallel)
+
   def test_is_empty_query_by_native_attrs(self):
     """Filter by navive object attrs with 'is empty' operator."""
     programs = self._get_first_result_set(
@@ -813,6 +846,43 @@ class TestAdvancedQueryAPI(TestCase, WithQueryApi):
                      set([program["title"] for program
                           in programs["values"]]))
 
+  def _get_program_ids(self, expression):
+    """Get ids of programs matching a filter expression."""
+    programs = self._get_first_result_set(
+        self._make_query_dict_base(
+            "Program", filters={"expression": expression}),
+        "Program",
+    )
+    return {program["id"] for program in programs["values"]}
+
+  def test_combined_fulltext_filters(self):
+    """Filter by AND and OR of filters checked with one fulltext scan."""
+    def and_(left, right):
+      return {"left": left, "op": {"name": "AND"}, "right": right}
+
+    def or_(left, right):
+      return {"left": left, "op": {"name": "OR"}, "right": right}
+
+    title_like = self.make_filter_expression(("title", "~", "1"))
+    title_ne = self.make_filter_expression(("title", "!=", "Cat ipsum 1"))
+    notes_empty = self.make_filter_expression(("notes", "is", "empty"))
+    title_like_ids = self._get_program_ids(title_like)
+    title_ne_ids = self._get_program_ids(title_ne)
+    notes_empty_ids = self._get_program_ids(notes_empty)
+
+    self.assertEqual(
+        self._get_program_ids(and_(title_like, title_ne)),
+        title_like_ids & title_ne_ids,
+    )
+    self.assertEqual(
+        self._get_program_ids(or_(title_ne, notes_empty)),
+        title_ne_ids | notes_empty_ids,
+    )
+    self.assertEqual(
+        self._get_program_ids(and_(title_like, or_(title_ne, notes_empty))),
+        title_like_ids & (title_ne_ids | notes_empty_ids),
+    )
+
   @ddt.data(
       (all_models.Control, [all_models.Objective, all_models.Control,
                             all_models.Market, all_models.Objective]),
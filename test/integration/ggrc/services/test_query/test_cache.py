@@ -0,0 +1,72 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for caching of /query api results."""
+
+import mock
+
+from ggrc import db
+from ggrc.models import all_models
+from ggrc.query import cache as query_cache
+from ggrc.query import views
+
+from integration.ggrc import TestCase
+from integration.ggrc import generator
+from integration.ggrc.models import factories
+from integration.ggrc.query_helper import WithQueryApi
+
+
+class TestQueryCache(TestCase, WithQueryApi):
+  """Tests for /query results served from the query cache."""
+
+  def setUp(self):
+    super(TestQueryCache, self).setUp()
+    self.client.get("/login")
+    self.generator = generator.ObjectGenerator()
+    patcher = mock.patch.multiple("ggrc.settings", create=True,
+                                  QUERY_CACHE_ENABLED=True,
+                                  QUERY_CACHE_MAX_ENTRIES=10,
+                                  QUERY_CACHE_TTL=60)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    query_cache._store = None  # pylint: disable=protected-access
+
+  def _count_controls(self):
+    query = self._make_query_dict_base("Control", type_="count")
+    return self._get_first_result_set(query, "Control", "count")
+
+  def test_repeated_query(self):
+    """Repeated queries are served from cache until a control changes."""
+    self.generator.generate_object(all_models.Control)
+    with mock.patch.object(views, "get_handler_results",
+                           wraps=views.get_handler_results) as handler:
+      self.assertEqual(self._count_controls(), 1)
+      self.assertEqual(self._count_controls(), 1)
+      self.assertEqual(handler.call_count, 1)
+      self.assertEqual(query_cache.get_stats()["hits"], 1)
+
+      self.generator.generate_object(all_models.Control)
+      self.assertEqual(self._count_controls(), 2)
+      self.assertEqual(handler.call_count, 2)
+
+  def test_different_queries(self):
+    """Queries with different parameters are cached separately."""
+    self.generator.generate_object(all_models.Control)
+    self.assertEqual(self._count_controls(), 1)
+    ids = self._get_first_result_set(
+        self._make_query_dict_base("Control", type_="ids"), "Control", "ids")
+    self.assertEqual(len(ids), 1)
+    self.assertEqual(query_cache.get_stats()["items"], 2)
+
+  def test_changes_without_revisions(self):
+    """Writes that log no revisions invalidate cached results."""
+    self.generator.generate_object(all_models.Control)
+    self.assertEqual(self._count_controls(), 1)
+
+    with factories.single_commit():
+      control = factories.ControlFactory()
+    self.assertEqual(self._count_controls(), 2)
+
+    db.session.delete(control)
+    db.session.commit()
+    self.assertEqual(self._count_controls(), 1)
@@ -0,0 +1,72 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for cursor pagination of /query api and REST collections."""
+
+from ggrc.models import all_models
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc.query_helper import WithQueryApi
+
+
+class TestCursorPagination(TestCase, WithQueryApi):
+  """Tests for paging with cursors."""
+
+  def setUp(self):
+    super(TestCursorPagination, self).setUp()
+    self.client.get("/login")
+    with factories.single_commit():
+      for title in ["c", "a", "b", "a", "d"]:
+        factories.ControlFactory(title=title)
+
+  def _get_query_pages(self, order_by, **params):
+    """Get all pages of controls with /query and cursors."""
+    pages = []
+    cursor = None
+    while True:
+      query = self._make_query_dict_base("Control", type_="ids",
+                                         limit=[0, 2], order_by=order_by)
+      query["cursor"] = cursor
+      query.update(params)
+      result = self._get_first_result_set(query, "Control")
+      pages.append(result)
+      cursor = result["next_cursor"]
+      if cursor is None:
+        return pages
+
+  def test_query_cursor(self):
+    """/query pages follow the requested order and have no total count."""
+    pages = self._get_query_pages([{"name": "title", "desc": True}])
+    ids = sum([page["ids"] for page in pages], [])
+    expected = [control.id for control in sorted(
+        all_models.Control.query, key=lambda c: (c.title, -c.id),
+        reverse=True)]
+    self.assertEqual(ids, expected)
+    self.assertEqual([len(page["ids"]) for page in pages], [2, 2, 1])
+    self.assertIsNone(pages[0]["total"])
+
+  def test_query_cursor_total(self):
+    """/query computes total count on request."""
+    pages = self._get_query_pages([{"name": "title"}], count_total=True)
+    self.assertEqual(pages[0]["total"], 5)
+
+  def test_invalid_cursor(self):
+    """Invalid cursors are bad requests."""
+    query = self._make_query_dict_base("Control", type_="ids")
+    query["cursor"] = "invalid"
+    self.assert400(self._post(query))
+
+  def test_collection_cursor(self):
+    """REST collections are paged with cursors in default order."""
+    ids = []
+    url = "/api/controls?__cursor=&__page_size=2&__stubs_only=1"
+    while url:
+      response = self.client.get(url)
+      self.assert200(response)
+      collection = response.json["controls_collection"]
+      ids.extend(control["id"] for control in collection["controls"])
+      url = collection["paging"].get("next")
+    expected = [control.id for control in all_models.Control.query.order_by(
+        all_models.Control.updated_at.desc(), all_models.Control.id.desc())]
+    self.assertEqual(ids, expected)
@@ -0,0 +1,121 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for caching of relevance closures of the "relevant" operator."""
+
+import mock
+
+from ggrc import automapper
+from ggrc.models import all_models
+from ggrc.models import relevance_cache
+
+from integration.ggrc import TestCase
+from integration.ggrc import generator
+from integration.ggrc.models import factories
+from integration.ggrc.query_helper import WithQueryApi
+
+
+class TestRelevanceCache(TestCase, WithQueryApi):
+  """Tests for /query results filtered with cached relevance closures."""
+
+  def setUp(self):
+    super(TestRelevanceCache, self).setUp()
+    self.client.get("/login")
+    self.generator = generator.ObjectGenerator()
+    patcher = mock.patch.multiple("ggrc.settings", create=True,
+                                  RELEVANCE_CACHE_ENABLED=True,
+                                  RELEVANCE_CACHE_MAX_ENTRIES=10,
+                                  RELEVANCE_CACHE_TTL=60)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    relevance_cache._store = None  # pylint: disable=protected-access
+
+  def _relevant_control_ids(self, program_id):
+    """Get ids of controls relevant to the program."""
+    query = self._make_query_dict_base(
+        "Control",
+        type_="ids",
+        filters={"expression": {
+            "object_name": "Program",
+            "op": {"name": "relevant"},
+            "ids": [program_id],
+        }},
+    )
+    return sorted(self._get_first_result_set(query, "Control", "ids"))
+
+  def test_closure_invalidation(self):
+    """Closures are evaluated once until relationships change."""
+    _, program = self.generator.generate_object(all_models.Program)
+    _, control = self.generator.generate_object(all_models.Control)
+    _, other_control = self.generator.generate_object(all_models.Control)
+    self.generator.generate_relationship(program, control)
+    program_id = program.id
+    control_id, other_control_id = control.id, other_control.id
+
+    self.assertEqual(self._relevant_control_ids(program_id), [control_id])
+    self.assertEqual(self._relevant_control_ids(program_id), [control_id])
+    stats = relevance_cache.get_stats()
+    self.assertEqual(stats["misses"], 1)
+    self.assertGreater(stats["hit_rate"], 0)
+    self.assertEqual(stats["items"], 1)
+    self.assertGreater(stats["bytes"], 0)
+
+    self.generator.generate_relationship(
+        all_models.Program.query.get(program_id),
+        all_models.Control.query.get(other_control_id))
+    self.assertEqual(self._relevant_control_ids(program_id),
+                     sorted([control_id, other_control_id]))
+    self.assertEqual(relevance_cache.get_stats()["misses"], 2)
+
+  def test_automapping_invalidation(self):
+    """Automapped relationships without revisions invalidate closures."""
+    _, program = self.generator.generate_object(all_models.Program)
+    _, regulation = self.generator.generate_object(all_models.Regulation)
+    _, control = self.generator.generate_object(all_models.Control)
+    self.generator.generate_relationship(program, regulation)
+    program_id, regulation_id = program.id, regulation.id
+    control_id = control.id
+    self.assertEqual(self._relevant_control_ids(program_id), [])
+
+    with mock.patch.object(automapper.AutomapperGenerator, "_can_map_to",
+                           return_value=True):
+      factories.RelationshipFactory(
+          source=all_models.Regulation.query.get(regulation_id),
+          destination=all_models.Control.query.get(control_id),
+      )
+    automapping = all_models.Relationship.find_related(
+        all_models.Program.query.get(program_id),
+        all_models.Control.query.get(control_id),
+    )
+    self.assertIsNotNone(automapping)
+    self.assertEqual(all_models.Revision.query.filter_by(
+        resource_type="Relationship",
+        resource_id=automapping.id,
+    ).count(), 0)
+
+    self.assertEqual(self._relevant_control_ids(program_id), [control_id])
+    self.assertEqual(relevance_cache.get_stats()["misses"], 2)
+
+  def test_closure_shared_in_request(self):
+    """Queries posted together evaluate the same closure once."""
+    _, program = self.generator.generate_object(all_models.Program)
+    _, control = self.generator.generate_object(all_models.Control)
+    self.generator.generate_relationship(program, control)
+    control_id = control.id
+    expression = {
+        "object_name": "Program",
+        "op": {"name": "relevant"},
+        "ids": [program.id],
+    }
+    data = [
+        self._make_query_dict_base("Control", type_="ids",
+                                   filters={"expression": expression}),
+        self._make_query_dict_base("Control", type_="count",
+                                   filters={"expression": expression}),
+    ]
+    results = self._get_all_result_sets(data, "Control")
+    self.assertEqual(results[0]["Control"]["ids"], [control_id])
+    self.assertEqual(results[1]["Control"]["count"], 1)
+    stats = relevance_cache.get_stats()
+    self.assertEqual(stats["misses"], 1)
+    self.assertGreater(stats["request_hits"], 0)
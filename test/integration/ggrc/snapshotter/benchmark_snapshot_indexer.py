@@ -0,0 +1,63 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark full text indexing of snapshots
+
+ Existing snapshots are reindexed in chunks the way a full reindex does it.
+ The first pass starts with empty custom attribute definition and people
+ caches, the second pass reuses them. For both passes the script prints
+ reindexed snapshots and full text records per second.
+
+ Prerequisite: a migrated database with snapshots, for example one filled by
+ benchmark_snapshot_upsert.py.
+
+ Usage: python benchmark_snapshot_indexer.py [snapshots] [chunk_size]
+"""
+
+import sys
+import time
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.models import all_models
+from ggrc.snapshotter import indexer
+
+
+def count_records(snapshot_ids):
+  return db.session.query(Record).filter(
+      Record.type == "Snapshot",
+      Record.key.in_(snapshot_ids),
+  ).count()
+
+
+def run_pass(name, snapshot_ids, chunk_size):
+  start = time.time()
+  for offset in range(0, len(snapshot_ids), chunk_size):
+    indexer.reindex_snapshots(snapshot_ids[offset:offset + chunk_size])
+  elapsed = time.time() - start
+  records = count_records(snapshot_ids)
+  print "{:>6}: {:>7} snapshots - {:>8} records - {:8.2f}s - " \
+      "{:>8.1f} snapshots/s - {:>9.1f} records/s".format(
+          name, len(snapshot_ids), records, elapsed,
+          len(snapshot_ids) / elapsed, records / elapsed)
+
+
+def run_benchmark(snapshot_count, chunk_size):
+  with app.app_context():
+    snapshot_ids = [row.id for row in db.session.query(
+        all_models.Snapshot.id
+    ).order_by(all_models.Snapshot.id).limit(snapshot_count)]
+    indexer.invalidate_cad_cache()
+    get_indexer().invalidate_cache()
+    run_pass("cold", snapshot_ids, chunk_size)
+    run_pass("warm", snapshot_ids, chunk_size)
+
+
+if __name__ == "__main__":
+  run_benchmark(
+      int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+      int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+  )
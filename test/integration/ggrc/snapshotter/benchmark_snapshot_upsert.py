@@ -0,0 +1,90 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark chunked snapshot creation and update
+
+ An audit with snapshots of the given number of controls is created with
+ every chunk size, then all controls get a new revision and the snapshots are
+ upserted. Records per second of every pipeline stage (analyze, revision
+ lookup, snapshot write, revision insert and reindex) are printed for both
+ operations together with the peak memory usage of the process.
+
+ Prerequisite: a scratch database migrated for the ggrc app. Created objects
+ are not removed.
+
+ Usage: python benchmark_snapshot_upsert.py [controls] [chunk_size ...]
+"""
+
+import resource
+import sys
+import time
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.models import all_models
+from ggrc.snapshotter import SnapshotGenerator
+from ggrc.snapshotter.datastructures import Stub
+
+from integration.ggrc.models import factories
+
+
+def create_scope(control_count):
+  """Create an audit and controls that should be snapshotted in it."""
+  with factories.single_commit():
+    audit = factories.AuditFactory()
+    controls = [factories.ControlFactory() for _ in range(control_count)]
+  return audit, {Stub.from_object(control) for control in controls}
+
+
+def add_revisions(children):
+  """Log a new revision of every child object."""
+  revisions = []
+  for child in children:
+    obj = all_models.Control.query.get(child.id)
+    obj.title = obj.title + " edit"
+    revisions.append(all_models.Revision(obj, None, "modified",
+                                         obj.log_json()))
+  event = all_models.Event(action="BULK")
+  event.revisions = revisions
+  db.session.add(event)
+  db.session.commit()
+  return event
+
+
+def run_operation(audit, children, chunk_size, operation, event):
+  """Run snapshot create or upsert and print stats of every stage."""
+  generator = SnapshotGenerator(dry_run=False, chunk_size=chunk_size)
+  generator.add_family(Stub.from_object(audit), children)
+  start = time.time()
+  if operation == "create":
+    generator.create(event=event, revisions={})
+  else:
+    generator.upsert(event=event, revisions={}, _filter=None)
+  elapsed = time.time() - start
+  print "{:>6} chunk size - {:6}: {:>4} chunks - {:8.2f}s - {:>8} KB".format(
+      chunk_size, operation, len(generator.progress["done"]), elapsed,
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+  for name, stage in sorted(generator.progress["stages"].items()):
+    print "    {:16}: {:>8} records - {:8.2f}s - {:>10.1f} records/s".format(
+        name, stage["records"], stage["seconds"],
+        stage["records_per_second"])
+
+
+def run_benchmark(control_count, chunk_sizes):
+  with app.app_context():
+    for chunk_size in chunk_sizes:
+      audit, children = create_scope(control_count)
+      event = all_models.Event(action="BULK")
+      db.session.add(event)
+      db.session.commit()
+      run_operation(audit, children, chunk_size, "create", event)
+      event = add_revisions(children)
+      run_operation(audit, children, chunk_size, "upsert", event)
+
+
+if __name__ == "__main__":
+  run_benchmark(
+      int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+      [int(size) for size in sys.argv[2:]] or [100, 1000, 5000],
+  )
@@ -0,0 +1,178 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for chunked and resumable snapshot upserts."""
+
+import mock
+
+from ggrc import db
+import ggrc.models as models
+from ggrc.snapshotter import SnapshotGenerator
+from ggrc.snapshotter.datastructures import Pair
+
+from integration.ggrc.snapshotter import SnapshotterBaseTestCase
+
+
+class TestChunkedUpsert(SnapshotterBaseTestCase):
+  """Tests for snapshot upserts split into chunks."""
+
+  def setUp(self):
+    super(TestChunkedUpsert, self).setUp()
+    self.program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot 1"
+    })
+    self.controls = []
+    for i in range(5):
+      control = self.create_object(models.Control, {
+          "title": "Test Control Snapshot {}".format(i)
+      })
+      self.create_mapping(self.program, control)
+      self.controls.append(control)
+
+  def _get_audit(self):
+    return db.session.query(models.Audit).filter(
+        models.Audit.title.like("%Snapshotable audit%")).one()
+
+  def _modify_controls(self):
+    """Change titles of all controls and return their latest revisions."""
+    for control in self.controls:
+      control = self.refresh_object(control)
+      self.api.modify_object(control, {"title": control.title + " EDIT"})
+    return {
+        control.id: models.Revision.query.filter_by(
+            resource_type="Control", resource_id=control.id,
+        ).order_by(models.Revision.id.desc()).first().id
+        for control in self.controls
+    }
+
+  def _get_snapshot_revisions(self, audit):
+    return dict(db.session.query(
+        models.Snapshot.child_id,
+        models.Snapshot.revision_id,
+    ).filter(
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit.id,
+        models.Snapshot.child_type == "Control",
+    ))
+
+  @mock.patch("ggrc.settings.SNAPSHOT_CHUNK_SIZE", 2)
+  def test_chunked_upsert(self):
+    """Snapshots of all objects are created and updated in chunks."""
+    self.create_audit(self.program)
+    audit = self._get_audit()
+    self.assertEqual(len(self._get_snapshot_revisions(audit)), 5)
+
+    latest_revisions = self._modify_controls()
+    self.api.modify_object(audit, {"snapshots": {"operation": "upsert"}})
+    self.assertEqual(self._get_snapshot_revisions(audit), latest_revisions)
+
+  @mock.patch("ggrc.settings.SNAPSHOT_BACKGROUND_UPSERT_LIMIT", 1)
+  @mock.patch("ggrc.settings.SNAPSHOT_CHUNK_SIZE", 2)
+  def test_background_upsert(self):
+    """Large upserts run in a background task that stores progress."""
+    self.create_audit(self.program)
+    audit = self._get_audit()
+    latest_revisions = self._modify_controls()
+    self.api.modify_object(audit, {"snapshots": {"operation": "upsert"}})
+    self.assertEqual(self._get_snapshot_revisions(audit), latest_revisions)
+
+    task = models.BackgroundTask.query.filter(
+        models.BackgroundTask.name.like("upsert_snapshots%")).one()
+    self.assertEqual(task.status, "Success")
+    progress = task.result["progress"]
+    self.assertEqual(len(progress["chunks"]), 3)
+    self.assertEqual(progress["done"], [0, 1, 2])
+    self.assertEqual(progress["stages"]["reindex"]["records"], 5)
+
+  def _get_control_pairs(self, audit):
+    return sorted(Pair.from_snapshot(snapshot) for snapshot in
+                  models.Snapshot.query.filter_by(parent_id=audit.id,
+                                                  child_type="Control"))
+
+  @staticmethod
+  def _run_task(audit, progress):
+    """Upsert snapshots of audit with a task that has the given progress."""
+    task = models.BackgroundTask(name="upsert_snapshots1",
+                                 result={"progress": progress})
+    generator = SnapshotGenerator(dry_run=False, chunk_size=2, task=task)
+    generator.add_parent(audit)
+    generator.upsert(event=models.Event.query.first(), revisions={},
+                     _filter=None)
+    return task
+
+  def test_resume_upsert(self):
+    """Upsert continues with chunks not finished by a previous run."""
+    self.create_audit(self.program)
+    audit = self._get_audit()
+    old_revisions = self._get_snapshot_revisions(audit)
+    latest_revisions = self._modify_controls()
+
+    audit = self.refresh_object(audit)
+    pairs = self._get_control_pairs(audit)
+    task = self._run_task(audit, {
+        "chunks": [list(pair.to_4tuple()) for pair in pairs[::2]],
+        "done": [1],
+        "stages": {},
+    })
+
+    expected = dict(latest_revisions)
+    for pair in pairs[2:4]:
+      expected[pair.child.id] = old_revisions[pair.child.id]
+    self.assertEqual(self._get_snapshot_revisions(audit), expected)
+    self.assertEqual(task.result["progress"]["done"], [1, 0, 2])
+
+  def test_resume_upsert_added_pairs(self):
+    """Pairs added to finished chunks since the first run are created."""
+    self.create_audit(self.program)
+    audit = self._get_audit()
+    old_revisions = self._get_snapshot_revisions(audit)
+    pairs = self._get_control_pairs(audit)
+    control = self.create_object(models.Control, {
+        "title": "Test Control Snapshot added"
+    })
+    self.create_mapping(self.program, control)
+
+    audit = self.refresh_object(audit)
+    self._run_task(audit, {
+        "chunks": [list(pair.to_4tuple()) for pair in pairs[::2]],
+        "done": [0, 1, 2],
+        "stages": {},
+    })
+
+    snapshot_revisions = self._get_snapshot_revisions(audit)
+    self.assertIn(control.id, snapshot_revisions)
+    del snapshot_revisions[control.id]
+    self.assertEqual(snapshot_revisions, old_revisions)
+
+  @mock.patch("ggrc.settings.SNAPSHOT_BACKGROUND_UPSERT_LIMIT", 1)
+  @mock.patch("ggrc.settings.SNAPSHOT_CHUNK_SIZE", 2)
+  def test_resume_failed_upsert(self):
+    """A failed background upsert is resumed with its unfinished chunks."""
+    self.create_audit(self.program)
+    audit = self._get_audit()
+    latest_revisions = self._modify_controls()
+    reindexed = []
+    failures = []
+
+    def failing_reindex_pairs(pairs):
+      if len(reindexed) == 1 and not failures:
+        failures.append(pairs)
+        raise Exception("Reindex failed")
+      reindexed.append(pairs)
+
+    with mock.patch("ggrc.snapshotter.reindex_pairs",
+                    side_effect=failing_reindex_pairs):
+      self.api.modify_object(audit, {"snapshots": {"operation": "upsert"}})
+      task = models.BackgroundTask.query.filter(
+          models.BackgroundTask.name.like("upsert_snapshots%")).one()
+      self.assertEqual(task.status, "Failure")
+      self.assertEqual(task.result["progress"]["done"], [0])
+      response = self.api.client.post(
+          "/admin/upsert_snapshots/{}/resume".format(task.id))
+
+    self.assert200(response)
+    task = models.BackgroundTask.query.get(task.id)
+    self.assertEqual(task.status, "Success")
+    self.assertEqual(task.result["progress"]["done"], [0, 1, 2])
+    self.assertEqual(len(reindexed), 3)
+    self.assertEqual(self._get_snapshot_revisions(audit), latest_revisions)
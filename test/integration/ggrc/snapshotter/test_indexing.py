@@ -12,6 +12,7 @@ from ggrc import models
 from ggrc.models import all_models
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.snapshotter.indexer import delete_records
+from ggrc.snapshotter.indexer import reindex_snapshots
 
 from integration.ggrc.snapshotter import SnapshotterBaseTestCase
 from integration.ggrc.models import factories
@@ -534,3 +535,31 @@ class TestSnapshotIndexing(SnapshotterBaseTestCase):
         Record.property == role_name.lower()
     ).values("subproperty", "content"))
     self.assertFalse(all_found_records)
+
+  def test_cad_cache_invalidation(self):
+    """Test new definitions are indexed after cached ones were used."""
+    with factories.single_commit():
+      control = factories.ControlFactory()
+    revision = all_models.Revision.query.filter(
+        all_models.Revision.resource_id == control.id,
+        all_models.Revision.resource_type == control.type,
+    ).one()
+    with factories.single_commit():
+      snapshot = factories.SnapshotFactory(
+          child_id=control.id,
+          child_type=control.type,
+          revision=revision)
+    snapshot_id = snapshot.id
+    reindex_snapshots([snapshot_id])
+
+    factories.CustomAttributeDefinitionFactory(
+        title="new cad",
+        definition_type="control",
+        attribute_type="Text",
+    )
+    reindex_snapshots([snapshot_id])
+    self.assertEqual(Record.query.filter(
+        Record.key == snapshot_id,
+        Record.type == "Snapshot",
+        Record.property == "new cad",
+    ).count(), 1)
@@ -19,6 +19,8 @@ from integration.ggrc.models import factories
 
 from ggrc import db
 from ggrc.converters import errors
+from ggrc.converters.base import Converter
+from ggrc.converters.import_helper import read_csv_file
 from ggrc_workflows.models.task_group import TaskGroup
 from ggrc_workflows.models.task_group_object import TaskGroupObject
 from ggrc_workflows.models.task_group_task import TaskGroupTask
@@ -58,6 +60,19 @@ class TestWorkflowObjectsImport(TestCase):
     self.assertIn("ch2", task3.response_options)
     self.assertIn("option 1", task4.response_options)
 
+  def test_block_dependencies(self):
+    """Task group and task blocks depend on their parent blocks."""
+    with open(join(self.CSV_DIR, "workflow_small_sheet.csv")) as csv_file:
+      converter = Converter(csv_data=read_csv_file(csv_file))
+    converter.block_converters_from_csv()
+
+    blocks = [block.name for block in converter.block_converters]
+    self.assertEqual(blocks, ["Person", "Objective", "Workflow",
+                              "Task Group", "Task Group Task"])
+    # pylint: disable=protected-access
+    self.assertEqual(converter._get_block_dependencies(),
+                     [set(), {0}, {0}, {0, 2}, {0, 3}])
+
   def test_bad_imports(self):
     """Test workflow import with errors and warnings"""
     filename = "workflow_with_warnings_and_errors.csv"
@@ -0,0 +1,49 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for batched bulk operations in CacheManager."""
+
+from unittest import TestCase
+
+import mock
+
+from appengine import base
+from ggrc.cache import CacheManager, MemCache
+
+
+@base.with_memcache
+class TestCacheManagerBatches(TestCase):
+  """Test that bulk operations are split into batches of batch_size keys."""
+
+  def setUp(self):
+    self.cache_manager = CacheManager()
+    self.cache_manager.initialize(MemCache(), batch_size=2)
+    self.client = self.cache_manager.cache_object.memcache_client
+    self.entries = {"collection:controls:{}".format(i): {"id": i}
+                    for i in range(5)}
+
+  def test_bulk_add_batches(self):
+    """bulk_add sends one add_multi per batch_size entries."""
+    with mock.patch.object(self.client, "add_multi",
+                           wraps=self.client.add_multi) as add_multi:
+      result = self.cache_manager.bulk_add(self.entries)
+    self.assertEqual(result, [])
+    self.assertEqual(add_multi.call_count, 3)
+
+  def test_bulk_get_batches(self):
+    """bulk_get merges results of one get_multi per batch_size keys."""
+    self.cache_manager.bulk_add(self.entries)
+    keys = self.entries.keys() + ["collection:controls:missing"]
+    with mock.patch.object(self.client, "get_multi",
+                           wraps=self.client.get_multi) as get_multi:
+      result = self.cache_manager.bulk_get(keys)
+    self.assertEqual(result, self.entries)
+    self.assertEqual(get_multi.call_count, 3)
+
+  def test_bulk_add_respects_existing(self):
+    """bulk_add reports keys that are already present in cache."""
+    key = "collection:controls:0"
+    self.client.add(key, {"id": "old"})
+    result = self.cache_manager.bulk_add(self.entries)
+    self.assertEqual(result, [key])
+    self.assertEqual(self.client.get(key), {"id": "old"})
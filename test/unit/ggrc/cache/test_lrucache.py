@@ -0,0 +1,103 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for the in-process LRU cache."""
+
+from unittest import TestCase
+
+import mock
+
+from ggrc.cache import CacheManager
+from ggrc.cache import lrucache
+
+
+class TestLRUClient(TestCase):
+  """Test memcache.Client compatible behaviour of LRUClient."""
+
+  def setUp(self):
+    self.store = lrucache.LRUStore(max_entries=3, max_ttl=60)
+    self.client = lrucache.LRUClient(self.store)
+
+  def test_lru_eviction(self):
+    """Least recently used entries are evicted over max_entries."""
+    for key in "abc":
+      self.client.set(key, key)
+    self.client.get("a")
+    self.client.set("d", "d")
+    self.assertEqual(self.client.get_multi("abcd"),
+                     {"a": "a", "c": "c", "d": "d"})
+    self.assertEqual(self.store.get_stats()["evictions"], 1)
+
+  def test_ttl(self):
+    """Entries expire after their own ttl and never outlive max_ttl."""
+    with mock.patch.object(lrucache.time, "time", return_value=1000):
+      self.client.set("short", 1, 10)
+      self.client.set("long", 1, 600)
+      self.client.set("default", 1)
+    with mock.patch.object(lrucache.time, "time", return_value=1011):
+      self.assertIsNone(self.client.get("short"))
+      self.assertEqual(self.client.get("long"), 1)
+    with mock.patch.object(lrucache.time, "time", return_value=1061):
+      self.assertIsNone(self.client.get("long"))
+      self.assertIsNone(self.client.get("default"))
+
+  def test_values_are_copied(self):
+    """Changing a returned value does not change the cached value."""
+    self.client.set("key", {"ids": [1]})
+    self.client.get("key")["ids"].append(2)
+    self.assertEqual(self.client.get("key"), {"ids": [1]})
+
+  def test_delete_lock(self):
+    """Delete with seconds blocks add but not set for that key."""
+    self.client.set("key", 1)
+    self.assertEqual(self.client.delete("key", 5), 2)
+    self.assertEqual(self.client.delete("key"), 1)
+    self.assertEqual(self.client.add_multi({"key": 2, "other": 3}), ["key"])
+    with mock.patch.object(lrucache.time, "time",
+                           return_value=lrucache.time.time() + 6):
+      self.assertTrue(self.client.add("key", 2))
+    self.assertTrue(self.client.set("other", 4))
+
+  def test_cas(self):
+    """cas succeeds only for unchanged keys read with gets."""
+    self.client.set_multi({"a": 1, "b": 1})
+    self.assertFalse(self.client.cas("a", 2))
+    other_client = lrucache.LRUClient(self.store)
+    self.assertEqual(self.client.get_multi(["a", "b"], for_cas=True),
+                     {"a": 1, "b": 1})
+    other_client.set("b", 5)
+    self.assertEqual(self.client.cas_multi({"a": 2, "b": 2}), ["b"])
+    self.assertEqual(self.client.get_multi(["a", "b"]), {"a": 2, "b": 5})
+
+  def test_incr(self):
+    """incr changes existing values and keeps their expiration time."""
+    self.assertIsNone(self.client.incr("a"))
+    self.assertEqual(self.client.incr("a", initial_value=10), 11)
+    with mock.patch.object(lrucache.time, "time", return_value=1000):
+      self.client.set("b", 5, 10)
+      self.assertEqual(self.client.incr("b", 2), 7)
+    self.assertEqual(self.client.incr("a", -20), 0)
+    with mock.patch.object(lrucache.time, "time", return_value=1011):
+      self.assertIsNone(self.client.get("b"))
+
+
+class TestLRUCache(TestCase):
+  """Test LRUCache used through CacheManager."""
+
+  def setUp(self):
+    lrucache.LRUCache._store = None  # pylint: disable=protected-access
+    self.cache_manager = CacheManager()
+    self.cache_manager.initialize(lrucache.LRUCache())
+
+  def test_registered_resources(self):
+    """LRUCache supports resources registered for memcache."""
+    self.assertTrue(self.cache_manager.is_caching_supported(
+        "collection", "controls"))
+
+  def test_shared_store(self):
+    """Entries are visible to all cache instances in the process."""
+    self.assertEqual(self.cache_manager.bulk_add({"collection:a:1": 1}), [])
+    self.assertEqual(lrucache.LRUCache().memcache_client.get("collection:a:1"),
+                     1)
+    self.cache_manager.clean()
+    self.assertEqual(self.cache_manager.bulk_get(["collection:a:1"]), {})
@@ -113,6 +113,24 @@ class TestSplitArry(unittest.TestCase):
     self.assertEqual(offests[2], 9)
 
 
+class TestGenerateCsvChunks(unittest.TestCase):
+  """Tests for generating csv strings in chunks."""
+
+  def test_same_as_csv_string(self):
+    """Test that joined csv chunks are equal to the whole csv string."""
+    csv_chunks = [
+        [[u"Object type", u"Code", u"Title"], [u"Control", u"C-1", u"\u010d"]],
+        [],
+        [[u"", u"C-2", u"a,\"b\""], [u""]],
+        [[u""]],
+    ]
+    csv_string = import_helper.generate_csv_string(
+        copy.deepcopy(sum(csv_chunks, [])))
+    csv_strings = list(import_helper.generate_csv_chunks(csv_chunks, 3))
+    self.assertEqual(len(csv_strings), 3)
+    self.assertEqual("".join(csv_strings), csv_string)
+
+
 class TestColumnOrder(unittest.TestCase):
 
   """Tests for colum order function.
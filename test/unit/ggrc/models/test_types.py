@@ -0,0 +1,54 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unittests for custom ORM data types."""
+
+import unittest
+
+import mock
+
+from ggrc.models import types
+
+
+class TestCompressedJsonType(unittest.TestCase):
+  """Tests for storing dicts with CompressedJsonType."""
+
+  CONTENT = {
+      "id": 1,
+      "title": u"Control \u2713",
+      "description": "a" * 1000,
+      "owners": [{"id": 2, "type": "Person"}],
+      "notes": None,
+  }
+
+  def setUp(self):
+    self.type_ = types.CompressedJsonType()
+
+  def _round_trip(self, value):
+    return self.type_.process_result_value(
+        self.type_.process_bind_param(value, None), None)
+
+  def test_round_trip(self):
+    """Loaded content is equal to the stored dict."""
+    loaded = self._round_trip(self.CONTENT)
+    self.assertIsInstance(loaded, types.LazyJsonDict)
+    self.assertEqual(dict(loaded), self.CONTENT)
+    self.assertEqual(loaded.copy(), self.CONTENT)
+    self.assertEqual(self._round_trip({}).copy(), {})
+    self.assertIsNone(self._round_trip(None))
+
+  def test_compression(self):
+    """Stored content is smaller than its JSON."""
+    stored = self.type_.process_bind_param(self.CONTENT, None)
+    self.assertLess(len(stored), 200)
+
+  def test_lazy_decoding(self):
+    """Only accessed values are decoded."""
+    loaded = self._round_trip(self.CONTENT)
+    with mock.patch.object(types.json, "loads",
+                           wraps=types.json.loads) as loads:
+      self.assertEqual(loaded["title"], self.CONTENT["title"])
+      self.assertEqual(loaded.get("title"), self.CONTENT["title"])
+      self.assertIn("description", loaded)
+      self.assertIsNone(loaded.get("missing"))
+      self.assertEqual(loads.call_count, 1)
@@ -0,0 +1,59 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for the versioned permissions cache."""
+
+from unittest import TestCase
+
+from ggrc.cache import lrucache
+from ggrc.rbac import permissions_cache
+
+
+class TestPermissionsCache(TestCase):
+  """Tests for storing and invalidating cached permissions."""
+
+  def setUp(self):
+    self.cache = lrucache.LRUClient(lrucache.LRUStore(max_entries=100))
+
+  def _load(self, user_id, permissions=None):
+    """Get cached permissions and cache new ones on a miss."""
+    versions, cached = permissions_cache.get_cached_permissions(
+        self.cache, user_id)
+    if cached is None and permissions is not None:
+      permissions_cache.store_permissions(
+          self.cache, user_id, versions, permissions)
+    return cached
+
+  def test_cache_hit(self):
+    """Stored permissions are returned until they are invalidated."""
+    self.assertIsNone(self._load(1, {"read": {}}))
+    self.assertEqual(self._load(1), {"read": {}})
+
+  def test_user_invalidation(self):
+    """Invalidating permissions of a user keeps other users cached."""
+    self._load(1, {"read": {"Control": {"contexts": [1]}}})
+    self._load(2, {"read": {"Control": {"contexts": [2]}}})
+    permissions_cache.invalidate_permissions(self.cache, [1])
+    self.assertIsNone(self._load(1))
+    self.assertEqual(self._load(2), {"read": {"Control": {"contexts": [2]}}})
+
+  def test_global_invalidation(self):
+    """Global invalidation invalidates permissions of all users."""
+    self._load(1, {})
+    self._load(2, {})
+    permissions_cache.invalidate_permissions(self.cache)
+    self.assertIsNone(self._load(1))
+    self.assertIsNone(self._load(2))
+
+  def test_invalidation_during_load(self):
+    """Permissions invalidated while they were loaded are not used."""
+    versions, _ = permissions_cache.get_cached_permissions(self.cache, 1)
+    permissions_cache.invalidate_permissions(self.cache, [1])
+    permissions_cache.store_permissions(self.cache, 1, versions, {})
+    self.assertIsNone(self._load(1))
+
+  def test_evicted_version(self):
+    """Entries stored with an evicted version are not used."""
+    self._load(1, {})
+    self.cache.delete(permissions_cache.USER_VERSION_KEY.format(1))
+    self.assertIsNone(self._load(1))
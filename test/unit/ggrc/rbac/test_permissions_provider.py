@@ -0,0 +1,58 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for permission checks on compiled permissions."""
+
+from unittest import TestCase
+
+from ggrc import app  # noqa pylint: disable=unused-import
+from ggrc.rbac.permissions_provider import CompiledPermissions
+from ggrc.rbac.permissions_provider import Permission
+
+
+class TestCompiledPermissions(TestCase):
+  """Tests for CompiledPermissions.is_allowed."""
+
+  def test_context_permissions(self):
+    """Permissions are granted in listed contexts and for listed ids."""
+    compiled = CompiledPermissions({
+        "__user": "user@example.com",
+        "read": {
+            "Control": {"contexts": [2, 3], "resources": [7]},
+            "__GGRC_ALL__": {"contexts": [5]},
+        },
+    })
+    self.assertFalse(compiled.is_admin)
+    self.assertTrue(compiled.is_allowed(Permission("read", "Control", 1, 2)))
+    self.assertTrue(compiled.is_allowed(Permission("read", "Control", 7, 4)))
+    self.assertTrue(compiled.is_allowed(Permission("read", "Market", 1, 5)))
+    self.assertFalse(compiled.is_allowed(Permission("read", "Control", 1, 4)))
+    self.assertFalse(
+        compiled.is_allowed(Permission("update", "Control", 1, 2)))
+
+  def test_global_permissions(self):
+    """Permissions in the None context are granted in all contexts."""
+    compiled = CompiledPermissions({
+        "read": {"Control": {"contexts": [None]}},
+        "create": {"/admin": {"contexts": [None]}},
+    })
+    self.assertTrue(compiled.is_allowed(Permission("read", "Control", 1, 8)))
+    self.assertTrue(
+        compiled.is_allowed(Permission("create", "/admin", None, 8)))
+
+  def test_admin_permissions(self):
+    """Admins are allowed everything and context admins their contexts."""
+    admin = CompiledPermissions({
+        "__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [0]}},
+    })
+    self.assertTrue(admin.is_admin)
+    self.assertTrue(admin.is_allowed(Permission("delete", "Control", 1, 3)))
+
+    context_admin = CompiledPermissions({
+        "__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [3]}},
+    })
+    self.assertFalse(context_admin.is_admin)
+    self.assertTrue(
+        context_admin.is_allowed(Permission("delete", "Control", 1, 3)))
+    self.assertFalse(
+        context_admin.is_allowed(Permission("delete", "Control", 1, 4)))
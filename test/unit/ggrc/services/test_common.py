@@ -149,3 +149,45 @@ class TestFilterResource(TestCase):
                                  depth=1,
                                  user_permissions=object())
     self.assertIsNone(res)
+
+  @mock.patch("ggrc.services.common._is_creator", return_value=False)
+  def test_filter_nested_stubs(self, _):
+    """Test unreadable stubs are removed and each stub is checked once"""
+    user_permissions = mock.Mock()
+    user_permissions.is_allowed_read.side_effect = (
+        lambda type_, id_, context_id: context_id != 2)
+    person = {"type": "Person", "id": 1, "context_id": None}
+    resources = [
+        {"type": "Control", "id": 1, "context": None,
+         "modified_by": dict(person), "owner": dict(person)},
+        {"type": "Control", "id": 2, "context": {"id": 2},
+         "modified_by": dict(person)},
+        {"type": "Control", "id": 3, "context_id": 1,
+         "audit": {"type": "Audit", "id": 1, "context_id": 2}},
+    ]
+
+    res = common.filter_resource(resources, user_permissions=user_permissions)
+
+    self.assertEqual([r["id"] for r in res], [1, 3])
+    self.assertEqual(res[0]["modified_by"], person)
+    self.assertIsNone(res[1]["audit"])
+    self.assertEqual(user_permissions.is_allowed_read.call_count, 5)
+
+  @mock.patch("ggrc.services.common._is_creator", return_value=True)
+  def test_filter_creator_relationships(self, _):
+    """Test Creator relationships need read access to both sides"""
+    relationships = [
+        {"type": "Relationship", "id": i, "context_id": None,
+         "source": {"type": "Control", "id": i, "context_id": i},
+         "destination": None}
+        for i in range(1, 4)
+    ]
+    with mock.patch.object(common.permissions, "read_contexts_for",
+                           return_value=[1]) as read_contexts_for, \
+        mock.patch.object(common.permissions, "read_resources_for",
+                          return_value=[3]):
+      res = common.filter_resource(relationships,
+                                   user_permissions=mock.Mock())
+
+    self.assertEqual([r["id"] for r in res], [1, 3])
+    read_contexts_for.assert_called_once_with("Control")